@@ -0,0 +1,120 @@
+"""
+Industry statistics computed locally from company-level data.
+
+The groups page only offers the metrics finviz chooses, and every table of
+it is another upstream request. Here the same kind of table is derived from
+typed company frames (see normalize.normalize_companies) with grouped
+reductions over whole columns, so it takes milliseconds and a new statistic
+is one more entry in AGGREGATES, with no extra fetching.
+
+Ratios are aggregated the way finviz does for groups: total market cap over
+total earnings (sales, book value), counting only companies with a positive
+ratio. Yields and growth are cap-weighted means, margins sales-weighted.
+"""
+from collections import namedtuple
+import logging
+
+import numpy as np
+import pandas as pd
+
+from metrics import histogram
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+AGGREGATE_SECONDS = histogram("aggregate_seconds", "Time to compute grouped statistics from company data")
+
+# One output column: how to reduce which company column, and the weight or
+# quantile it needs. kind is one of sum, ratio, weighted, median, quantile, count.
+# fill replaces missing values before summing, for columns where finviz's "-"
+# means zero rather than unknown.
+Aggregate = namedtuple("Aggregate", ["kind", "column", "param", "fill"], defaults=(None,))
+
+AGGREGATES = {
+    "Market cap": Aggregate("sum", "Market cap", None),
+    "P/E": Aggregate("ratio", "P/E", "Market cap"),
+    "Fwd P/E": Aggregate("ratio", "Fwd P/E", "Market cap"),
+    "P/S": Aggregate("ratio", "P/S", "Market cap"),
+    "P/B": Aggregate("ratio", "P/B", "Market cap"),
+    # Companies that pay nothing are listed as "-" and still count towards the yield
+    "Dividend": Aggregate("weighted", "Dividend", "Market cap", 0.0),
+    "Sales 5Y growth": Aggregate("weighted", "Sales 5Y growth", "Market cap"),
+    "Avg. volume": Aggregate("sum", "Avg. volume", None),
+    "Sales": Aggregate("sum", "Sales", None),
+    "Gross Margin": Aggregate("weighted", "Gross Margin", "Sales"),
+    "Operating Margin": Aggregate("weighted", "Operating Margin", "Sales"),
+    "Profit Margin": Aggregate("weighted", "Profit Margin", "Sales"),
+    "Median P/E": Aggregate("median", "P/E", None),
+    "P/E 25th pct": Aggregate("quantile", "P/E", 0.25),
+    "P/E 75th pct": Aggregate("quantile", "P/E", 0.75),
+    "Companies": Aggregate("count", "Ticker", None),
+}
+
+
+def group_aggregates(companies, by="Industry", aggregates=None):
+    """
+    Statistics per group of a typed company frame.
+
+    Sums and weighted means are computed as grouped sums over helper
+    columns, all in one pass; medians and quantiles in one grouped call each.
+
+    Args:
+        companies (pd.DataFrame): Typed company rows with a by column
+        by (str): Column to group on
+        aggregates (dict): Output name -> Aggregate (defaults to AGGREGATES)
+
+    Returns:
+        pd.DataFrame: One row per group, sorted by name like the groups page,
+        with the group in by and one column per aggregate whose input column
+        is present
+    """
+    aggregates = AGGREGATES if aggregates is None else aggregates
+    aggregates = {name: agg for name, agg in aggregates.items() if agg.column in companies.columns}
+    with AGGREGATE_SECONDS.time():
+        keys = companies[by]
+        sums = {}
+        for name, agg in aggregates.items():
+            values = companies[agg.column]
+            if agg.fill is not None:
+                values = values.fillna(agg.fill)
+            if agg.kind == "sum":
+                sums[name] = values
+            elif agg.kind == "ratio":
+                # cap / ratio is the earnings (sales, book value) behind the ratio
+                cap = companies[agg.param].where(values > 0)
+                sums[f"{name}/num"] = cap
+                sums[f"{name}/den"] = cap / values.where(values > 0)
+            elif agg.kind == "weighted":
+                weight = companies[agg.param].where(values.notna())
+                sums[f"{name}/num"] = values * weight
+                sums[f"{name}/den"] = weight
+        grouped = pd.DataFrame(sums, index=companies.index).groupby(keys, observed=True, sort=False)
+        totals = grouped.sum(min_count=1)
+
+        result = pd.DataFrame(index=totals.index)
+        for name, agg in aggregates.items():
+            if agg.kind == "sum":
+                result[name] = totals[name]
+            elif agg.kind in ("ratio", "weighted"):
+                result[name] = totals[f"{name}/num"] / totals[f"{name}/den"].replace(0, np.nan)
+            elif agg.kind == "median":
+                result[name] = companies[agg.column].groupby(keys, observed=True).median()
+            elif agg.kind == "quantile":
+                result[name] = companies[agg.column].groupby(keys, observed=True).quantile(agg.param)
+            elif agg.kind == "count":
+                result[name] = companies[agg.column].groupby(keys, observed=True).count()
+
+        result = result.sort_index(key=lambda index: index.astype(str)).reset_index()
+    return result
+
+
+def industry_table(companies, aggregates=None):
+    """
+    The sector table (one row per industry, named like normalize_sectors'
+    output: a categorical Sector column plus metrics) derived from company
+    rows instead of the groups page.
+    """
+    table = group_aggregates(companies, "Industry", aggregates).rename(columns={"Industry": "Sector"})
+    table["Sector"] = table["Sector"].astype(str).astype("category")
+    return table
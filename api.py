@@ -0,0 +1,249 @@
+"""
+Read-only HTTP API over the cached sector and company data.
+
+Serves the same typed frames the Streamlit page shows, straight from the
+shared snapshot store, to notebooks and services. It never scrapes finviz
+and never touches Streamlit: views that have not been fetched yet are
+reported as missing (the app and the refresh worker keep the store warm).
+
+    python api.py --port 8601
+
+    GET /sectors
+    GET /companies/<industry>?rows=40
+
+Query parameters:
+
+    columns=Ticker,P/E        only these columns
+    where=P/E<20&where=P/B>1  row filters: <, <=, >, >=, ==, != against a
+                              number, or ==, != against text
+    format=arrow|json         Arrow IPC stream or JSON records (default json,
+                              or arrow when the Accept header asks for it)
+
+Arrow responses load without copying:
+
+    pyarrow.ipc.open_stream(requests.get(url + "&format=arrow").content).read_pandas()
+
+Each response carries the snapshot's fetch time in X-Snapshot-Fetched-At.
+"""
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import logging
+import os
+import re
+import time
+from urllib.parse import parse_qs, unquote, urlparse
+
+import pandas as pd
+import pyarrow as pa
+
+from aggregates import industry_table
+from delta import TOP_ORDER, TOP_ROWS, update_typed
+from finviz_bs import screener_key
+from frame_cache import company_cache
+from metrics import counter, histogram
+from normalize import normalize_companies, normalize_sectors
+from snapshot_store import get_store
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+API_PORT = int(os.environ.get("API_PORT", "8601"))
+
+ARROW_TYPE = "application/vnd.apache.arrow.stream"
+
+API_REQUESTS = counter("api_requests_total", "Data API requests by route, format and status", ["route", "format", "status"])
+API_SECONDS = histogram("api_request_seconds", "Data API response time", ["route"])
+
+_FILTER_PATTERN = re.compile(r"^(.+?)\s*(<=|>=|!=|==|<|>|=)\s*(.+)$")
+_COMPARISONS = {
+    "<": lambda s, v: s < v,
+    "<=": lambda s, v: s <= v,
+    ">": lambda s, v: s > v,
+    ">=": lambda s, v: s >= v,
+    "==": lambda s, v: s == v,
+    "=": lambda s, v: s == v,
+    "!=": lambda s, v: s != v,
+}
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def sector_table():
+    """
+    The typed sector table as the app shows it: derived from the universe
+    snapshot while that is within max_stale, else the groups snapshot.
+
+    Returns:
+        tuple: (frame, fetched_at), or (None, None) if nothing is stored
+    """
+    store = get_store()
+    universe = store.get("universe", TOP_ORDER)
+    if universe is not None and time.time() - universe.fetched_at <= universe.max_stale:
+        return industry_table(normalize_companies(universe.frame)), universe.fetched_at
+    groups = store.get("groups", "industry")
+    if groups is None:
+        return None, None
+    return normalize_sectors(groups.frame), groups.fetched_at
+
+
+def company_table(industry, rows=TOP_ROWS):
+    """
+    An industry's typed companies, largest first, for a stored view.
+
+    Shares the process-wide company cache and its incremental updates with
+    the app when both run in one process.
+
+    Returns:
+        tuple: (frame, fetched_at), or (None, None) if the view is not stored
+    """
+    key = screener_key(industry, TOP_ORDER, rows)
+    snapshot = get_store().get("screener", key)
+    if snapshot is None:
+        return None, None
+    cached = company_cache.peek(key)
+    if cached is None or cached.attrs.get("snapshot_version") != snapshot.version:
+        company_cache.expire(key)
+    frame = company_cache.get_or_load(key, lambda: update_typed(company_cache.peek(key), snapshot.frame, industry))
+    return frame, snapshot.fetched_at
+
+
+def select(frame, columns=None, filters=()):
+    """
+    Rows matching every filter, restricted to columns.
+
+    Args:
+        frame (pd.DataFrame): Typed frame
+        columns (list): Column names to keep (all when empty)
+        filters (list): "column<op>value" expressions
+
+    Returns:
+        pd.DataFrame
+    """
+    mask = pd.Series(True, index=frame.index)
+    for expression in filters:
+        match = _FILTER_PATTERN.match(expression)
+        if match is None:
+            raise ApiError(400, f"Bad filter {expression!r}, expected e.g. 'P/E<20'")
+        column, op, value = match.groups()
+        if column not in frame.columns:
+            raise ApiError(400, f"Unknown column {column!r} in filter")
+        series = frame[column]
+        if pd.api.types.is_numeric_dtype(series):
+            try:
+                value = float(value)
+            except ValueError:
+                raise ApiError(400, f"{column!r} is numeric, got {value!r}")
+        elif op not in ("==", "=", "!="):
+            raise ApiError(400, f"{column!r} is text; only ==, != apply")
+        else:
+            series = series.astype(str)
+        mask &= _COMPARISONS[op](series, value).fillna(False)
+
+    if columns:
+        unknown = [column for column in columns if column not in frame.columns]
+        if unknown:
+            raise ApiError(400, f"Unknown columns {unknown}")
+        frame = frame[columns]
+    return frame[mask.to_numpy()]
+
+
+def to_arrow(frame):
+    """Frame as an Arrow IPC stream."""
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def to_json(frame):
+    return frame.to_json(orient="records").encode("utf-8")
+
+
+class _ApiHandler(BaseHTTPRequestHandler):
+    def _send(self, status, body, content_type, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _format(self, query):
+        requested = query.get("format", [None])[0]
+        if requested is None:
+            requested = "arrow" if ARROW_TYPE in self.headers.get("Accept", "") else "json"
+        if requested not in ("arrow", "json"):
+            raise ApiError(400, f"Unknown format {requested!r}, expected arrow or json")
+        return requested
+
+    def _table(self, path, query):
+        """(route, frame, fetched_at) for a request path."""
+        parts = [unquote(part) for part in path.strip("/").split("/", 1)]
+        if parts == ["sectors"]:
+            frame, fetched_at = sector_table()
+            return "sectors", frame, fetched_at
+        if parts[0] == "companies" and len(parts) == 2 and parts[1]:
+            try:
+                rows = int(query.get("rows", [TOP_ROWS])[0])
+            except ValueError:
+                raise ApiError(400, "rows must be an integer")
+            frame, fetched_at = company_table(parts[1], rows)
+            return "companies", frame, fetched_at
+        raise ApiError(404, "Unknown path; use /sectors or /companies/<industry>")
+
+    def do_GET(self):
+        started = time.perf_counter()
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        route, output = "unknown", "json"
+        try:
+            output = self._format(query)
+            route, frame, fetched_at = self._table(url.path, query)
+            if frame is None or "Error" in frame.columns:
+                raise ApiError(404, "Not cached yet; this API never fetches from finviz")
+            columns = [c for value in query.get("columns", []) for c in value.split(",") if c]
+            frame = select(frame, columns, query.get("where", []))
+            body = to_arrow(frame) if output == "arrow" else to_json(frame)
+            headers = {"X-Snapshot-Fetched-At": f"{fetched_at:.3f}"}
+            self._send(200, body, ARROW_TYPE if output == "arrow" else "application/json", headers)
+            status = 200
+        except ApiError as e:
+            self._send(e.status, json.dumps({"error": str(e)}).encode("utf-8"), "application/json")
+            status = e.status
+        except Exception as e:
+            logger.error(f"API request {self.path} failed: {e}")
+            self._send(500, json.dumps({"error": "Internal error"}).encode("utf-8"), "application/json")
+            status = 500
+        API_REQUESTS.inc(route=route, format=output, status=status)
+        API_SECONDS.observe(time.perf_counter() - started, route=route)
+
+    def log_message(self, format, *args):
+        logger.debug(f"api: {format % args}")
+
+
+def make_server(port=None, host=""):
+    """The API server bound to port (API_PORT by default), not yet serving."""
+    return ThreadingHTTPServer((host, API_PORT if port is None else port), _ApiHandler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve cached sector and company data over HTTP.")
+    parser.add_argument("--port", type=int, default=API_PORT)
+    parser.add_argument("--host", default="")
+    args = parser.parse_args()
+
+    server = make_server(args.port, args.host)
+    logger.info(f"Serving the data API on port {server.server_address[1]}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
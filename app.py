@@ -1,143 +1,379 @@
 import streamlit as st
 import pandas as pd
-import requests
-from bs4 import BeautifulSoup
-import time
-from finviz_bs import get_companies_by_industry_bs
+from concurrent.futures import ThreadPoolExecutor
+from aggregates import AGGREGATES, industry_table
+from fetcher import get_fetcher
+from delta import (
+    TOP_COLUMNS, TOP_ORDER, TOP_ROWS, extend_companies_update, fetch_companies_update, frame_update, update_typed,
+)
+from finviz_bs import ROWS_PER_PAGE, screener_key
+from snapshot_store import get_store
+from frame_cache import company_cache
+from history import get_history
+from metrics import METRICS_PORT, histogram, start_http_server
+from normalize import (
+    CHART_METRICS, DERIVED_METRICS, SECTOR_METRICS, format_frame, normalize_companies, normalize_sectors,
+)
+from refresh_worker import start_in_process
 import logging
+import os
+import time
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-@st.cache_data
+# Upper bound on sectors fetched at once when several are selected together
+MAX_SECTOR_WORKERS = 4
+# Window of the sector trend chart
+TREND_DAYS = 90
+# Companies shown in each sector's chart
+CHART_COMPANIES = 10
+COMPANY_TABLE_METRICS = [col for col in TOP_COLUMNS if col not in ("Ticker", "Company")]
+# Upper bound on screener pages behind one sector view
+MAX_COMPANY_PAGES = 100
+# Sectors whose default view is loaded from disk when the process starts
+WARM_BOOT_SECTORS = 20
+# How long a finished page waits for the background refresh of what it shows.
+# Kept short: Streamlit only starts a rerun the user asked for at the next st
+# call, so a longer wait would hold up clicks. Refreshes that finish later
+# are picked up at the start of the session's next run.
+REFRESH_WAIT_SECONDS = 0.5
+
+RENDER_SECONDS = histogram("app_render_seconds", "Streamlit render time", ["component"])
+
+# Optionally keep every industry warm from this process (see refresh_worker.py)
+if os.environ.get("REFRESH_IN_PROCESS") == "1":
+    start_in_process()
+# Optionally expose the pipeline metrics for scraping (also on the Admin page)
+if METRICS_PORT:
+    start_http_server()
+
+# Short in-process caches on top of the shared snapshot store, which owns
+# freshness. Sector data is normalized to the typed schema once per load and
+# the display strings are rendered once from it. Any stored snapshot is shown
+# straight away, however old; a refresh runs in the background and is swapped
+# in at the end of the run (see swap_in_refreshes).
+@st.cache_data(ttl=60)
 def get_sector_data():
-    try:
-        url = "https://finviz.com/groups.ashx?g=industry&v=152&o=name&c=0,1,2,3,4,6,7,10,13,22,24,25,26"
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.114 Safari/537.36",
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-            "Accept-Language": "en-US,en;q=0.5",
-            "Referer": "https://finviz.com/",
-            "DNT": "1",
-            "Connection": "keep-alive",
-            "Upgrade-Insecure-Requests": "1",
-        }
-        
-        # Add a delay to avoid being blocked
-        time.sleep(1)
-        
-        res = requests.get(url, headers=headers)
-        if res.status_code != 200:
-            st.error(f"Failed to fetch data: HTTP {res.status_code}")
-            return pd.DataFrame({"Error": ["Failed to fetch data"]})
-            
-        soup = BeautifulSoup(res.text, "html.parser")
-        
-        # Try to find the table - first attempt with class="table-light"
-        table = soup.find("table", class_="table-light")
-        
-        # If that fails, try other common table classes or attributes
-        if table is None:
-            # Try finding any table with sector data
-            tables = soup.find_all("table")
-            for t in tables:
-                if t.find("td", text=lambda x: x and "Technology" in x):
-                    table = t
-                    break
-        
-        # If we still don't have a table, return empty DataFrame with error
-        if table is None:
-            st.error("Could not find sector data table on the page")
-            return pd.DataFrame({"Error": ["Table not found on page"]})
-        
-        rows = table.find_all("tr")[1:]  # Skip header row
-        data = []
-        for row in rows:
-            cols = row.find_all("td")
-            if len(cols) < 9: 
-                continue
-            
-            # Try to extract data safely
+    """
+    The typed sector table. When the refresh worker has stored a recent
+    universe scan, the table is derived from its company rows, with extra
+    statistics the groups page does not offer; otherwise it is the groups page.
+    attrs["snapshot_source"] names the snapshot it came from.
+    """
+    store = get_store()
+    universe = store.get("universe", TOP_ORDER)
+    if universe is not None and time.time() - universe.fetched_at <= universe.max_stale:
+        typed = industry_table(normalize_companies(universe.frame))
+        typed.attrs["snapshot_fetched_at"] = universe.fetched_at
+        typed.attrs["snapshot_source"] = ("universe", TOP_ORDER)
+        return typed
+    raw = store.get_or_fetch("groups", "industry", get_fetcher().sectors, serve_expired=True)
+    typed = normalize_sectors(raw)
+    typed.attrs["snapshot_fetched_at"] = raw.attrs.get("snapshot_fetched_at")
+    typed.attrs["snapshot_source"] = ("groups", "industry")
+    return typed
+
+
+@st.cache_data(ttl=60)
+def get_sector_display():
+    return format_frame(get_sector_data())
+
+
+@st.cache_data(ttl=60)
+def get_sector_trend(sectors, metric, source="groups", days=TREND_DAYS):
+    """A metric over the last days for the given sectors, read from the Parquet history."""
+    return get_history().sector_trend(sectors, metric, days, source)
+
+
+def load_company_data(sector, rows=TOP_ROWS):
+    """
+    The largest companies of a sector, shared by every session in this process.
+
+    finviz sorts by market cap and only the pages holding the first rows
+    companies are fetched, so the default view costs one upstream request.
+    Concurrent requests for the same view are coalesced into one load, which
+    reads the snapshot store and only scrapes finviz when that is cold. Refreshes
+    are incremental: when the snapshot moved on by one version, only the changed
+    tickers are normalized and patched into the previously cached frame.
+    """
+    key = screener_key(sector, TOP_ORDER, rows)
+
+    def load():
+        raw = get_store().get_or_fetch("screener", key, view_fetcher(sector, rows), incremental=True, serve_expired=True)
+        return update_typed(company_cache.peek(key), raw, sector)
+
+    return company_cache.get_or_load(key, load)
+
+
+def shorter_view(sector, rows):
+    """The stored view one page shorter than rows, if it is full and within max_stale, else None."""
+    if rows <= TOP_ROWS:
+        return None
+    base = get_store().get("screener", screener_key(sector, TOP_ORDER, rows - ROWS_PER_PAGE))
+    if base is None or len(base.frame) < rows - ROWS_PER_PAGE or time.time() - base.fetched_at > base.max_stale:
+        return None
+    return base
+
+
+def view_fetcher(sector, rows):
+    """
+    The incremental fetch function for a view: refreshes crawl it against its
+    previous snapshot, and a view first opened with "load more" only fetches
+    the page past the view one page shorter.
+    """
+    def fetch(previous):
+        base = shorter_view(sector, rows) if previous is None else None
+        if base is not None:
+            return extend_companies_update(sector, base, MAX_COMPANY_PAGES, TOP_ORDER, rows, TOP_COLUMNS)
+        return fetch_companies_update(sector, previous, MAX_COMPANY_PAGES, TOP_ORDER, rows, TOP_COLUMNS)
+
+    return fetch
+
+
+def is_cold(sector, rows=TOP_ROWS):
+    """
+    Whether a view has to be fetched from its first page: it is neither in
+    this process's cache nor in the snapshot store, and cannot be extended
+    from a stored shorter view.
+    """
+    key = screener_key(sector, TOP_ORDER, rows)
+    if company_cache.peek(key) is not None or key in get_store().info("screener"):
+        return False
+    return shorter_view(sector, rows) is None
+
+
+def stream_company_data(sector, rows, placeholder):
+    """
+    Load a cold view page by page, showing the companies received so far in
+    placeholder as each page arrives, then store it and return it like
+    load_company_data. Loads already running for the view, here or in
+    another process, are waited for instead.
+    """
+    key = screener_key(sector, TOP_ORDER, rows)
+
+    def load():
+        store = get_store()
+        if not store.acquire_lease("screener", key):
+            raw = store.get_or_fetch("screener", key, view_fetcher(sector, rows), incremental=True, serve_expired=True)
+        else:
             try:
-                sector = cols[1].text.strip() if len(cols) > 1 else "Unknown"
-                marketcap = cols[2].text.strip() if len(cols) > 2 else "N/A"
-                pe = cols[3].text.strip() if len(cols) > 3 else "N/A"
-                fwd_pe = cols[4].text.strip() if len(cols) > 4 else "N/A"
-                ps = cols[5].text.strip() if len(cols) > 5 else "N/A"
-                pb = cols[6].text.strip() if len(cols) > 6 else "N/A"
-                dividend = cols[7].text.strip() if len(cols) > 7 else "N/A"
-                sales_growth = cols[8].text.strip() if len(cols) > 8 else "N/A"
-                volume = cols[9].text.strip() if len(cols) > 9 else "N/A"
-                
-                data.append({
-                    "Sector": sector,
-                    "Market cap": marketcap,
-                    "P/E": pe,
-                    "Fwd P/E": fwd_pe,
-                    "P/S": ps,
-                    "P/B": pb,
-                    "Dividend": dividend,
-                    "Sales 5Y growth": sales_growth,
-                    "Avg. volume": volume
-                })
-            except Exception as e:
-                st.warning(f"Error parsing row: {e}")
-                continue
-                
-        if not data:
-            return pd.DataFrame({"Error": ["No data found in table"]})
-            
-        return pd.DataFrame(data)
-        
-    except Exception as e:
-        st.error(f"Error fetching sector data: {e}")
-        return pd.DataFrame({"Error": [str(e)]})
+                raw = stream_view(sector, rows, placeholder)
+            except BaseException:
+                # Including Streamlit's rerun/stop exceptions when the user clicks mid-stream
+                store.release_lease("screener", key)
+                raise
+        return update_typed(company_cache.peek(key), raw, sector)
+
+    return company_cache.get_or_load(key, load)
+
+
+def stream_view(sector, rows, placeholder):
+    """Fetch a view page by page into the snapshot store, rendering progress. Returns the stored raw frame."""
+    key = screener_key(sector, TOP_ORDER, rows)
+    store = get_store()
+    batches = []
+    shown = []
+    for batch in get_fetcher().iter_companies(sector, MAX_COMPANY_PAGES, TOP_ORDER, rows, TOP_COLUMNS):
+        batches.append(batch)
+        typed = normalize_companies(batch, sector)
+        if typed.empty:
+            continue
+        columns = ["Ticker", "Company"] + [col for col in COMPANY_TABLE_METRICS if col in typed.columns]
+        shown.append(format_frame(typed[columns]))
+        with placeholder.container():
+            st.caption(f"Loading {sector}: {sum(map(len, shown))} companies so far...")
+            st.dataframe(pd.concat(shown, ignore_index=True), use_container_width=True, hide_index=True)
+
+    raw = pd.concat(batches, ignore_index=True).head(rows) if batches else pd.DataFrame()
+    if not store.save("screener", key, frame_update(raw)):
+        return pd.DataFrame({"Error": ["Failed to fetch data"]})
+    return store.get("screener", key).frame
+
+
+@st.cache_resource
+def prefetch_pool():
+    """Process-wide workers that load sectors the user has selected but is not viewing."""
+    return ThreadPoolExecutor(max_workers=MAX_SECTOR_WORKERS, thread_name_prefix="prefetch")
+
+
+# Render units for a company view. Each is cached by the view's snapshot
+# version, so a rerun only recomputes what its inputs changed: the display
+# table when the data changes, the chart data when the data or metric does.
+@st.cache_data(max_entries=256)
+def top_companies(sector, version, rows, _company_df):
+    """Largest companies by market cap, recomputed only when the view's snapshot version changes."""
+    return _company_df.dropna(subset=["Market cap"]).nlargest(rows, "Market cap")
+
+
+@st.cache_data(max_entries=256)
+def company_display(sector, version, rows, _company_df):
+    """Formatted table of the largest companies."""
+    top = top_companies(sector, version, rows, _company_df)
+    display_columns = ["Ticker", "Company"] + [col for col in COMPANY_TABLE_METRICS if col in top.columns]
+    return format_frame(top[display_columns])
+
+
+@st.cache_data(max_entries=1024)
+def company_chart_data(sector, version, rows, metric, _company_df):
+    """The chart series for one metric of the largest companies."""
+    top = top_companies(sector, version, rows, _company_df)
+    return top.head(CHART_COMPANIES).set_index("Ticker")[metric]
+
+
+@st.cache_resource
+def warm_boot():
+    """
+    Once per process, load the most popular sectors' default views from the
+    snapshot store into memory, so the first sessions after a deploy never
+    wait for finviz. Expired snapshots are refreshed in the background.
+    """
+    for sector, _ in sorted(get_store().popularity("screener").items(), key=lambda item: -item[1])[:WARM_BOOT_SECTORS]:
+        prefetch_pool().submit(load_company_data, sector)
+    return True
+
+
+def newer_snapshots(served, timeout=0):
+    """
+    The snapshots shown in a run that have since been replaced in the store.
+
+    Args:
+        served (list): (endpoint, key, fetched_at of the frame shown) tuples
+        timeout (float): Seconds to wait, in total, for this process's
+            background refreshes of them to finish
+
+    Returns:
+        list: (endpoint, key) tuples
+    """
+    store = get_store()
+    deadline = time.monotonic() + timeout
+    info = {}
+    newer = []
+    for endpoint, key, fetched_at in served:
+        if fetched_at is None:
+            continue
+        if timeout and not store.wait_for_refresh(endpoint, key, max(0, deadline - time.monotonic())):
+            continue
+        if endpoint not in info:
+            info[endpoint] = store.info(endpoint)
+        current = info[endpoint].get(key)
+        if current is not None and current[0] > fetched_at:
+            newer.append((endpoint, key))
+    return newer
+
+
+def expire_views(snapshots):
+    """Drop the in-memory copies of snapshots so the next read picks up the stored ones."""
+    for endpoint, key in snapshots:
+        if endpoint in ("groups", "universe"):
+            get_sector_data.clear()
+            get_sector_display.clear()
+        else:
+            company_cache.expire(key)
+
+
+def swap_in_refreshes(served):
+    """
+    After the page has rendered, wait briefly for background refreshes of the
+    data it showed and rerun if newer snapshots were stored meanwhile.
+
+    Args:
+        served (list): (endpoint, key, fetched_at of the frame shown) tuples
+    """
+    newer = newer_snapshots(served, REFRESH_WAIT_SECONDS)
+    if newer:
+        expire_views(newer)
+        st.rerun()
+
+
+def load_more(sector):
+    st.session_state.company_rows[sector] = st.session_state.company_rows.get(sector, TOP_ROWS) + ROWS_PER_PAGE
+
+
+def render_company_tab(sector, company_df, metric_to_plot, rows=TOP_ROWS):
+    """Render the top-companies table and chart for one sector tab."""
+    with RENDER_SECONDS.time(component="company_tab"):
+        _render_company_tab(sector, company_df, metric_to_plot, rows)
+
+
+def _render_company_tab(sector, company_df, metric_to_plot, rows):
+    if company_df is None or company_df.empty:
+        st.warning(f"No company data available for {sector}")
+    else:
+        if "Error" in company_df.columns:
+            st.warning(f"Company data for {sector} could not be loaded: {company_df['Error'].iloc[0]}")
+        else:
+            # See if we have the same metric as above for plotting; a derived
+            # statistic such as Median P/E is charted from its company column
+            company_metric = AGGREGATES[metric_to_plot].column if metric_to_plot in DERIVED_METRICS else metric_to_plot
+            if company_metric not in company_df.columns:
+                # Find the first available metric
+                for m in COMPANY_TABLE_METRICS:
+                    if m in company_df.columns:
+                        company_metric = m
+                        st.info(f"{metric_to_plot} is not available for companies. Showing {company_metric} instead.")
+                        break
+
+            # Largest companies first; the metric columns are already numeric
+            version = company_df.attrs.get("snapshot_version")
+            display_df = company_display(sector, version, rows, company_df)
+            if not display_df.empty:
+                st.write(f"Top {len(display_df)} companies by market cap")
+                st.dataframe(display_df, use_container_width=True, hide_index=True)
+                st.bar_chart(
+                    data=company_chart_data(sector, version, rows, company_metric, company_df),
+                    use_container_width=True,
+                )
+                # A full view means finviz may have more; fetch the next page only on request
+                if len(company_df) >= rows:
+                    st.button(
+                        f"Load {ROWS_PER_PAGE} more", key=f"load-more-{sector}", on_click=load_more, args=(sector,),
+                    )
+            else:
+                st.warning(f"No valid company data available for {sector} with {company_metric} values")
+
 
 # Main app
+run_started = time.perf_counter()
 st.title("US Stock Market Sector Multiples")
 st.write("This app shows valuation multiples for different market sectors.")
-st.caption(f"Last updated: {pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')}")
+as_of = st.empty()
+warm_boot()
 
 if "previous_sectors" not in st.session_state:
     st.session_state.previous_sectors = []
-if "company_data" not in st.session_state:
-    st.session_state.company_data = {}  # sector -> DataFrame
+if "company_rows" not in st.session_state:
+    st.session_state.company_rows = {}  # sector -> rows requested
+# Refreshes that finished after the previous run stopped waiting for them
+expire_views(newer_snapshots(st.session_state.get("served", [])))
+# (endpoint, key, fetched_at) of every snapshot shown in this run
+served = []
 
 # Add a loading spinner
 with st.spinner("Fetching sector data..."):
     df = get_sector_data()
+served.append(df.attrs.get("snapshot_source", ("groups", "industry")) + (df.attrs.get("snapshot_fetched_at"),))
+if df.attrs.get("snapshot_fetched_at"):
+    fetched = pd.Timestamp(df.attrs["snapshot_fetched_at"], unit="s").strftime('%Y-%m-%d %H:%M:%S')
+    as_of.caption(f"Data as of {fetched} UTC")
 
 # Check if we got valid data
 if "Error" in df.columns:
     st.error("Failed to retrieve sector data. Please try again later.")
 else:
     # Display the data
-    st.dataframe(df.reset_index(drop=True), use_container_width=True, hide_index=True)
+    st.dataframe(get_sector_display().reset_index(drop=True), use_container_width=True, hide_index=True)
     if not df.empty:
         # Add visualization section
         st.subheader("Sector Comparison Visualization")
         
-        # Convert metrics to numeric values for plotting
-        numeric_df = df.copy()
-        # Define sector metrics
-        sector_metrics = ["Market cap", "P/E", "P/S", "P/B", "Dividend", "Sales 5Y growth", "Avg. volume"]
-        
-        for col in sector_metrics:
-            if col in numeric_df.columns:
-                formatted_col = col + "_formatted"
-                numeric_df[formatted_col] = df[col].copy()
-                numeric_df[col] = (
-                    numeric_df[col]
-                    .str.replace(",", "", regex=False)
-                    .str.replace("%", "", regex=False)
-                    .str.replace("B", "", regex=False)
-                    .str.replace("M", "", regex=False)
-                    .str.replace("K", "", regex=False)
-                    .replace("N/A", None)
-                )
-                numeric_df[col] = pd.to_numeric(numeric_df[col], errors='coerce')
-        
+        # Metrics are already numeric in the typed sector frame
+        numeric_df = df
+        # Define sector metrics; margins and the derived statistics are only
+        # in a table derived from company data
+        sector_metrics = [metric for metric in CHART_METRICS + DERIVED_METRICS if metric in numeric_df.columns]
+
         # Create two columns for the controls
         col1, col2 = st.columns(2)
         
@@ -162,137 +398,75 @@ else:
                 # Sort by the selected metric for better visualization
                 comparison_df = comparison_df.sort_values(by=metric_to_plot, ascending=False)
                 
-                # Create the bar chart
-                st.bar_chart(
-                    data=comparison_df.set_index("Sector")[metric_to_plot],
-                    use_container_width=True
-                )
+                chart_col, trend_col = st.columns(2)
+                with chart_col:
+                    # Create the bar chart
+                    st.bar_chart(
+                        data=comparison_df.set_index("Sector")[metric_to_plot],
+                        use_container_width=True
+                    )
+                with trend_col:
+                    # The same metric over time, from the recorded history
+                    if metric_to_plot in SECTOR_METRICS:
+                        # Only the history of the table's own source, so the line does not jump between the two
+                        source = df.attrs.get("snapshot_source", ("groups", "industry"))[0]
+                        trend_df = get_sector_trend(tuple(sectors_to_compare), metric_to_plot, source)
+                    else:
+                        trend_df = pd.DataFrame()
+                    if len(trend_df) > 1:
+                        st.line_chart(data=trend_df, use_container_width=True)
+                    else:
+                        st.caption(f"Not enough history yet for a {TREND_DAYS}-day trend.")
                 
-                # Display a table with the values for reference
-                display_comparison_df = comparison_df.copy()
-                for metric in sector_metrics:
-                    metric_formatted = metric + "_formatted"
-                    display_comparison_df[metric] = comparison_df[metric_formatted]
+                # Display a table with the values for reference, formatted from
+                # the compared rows so both always come from the same snapshot
                 st.write("Comparison Values:")
                 st.dataframe(
-                    display_comparison_df[["Sector", metric_to_plot]].reset_index(drop=True),
+                    format_frame(comparison_df[["Sector", metric_to_plot]]).reset_index(drop=True),
                     use_container_width=True,
                     hide_index=True
                 )
-                #df = df.drop(columns=[col for col in df.columns if "_formatted" in col])
         else:
             st.info("Please select at least one sector to visualize")
 
 
         if sectors_to_compare and len(sectors_to_compare) > 0:
             # Step 1: See which new sectors are selected
-            new_sectors = list(set(sectors_to_compare) - set(st.session_state.previous_sectors))
-            for sector in new_sectors:
-                with st.spinner(f"Fetching company data for {sector}..."):
-                    st.session_state.company_data[sector] = get_companies_by_industry_bs(sector, 100)
+            new_sectors = [s for s in sectors_to_compare if s not in st.session_state.previous_sectors]
             st.session_state.previous_sectors = sectors_to_compare
-            # Step 2: Remove unselected sectors from memory
-            for sector in list(st.session_state.company_data.keys()):
+            # Count the selections so the refresh scheduler warms popular sectors first
+            for sector in new_sectors:
+                get_store().record_access("screener", sector)
+            # Step 2: Forget row counts of unselected sectors (the frames stay in the shared cache)
+            for sector in list(st.session_state.company_rows.keys()):
                 if sector not in sectors_to_compare:
-                    del st.session_state.company_data[sector]
-            
-            # Step 2.5: Ensure all sectors have formatted columns
-            for sector in sectors_to_compare:
-                company_df = st.session_state.company_data.get(sector)
-                if company_df is not None and not company_df.empty and "Error" not in company_df.columns:
-                    # Create formatted columns for all metrics if they don't exist
-                    company_metrics = ["Market cap", "P/E", "Fwd P/E", "P/S", "P/B", "Dividend", "Sales 5Y growth", "Sales"]
-                    for col in company_metrics:
-                        if col in company_df.columns and f"{col}_numerical" not in company_df.columns:
-                            company_df[f"{col}_numerical"] = company_df[col].copy()
-                    st.session_state.company_data[sector] = company_df
-            
-            # Step 3: Render tabs for all selected sectors
-            tabs = st.tabs(sectors_to_compare)
-            for i, sector in enumerate(sectors_to_compare):
-                company_df = st.session_state.company_data.get(sector)
-                with tabs[i]:
-                    if company_df is None or company_df.empty:
-                        st.warning(f"No company data available for {sector}")
+                    del st.session_state.company_rows[sector]
+
+            # Step 3: Render only the sector being viewed. Hidden sectors cost
+            # nothing on a rerun, however many are selected.
+            active = st.radio("Companies in", sectors_to_compare, horizontal=True, key="active_sector")
+            rows = st.session_state.company_rows.get(active, TOP_ROWS)
+            with st.spinner(f"Fetching company data for {active}..."):
+                try:
+                    if is_cold(active, rows):
+                        # Nothing stored yet: show each page as it arrives
+                        progress = st.empty()
+                        company_df = stream_company_data(active, rows, progress)
+                        progress.empty()
                     else:
-                        if "Error" in company_df.columns:
-                            st.warning(f"Company data for {sector} could not be loaded: {company_df['Error'].iloc[0]}")
-                        else:
-                            # Process the company data
-                            company_metrics = ["Market cap", "P/E", "Fwd P/E", "P/S", "P/B", "Dividend", "Sales 5Y growth", "Sales"]
-                            # First, create a copy of the original formatted values
-                            for col in company_metrics:
-                                if col in company_df.columns:
-                                    # Create a new column for the formatted display values
-                                    company_df[f"{col}_numerical"] = company_df[col].copy()
-                            # Then convert to numeric for sorting and calculations
-                            for col in company_metrics:
-                                if col in company_df.columns:
-                                    numerical_col = col + "_numerical"
-                                    # For columns that might have B/M suffixes (Market cap, Sales)
-                                    if col in ["Market cap", "Sales", "Avg. volume"]:
-                                        # Convert values to numeric with proper scaling
-                                        def convert_value(val):
-                                            if isinstance(val, str):
-                                                val = val.replace(",", "")
-                                                if "B" in val:
-                                                    return float(val.replace("B", "")) * 1000  # Convert B to M for consistent scale
-                                                elif "M" in val:
-                                                    return float(val.replace("M", ""))
-                                                elif "K" in val:
-                                                    return float(val.replace("K", "")) / 1000  # Convert K to M
-                                                else:
-                                                    try:
-                                                        return float(val) / 1000000  # Convert raw numbers to M
-                                                    except:
-                                                        return None
-                                            return val
-                                        company_df[numerical_col] = company_df[col].apply(convert_value)
-                                    else:
-                                        # For other metrics, just remove % and convert to numeric
-                                        try:
-                                            company_df[numerical_col] = (
-                                                company_df[col]
-                                                .str.replace(",", "", regex=False)
-                                                .str.replace("%", "", regex=False)
-                                                .replace("N/A", None)
-                                            )
-                                            company_df[numerical_col] = pd.to_numeric(company_df[numerical_col], errors='coerce')
-                                        except Exception as e:
-                                            pass
-                            
-                            # See if we have the same metric as above for plotting
-                            company_metric = metric_to_plot
-                            if metric_to_plot not in company_df.columns:
-                                # Find the first available metric
-                                for m in company_metrics:
-                                    if m in company_df.columns:
-                                        company_metric = m
-                                        st.info(f"{metric_to_plot} is not available for companies. Showing {company_metric} instead.")
-                                        break
-                            
-                            # Sort by the numerical version of Market cap
-                            top_companies = company_df.sort_values(by="Market cap_numerical", ascending=False).dropna(subset=["Market cap_numerical"]).head(10)
-                            if not top_companies.empty:
-                                st.write(f"Top 10 companies by market cap")
-                                # Create a display dataframe with formatted values
-                                display_df = top_companies[["Ticker", "Company"]].copy()
-                                
-                                # Add formatted columns where available
-                                for col in company_metrics:
-                                    if f"{col}" in top_companies.columns:
-                                        logger.info(f"Displaying formatted: {top_companies['Market cap']}")
-                                        display_df[col] = top_companies[f"{col}"]
-                                    elif col in top_companies.columns:
-                                        display_df[col] = top_companies[col]
-                                
-                                st.dataframe(display_df, use_container_width=True, hide_index=True)
-                                
-                                # Use the numerical version of the metric for the bar chart
-                                chart_metric = company_metric + "_numerical" if company_metric + "_numerical" in top_companies.columns else company_metric
-                                st.bar_chart(data=top_companies.set_index("Ticker")[chart_metric], use_container_width=True)
-                            else:
-                                st.warning(f"No valid company data available for {sector} with {company_metric} values")
+                        company_df = load_company_data(active, rows)
+                except Exception as e:
+                    logger.error(f"Error fetching company data for {active}: {e}")
+                    company_df = pd.DataFrame({"Error": [str(e)]})
+
+            # Step 4: Load the other new sectors in the background, so switching
+            # to them is instant. Only now: a prefetch of the active sector
+            # would claim its load first and keep a cold view from streaming.
+            for sector in new_sectors:
+                if sector != active:
+                    prefetch_pool().submit(load_company_data, sector, st.session_state.company_rows.get(sector, TOP_ROWS))
+            served.append(("screener", screener_key(active, TOP_ORDER, rows), company_df.attrs.get("snapshot_fetched_at")))
+            render_company_tab(active, company_df, metric_to_plot, rows)
     else:
         st.warning(f"No valid numeric data available for {metric_to_plot} in the selected sectors")
         
@@ -313,3 +487,7 @@ else:
     - **Profit Margin**: Net income divided by revenue - measures overall profitability
     - **Avg. volume**: Average trading volume - indicates stock's liquidity and trading activity
     """)
+
+RENDER_SECONDS.observe(time.perf_counter() - run_started, component="script")
+st.session_state.served = served
+swap_in_refreshes(served)
@@ -0,0 +1,193 @@
+"""
+Offline benchmarks for the finviz parsing and normalization pipeline.
+
+Runs against the HTML fixtures in benchmarks/fixtures (see record_fixtures.py)
+and never touches the network. The committed fixtures follow finviz's markup
+with illustrative values (Semiconductors largest first, as -marketcap sorts
+them); record_fixtures.py replaces them with live pages. Each case is timed in separate stages:
+
+    parse      HTML -> column lists (finviz_parse, per backend)
+    frame      column lists -> raw DataFrame
+    normalize  raw DataFrame -> typed frame (normalize.py)
+    format     typed frame -> display strings
+
+Cases are the recorded groups page and the screener page resized to 1, 20
+and 10,000 rows. Timings are divided by a fixed reference workload measured
+in the same run, so the stored baseline carries over between machines of
+different speed.
+
+Usage:
+
+    python benchmarks/bench.py                    # compare against baseline.json
+    python benchmarks/bench.py --update-baseline  # record a new baseline
+    python benchmarks/bench.py --backends lxml,bs4
+
+Exits with status 1 if any stage is slower than its baseline by more than
+--tolerance.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from finviz_parse import GROUPS_SPEC, SCREENER_SPEC, parse_table  # noqa: E402
+from normalize import format_frame, normalize_companies, normalize_sectors  # noqa: E402
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_DIR = os.path.join(BENCH_DIR, "fixtures")
+BASELINE_PATH = os.path.join(BENCH_DIR, "baseline.json")
+
+SCREENER_SIZES = [1, 20, 10000]
+# Allowed slowdown relative to the baseline before a stage counts as a regression
+DEFAULT_TOLERANCE = 0.5
+DEFAULT_REPEAT = 5
+# Stages faster than this are reported but never fail the run; at sub-millisecond
+# scale the timer and interpreter noise outweighs any real change
+NOISE_FLOOR_SECONDS = 0.005
+
+_ROW_PATTERN = re.compile(r"<tr\b[^>]*>.*?</tr>", re.S)
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def resize_screener(html, rows):
+    """The screener fixture with its data rows repeated or cut to the given count."""
+    start = html.index("<tbody>") + len("<tbody>")
+    end = html.index("</tbody>", start)
+    recorded = _ROW_PATTERN.findall(html[start:end])
+    body = "\n".join(recorded[i % len(recorded)] for i in range(rows))
+    return html[:start] + "\n" + body + "\n" + html[end:]
+
+
+def cases():
+    """(name, html, spec, normalizer) for every benchmark case."""
+    screener = load_fixture("screener.html")
+    yield "groups", load_fixture("groups.html"), GROUPS_SPEC, normalize_sectors
+    for rows in SCREENER_SIZES:
+        yield f"screener-{rows}", resize_screener(screener, rows), SCREENER_SPEC, normalize_companies
+
+
+def _time(fn, repeat):
+    """Best wall time of fn over repeat runs, and its last result."""
+    samples = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - started)
+    # The minimum is the least noisy estimate of the cost itself
+    return min(samples), result
+
+
+def calibrate(repeat=DEFAULT_REPEAT):
+    """Seconds taken by a fixed mix of Python and pandas work on this machine."""
+    def workload():
+        total = 0
+        for i in range(200000):
+            total += i % 7
+        frame = pd.DataFrame({"a": [f"{i}.5M" for i in range(20000)]})
+        frame["a"].str.extract(r"([\d.]+)([BMK]?)")
+        return total
+    seconds, _ = _time(workload, repeat * 2)
+    return seconds
+
+
+def run(backends, repeat=DEFAULT_REPEAT):
+    """
+    Time every stage of every case.
+
+    Returns:
+        dict: {"case/stage": seconds}
+    """
+    results = {}
+    for name, html, spec, normalizer in cases():
+        # The 10,000-row case dominates the run time; fewer repeats keep it short
+        rounds = max(1, repeat // 2) if len(html) > 1_000_000 else repeat
+        for backend in backends:
+            seconds, parsed = _time(lambda: parse_table(html, spec, backend), rounds)
+            results[f"{name}/parse-{backend}"] = seconds
+        columns, _ = parsed
+        seconds, raw = _time(lambda: pd.DataFrame(columns), rounds)
+        results[f"{name}/frame"] = seconds
+        seconds, typed = _time(lambda: normalizer(raw), rounds)
+        results[f"{name}/normalize"] = seconds
+        seconds, _ = _time(lambda: format_frame(typed), rounds)
+        results[f"{name}/format"] = seconds
+    return results
+
+
+def compare(results, reference, baseline, tolerance):
+    """
+    Stages slower than the baseline by more than tolerance.
+
+    Returns:
+        list: (stage, relative time now, relative time in the baseline) tuples
+    """
+    regressions = []
+    for stage, seconds in results.items():
+        expected = baseline["stages"].get(stage)
+        if expected is None:
+            continue
+        relative = seconds / reference
+        if seconds < NOISE_FLOOR_SECONDS:
+            continue
+        if relative > expected * (1 + tolerance):
+            regressions.append((stage, relative, expected))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline finviz parsing and normalization benchmarks.")
+    parser.add_argument("--backends", default="lxml", help="comma-separated parser backends to time")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true", help="store this run as the new baseline")
+    args = parser.parse_args()
+
+    reference = calibrate(args.repeat)
+    results = run(args.backends.split(","), args.repeat)
+
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    print(f"{'stage':<32}{'ms':>10}{'relative':>10}{'baseline':>10}")
+    for stage, seconds in results.items():
+        expected = baseline["stages"].get(stage) if baseline else None
+        shown = f"{expected:.3f}" if expected is not None else "-"
+        print(f"{stage:<32}{seconds * 1000:>10.2f}{seconds / reference:>10.3f}{shown:>10}")
+    print(f"reference workload: {reference * 1000:.2f} ms")
+
+    if args.update_baseline:
+        # Merge, so a run with fewer backends keeps the other stages
+        stages = dict(baseline["stages"]) if baseline else {}
+        stages.update({stage: round(seconds / reference, 4) for stage, seconds in results.items()})
+        with open(args.baseline, "w") as f:
+            json.dump({"stages": dict(sorted(stages.items()))}, f, indent=2)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if baseline is None:
+        print("No baseline found; run with --update-baseline to create one")
+        return 0
+
+    regressions = compare(results, reference, baseline, args.tolerance)
+    for stage, relative, expected in regressions:
+        print(f"REGRESSION {stage}: {relative:.3f} vs baseline {expected:.3f} (+{relative / expected - 1:.0%})")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
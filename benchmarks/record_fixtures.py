@@ -0,0 +1,46 @@
+"""
+Re-record the benchmark fixtures from the live finviz site.
+
+Saves the industry groups page and the first page of one industry's screener
+to benchmarks/fixtures, so bench.py keeps measuring the markup finviz
+actually serves. Run it by hand when the layout changes, then refresh the
+baseline:
+
+    python benchmarks/record_fixtures.py --industry Semiconductors
+    python benchmarks/bench.py --update-baseline
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from finviz_bs import GROUPS_HEADERS, GROUPS_URL, fetch, screener_url  # noqa: E402
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def record(name, url, headers=None):
+    res = fetch(url, headers=headers)
+    if res is None or res.status_code != 200:
+        status = res.status_code if res is not None else "no response"
+        print(f"Could not record {name}: HTTP {status}")
+        return False
+    with open(os.path.join(FIXTURES_DIR, name), "w", encoding="utf-8") as f:
+        f.write(res.text)
+    print(f"Recorded {name} ({len(res.text)} bytes)")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record finviz pages as benchmark fixtures.")
+    parser.add_argument("--industry", default="Semiconductors", help="industry for the screener fixture")
+    args = parser.parse_args()
+
+    ok = record("groups.html", GROUPS_URL, GROUPS_HEADERS)
+    ok = record("screener.html", screener_url(args.industry)) and ok
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,184 @@
+"""
+Incremental updates of company snapshots.
+
+A refresh re-fetches every screener page of an industry, but only pages whose
+table markup changed are parsed again (see finviz_bs.crawl_companies). The
+resulting ticker-level delta is stored with the snapshot, so a process that
+already holds the previous typed frame can patch it instead of normalizing
+the whole industry again, and only the industries that actually changed get
+a new snapshot version. Views filled from a universe scan or a streamed
+load carry the same ticker delta, computed against the stored frame.
+"""
+import logging
+
+import pandas as pd
+
+from fetcher import get_fetcher
+from finviz_bs import ROWS_PER_PAGE, changed_tickers
+from normalize import CHART_METRICS, COMPANY_METRICS, normalize_companies
+from snapshot_store import SnapshotUpdate
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# The view the app opens with: largest companies first, one screener page,
+# the columns the company table shows and every metric the app can chart
+TOP_ORDER = "-marketcap"
+TOP_ROWS = ROWS_PER_PAGE
+TOP_COLUMNS = ["Ticker", "Company"] + [
+    col for col in COMPANY_METRICS if col in CHART_METRICS or col in ("Fwd P/E", "Sales")
+]
+
+
+def fetch_companies_update(industry, previous=None, max_pages=5, order=None, limit=None, columns=None):
+    """
+    Crawl an industry against its previous snapshot.
+
+    Args:
+        industry (str): Industry name to fetch data for
+        previous (Snapshot): The stored snapshot, or None when cold
+        max_pages (int): Maximum number of pages to fetch
+        order (str): finviz sort order, e.g. "-marketcap"
+        limit (int): Only fetch the pages holding the first limit rows
+        columns (list): Only request these columns
+
+    Returns:
+        SnapshotUpdate: The full raw frame, the page digests plus the ticker
+        delta as metadata, and whether anything changed
+    """
+    previous_frame = previous.frame if previous is not None else None
+    previous_pages = previous.meta.get("pages") if previous is not None else None
+    result = get_fetcher().crawl(
+        industry, max_pages, previous=previous_frame, previous_pages=previous_pages, order=order, limit=limit,
+        columns=columns,
+    )
+
+    # Unchanged means every page's table hashed the same as last time
+    changed = previous is None or [page[0] for page in result.pages] != [page[0] for page in previous_pages or []]
+    meta = {
+        "pages": result.pages,
+        # The version this delta applies to; put() stores the update as base_version + 1
+        "base_version": previous.version if previous is not None else 0,
+        "changed": sorted(result.changed),
+        "removed": sorted(result.removed),
+    }
+    if previous is not None:
+        logger.info(
+            f"{industry}: {len(result.changed)} changed and {len(result.removed)} removed tickers"
+        )
+    return SnapshotUpdate(result.frame, meta, changed)
+
+
+def extend_companies_update(industry, base, max_pages=5, order=None, limit=None, columns=None):
+    """
+    Fetch a view one or more pages deeper than a stored one, e.g. after
+    "load more": only the pages past base are requested, and base's rows are
+    kept in front of them.
+
+    Args:
+        industry (str): Industry name to fetch data for
+        base (Snapshot): The stored shorter view, holding whole pages
+        max_pages (int): Maximum number of pages to fetch
+        order (str): finviz sort order, e.g. "-marketcap"
+        limit (int): Rows in the deeper view
+        columns (list): Only request these columns
+
+    Returns:
+        SnapshotUpdate: Like fetch_companies_update for a cold view
+    """
+    first_page = len(base.frame) // ROWS_PER_PAGE
+    result = get_fetcher().crawl(industry, max_pages, order=order, limit=limit, columns=columns, first_page=first_page)
+    if "Error" in result.frame.columns:
+        return SnapshotUpdate(result.frame, None, True)
+
+    # A company that moved up a page between the two fetches would be listed twice
+    frame = pd.concat([base.frame, result.frame], ignore_index=True).drop_duplicates("Ticker", ignore_index=True)
+    base_pages = base.meta.get("pages") or []
+    meta = {
+        # Page digests only if base's are complete, else the next crawl parses every page
+        "pages": base_pages + result.pages if len(base_pages) == first_page else [],
+        "base_version": 0,
+        "changed": sorted(frame["Ticker"]),
+        "removed": [],
+    }
+    logger.info(f"{industry}: extended a {len(base.frame)}-row view with {len(result.frame)} rows")
+    return SnapshotUpdate(frame, meta, True)
+
+
+def frame_update(frame, previous=None):
+    """
+    SnapshotUpdate for a view fetched without page digests: filled from a
+    universe scan or loaded page by page.
+
+    Args:
+        frame (pd.DataFrame): The view's raw rows
+        previous (Snapshot): The stored snapshot, or None when cold
+
+    Returns:
+        SnapshotUpdate: Like fetch_companies_update, without page digests, so
+        the next per-industry crawl of the view parses every page again
+    """
+    previous_frame = previous.frame if previous is not None else None
+    changed = changed_tickers(previous_frame, frame)
+    removed = set(previous_frame["Ticker"]) - set(frame["Ticker"]) if previous is not None else set()
+    moved = previous is None or previous_frame["Ticker"].tolist() != frame["Ticker"].tolist()
+    meta = {
+        "pages": [],
+        "base_version": previous.version if previous is not None else 0,
+        "changed": sorted(changed),
+        "removed": sorted(removed),
+    }
+    return SnapshotUpdate(frame, meta, bool(moved or changed))
+
+
+def update_typed(previous_typed, raw, industry=None):
+    """
+    Typed company frame for a raw snapshot frame, reusing the previous typed frame.
+
+    When previous_typed is the version the snapshot's delta was computed
+    against, only the changed rows are normalized and spliced in. Otherwise
+    the whole frame is normalized.
+
+    Args:
+        previous_typed (pd.DataFrame): Typed frame held from an earlier load, or None
+        raw (pd.DataFrame): Frame returned by the snapshot store
+        industry (str): Industry name for the categorical Industry column
+
+    Returns:
+        pd.DataFrame: Typed frame with attrs["snapshot_version"] and
+        attrs["snapshot_fetched_at"] set
+    """
+    version = raw.attrs.get("snapshot_version")
+    meta = raw.attrs.get("snapshot_meta", {})
+    previous_version = previous_typed.attrs.get("snapshot_version") if previous_typed is not None else None
+
+    if version is not None and previous_version == version:
+        # An unchanged refresh moves the fetch time but not the version
+        previous_typed.attrs["snapshot_fetched_at"] = raw.attrs.get("snapshot_fetched_at")
+        return previous_typed
+
+    if (
+        version is not None
+        and previous_version is not None
+        and meta.get("base_version") == previous_version
+        and "Error" not in previous_typed.columns
+        and "Error" not in raw.columns
+    ):
+        changed = set(meta.get("changed", []))
+        dropped = changed | set(meta.get("removed", []))
+        kept = previous_typed[~previous_typed["Ticker"].isin(dropped)]
+        fresh = normalize_companies(raw[raw["Ticker"].isin(changed)], industry)
+        typed = pd.concat([kept, fresh], ignore_index=True) if not fresh.empty else kept.reset_index(drop=True)
+        if industry is not None:
+            typed["Industry"] = pd.Categorical([industry] * len(typed))
+        # Keep the upstream row order
+        order = pd.Series(range(len(raw)), index=raw["Ticker"].to_numpy())
+        order = order[~order.index.duplicated()]
+        typed = typed.iloc[order.reindex(typed["Ticker"]).to_numpy().argsort(kind="stable")].reset_index(drop=True)
+        logger.info(f"Applied delta for {industry}: {len(changed)} rows updated, {len(dropped - changed)} removed")
+    else:
+        typed = normalize_companies(raw, industry)
+
+    typed.attrs = {"snapshot_version": version, "snapshot_fetched_at": raw.attrs.get("snapshot_fetched_at")}
+    return typed
@@ -0,0 +1,304 @@
+"""
+Single entry point for scraping finviz, over HTTP or a headless browser.
+
+The plain HTTP scraper (finviz_bs) is cheap and handles normal traffic. When
+finviz starts refusing it (403/429 after retries, or a page without the data
+table, e.g. a captcha), the request is retried in the pooled Playwright
+browser (finviz_playwright). A per-host circuit breaker remembers that HTTP
+is blocked, so following requests go straight to the browser until a
+cool-down has passed and a single probe request shows HTTP works again.
+
+Both backends parse with finviz_parse and return the same columns; failures
+come back as the usual "Error" frames.
+"""
+import logging
+import os
+import threading
+import time
+from urllib.parse import urlparse
+
+import pandas as pd
+
+from finviz_bs import (
+    GROUPS_URL, ROWS_PER_PAGE, UNIVERSE_MAX_PAGES, CrawlResult, UniverseResult, changed_tickers, crawl_companies,
+    get_sector_data_bs, iter_companies, pages_for, scan_universe, screener_url, universe_url,
+)
+from metrics import counter
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Consecutive blocked HTTP requests that trip the breaker
+BREAKER_FAILURES = int(os.environ.get("FETCH_BREAKER_FAILURES", "2"))
+# Seconds the breaker stays open before HTTP is probed again
+BREAKER_RESET_SECONDS = float(os.environ.get("FETCH_BREAKER_RESET", "600"))
+# Set to 0 to never fall back to the browser (e.g. where Chromium is not installed)
+BROWSER_FALLBACK = os.environ.get("FETCH_BROWSER_FALLBACK", "1") == "1"
+
+BACKEND_REQUESTS = counter(
+    "fetcher_requests_total", "Fetcher calls by backend and outcome (ok, blocked, error)", ["backend", "outcome"],
+)
+BREAKER_TRANSITIONS = counter("fetcher_breaker_transitions_total", "Circuit breaker state changes", ["host", "state"])
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Tracks whether the HTTP backend currently works for one host.
+
+    closed: use HTTP. open: HTTP is blocked, use the browser. half_open: the
+    cool-down has passed and one probe request may try HTTP again.
+    """
+
+    def __init__(self, host, failure_threshold=BREAKER_FAILURES, reset_seconds=BREAKER_RESET_SECONDS):
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def _set_state(self, state):
+        if state != self.state:
+            logger.info(f"Circuit breaker for {self.host}: {self.state} -> {state}")
+            BREAKER_TRANSITIONS.inc(host=self.host, state=state)
+            self.state = state
+
+    def allow_http(self):
+        """Whether the next request should try HTTP first."""
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_seconds:
+                self._set_state(HALF_OPEN)
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._probing = False
+            self._set_state(CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+                self._set_state(OPEN)
+
+
+def _is_error(df):
+    return df is None or "Error" in df.columns
+
+
+def _is_blocked(df):
+    """Whether a groups result means finviz refused HTTP (not a parse failure or an empty table)."""
+    return df is None or df.attrs.get("blocked", False)
+
+
+def _browser():
+    """The Playwright scraper module, or None if fallback is off or Playwright is missing."""
+    if not BROWSER_FALLBACK:
+        return None
+    try:
+        import finviz_playwright
+    except ImportError as e:
+        logger.warning(f"Browser fallback unavailable: {e}")
+        return None
+    return finviz_playwright
+
+
+class Fetcher:
+    """HTTP-first finviz scraper with browser escalation behind a circuit breaker."""
+
+    def __init__(self):
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def breaker(self, url):
+        host = urlparse(url).hostname or ""
+        with self._lock:
+            if host not in self._breakers:
+                self._breakers[host] = CircuitBreaker(host)
+            return self._breakers[host]
+
+    def _run(self, url, http_call, browser_call, is_blocked):
+        """
+        Run http_call unless the host's breaker is open, escalating to
+        browser_call when HTTP is blocked. Returns the first usable result, or
+        the last one obtained.
+        """
+        breaker = self.breaker(url)
+        browser = _browser()
+        result = None
+        # Without a browser to escalate to, HTTP is the only option even when blocked
+        if breaker.allow_http() or browser is None:
+            try:
+                result = http_call()
+            except Exception as e:
+                logger.error(f"HTTP fetch of {url} failed: {e}")
+                result = None
+            if result is not None and not is_blocked(result):
+                breaker.record_success()
+                BACKEND_REQUESTS.inc(backend="http", outcome="ok")
+                return result
+            breaker.record_failure()
+            BACKEND_REQUESTS.inc(backend="http", outcome="blocked")
+
+        if browser is None:
+            return result
+        logger.info(f"Fetching {url} with the browser backend")
+        try:
+            browser_result = browser_call(browser)
+        except Exception as e:
+            logger.error(f"Browser fetch of {url} failed: {e}")
+            BACKEND_REQUESTS.inc(backend="browser", outcome="error")
+            return result
+        BACKEND_REQUESTS.inc(backend="browser", outcome="error" if is_blocked(browser_result) else "ok")
+        if result is None or not is_blocked(browser_result):
+            return browser_result
+        return result
+
+    def sectors(self):
+        """The industry groups table (see finviz_bs.get_sector_data_bs)."""
+        result = self._run(
+            GROUPS_URL,
+            get_sector_data_bs,
+            lambda browser: browser.get_sector_data(),
+            _is_blocked,
+        )
+        return result if result is not None else pd.DataFrame({"Error": ["Failed to fetch data"]})
+
+    def crawl(self, industry, max_pages=5, previous=None, previous_pages=None, order=None, limit=None,
+              columns=None, filters=None, first_page=0):
+        """
+        An industry's companies as a CrawlResult (see finviz_bs.crawl_companies).
+
+        With order and limit, finviz sorts and only the pages holding the first
+        limit rows are fetched. columns and filters narrow the request (see
+        finviz_bs.screener_query), first_page skips the pages before it.
+        Browser results carry no page digests, so the next HTTP crawl parses
+        every page again; their changed tickers are computed against previous.
+        """
+        def from_browser(browser):
+            frame = browser.get_companies_by_industry(
+                industry, pages_for(limit, max_pages), order=order, columns=columns, filters=filters,
+            )
+            if _is_error(frame):
+                return CrawlResult(frame, [], set(), set(), True)
+            if limit:
+                frame = frame.head(limit)
+            frame = frame.iloc[first_page * ROWS_PER_PAGE:].reset_index(drop=True)
+            changed = changed_tickers(previous, frame)
+            removed = set()
+            if previous is not None and not previous.empty:
+                removed = set(previous["Ticker"]) - set(frame["Ticker"])
+            return CrawlResult(frame, [], changed, removed, False)
+
+        result = self._run(
+            screener_url(industry, order),
+            lambda: crawl_companies(
+                industry, max_pages, previous=previous, previous_pages=previous_pages, order=order, limit=limit,
+                columns=columns, filters=filters, first_page=first_page,
+            ),
+            from_browser,
+            lambda crawl: crawl.blocked,
+        )
+        if result is None:
+            return CrawlResult(pd.DataFrame({"Error": ["Failed to fetch data"]}), [], set(), set(), True)
+        return result
+
+    def iter_companies(self, industry, max_pages=5, order=None, limit=None, columns=None, filters=None):
+        """
+        Yield an industry's companies one screener page at a time (see
+        finviz_bs.iter_companies).
+
+        If HTTP is blocked before the first page, the view is loaded in the
+        browser in one go and yielded in page-sized batches.
+        """
+        breaker = self.breaker(screener_url(industry, order))
+        browser = _browser()
+        if breaker.allow_http() or browser is None:
+            pages = 0
+            for batch in iter_companies(
+                industry, max_pages, order=order, limit=limit, columns=columns, filters=filters,
+            ):
+                if not pages:
+                    breaker.record_success()
+                    BACKEND_REQUESTS.inc(backend="http", outcome="ok")
+                pages += 1
+                yield batch
+            if pages:
+                return
+            breaker.record_failure()
+            BACKEND_REQUESTS.inc(backend="http", outcome="blocked")
+            if browser is None:
+                return
+
+        logger.info(f"Fetching {industry} with the browser backend")
+        try:
+            frame = browser.get_companies_by_industry(
+                industry, pages_for(limit, max_pages), order=order, columns=columns, filters=filters,
+            )
+        except Exception as e:
+            logger.error(f"Browser fetch of {industry} failed: {e}")
+            frame = None
+        BACKEND_REQUESTS.inc(backend="browser", outcome="error" if _is_error(frame) else "ok")
+        if _is_error(frame):
+            return
+        for start in range(0, len(frame), ROWS_PER_PAGE):
+            yield frame.iloc[start:start + ROWS_PER_PAGE]
+
+    def universe(self, max_pages=UNIVERSE_MAX_PAGES, order=None, budget=None):
+        """
+        Every industry's companies from one pass over the screener (see
+        finviz_bs.scan_universe; budget is taken once per page request).
+
+        HTTP only: paging the whole universe in the browser would take too
+        long, so while the breaker is open the scan is skipped and reported as
+        blocked, and callers fall back to per-industry crawls.
+        """
+        url = universe_url(order)
+        breaker = self.breaker(url)
+        if not breaker.allow_http() and _browser() is not None:
+            return UniverseResult({}, 0, True, False)
+        try:
+            result = scan_universe(max_pages, order=order, budget=budget)
+        except Exception as e:
+            logger.error(f"HTTP fetch of {url} failed: {e}")
+            result = UniverseResult({}, 0, True, False)
+        if result.blocked:
+            breaker.record_failure()
+            BACKEND_REQUESTS.inc(backend="http", outcome="blocked")
+        else:
+            breaker.record_success()
+            BACKEND_REQUESTS.inc(backend="http", outcome="ok")
+        return result
+
+    def companies(self, industry, max_pages=5, order=None, limit=None, columns=None, filters=None):
+        """An industry's companies as a DataFrame (Error frame on failure)."""
+        frame = self.crawl(industry, max_pages, order=order, limit=limit, columns=columns, filters=filters).frame
+        return frame.head(limit) if limit else frame
+
+
+_fetcher = None
+_fetcher_lock = threading.Lock()
+
+
+def get_fetcher():
+    """Return the process-wide Fetcher."""
+    global _fetcher
+    with _fetcher_lock:
+        if _fetcher is None:
+            _fetcher = Fetcher()
+    return _fetcher
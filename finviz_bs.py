@@ -1,65 +1,623 @@
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
+import hashlib
+import random
+import re
+import threading
 import time
 import logging
+import os
+
+from finviz_parse import SCREENER_SPEC, parse_groups, parse_screener, parse_table, parse_universe
+from metrics import counter, histogram
+from normalize import COLUMN_UNITS, to_numeric
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def get_companies_by_industry_bs(industry, max_pages=5):
+# Fetch engine settings (override through the environment)
+REQUESTS_PER_SECOND = float(os.environ.get("FINVIZ_RPS", "4"))
+BURST = int(os.environ.get("FINVIZ_BURST", "4"))
+MAX_CONCURRENCY = int(os.environ.get("FINVIZ_CONCURRENCY", "4"))
+MAX_RETRIES = int(os.environ.get("FINVIZ_MAX_RETRIES", "4"))
+# Upper bound on pages of one universe scan (about 10,000 listed companies)
+UNIVERSE_MAX_PAGES = int(os.environ.get("FINVIZ_UNIVERSE_MAX_PAGES", "600"))
+REQUEST_TIMEOUT = 30
+# Where finviz is reached; point it at a stand-in server for load tests
+BASE_URL = os.environ.get("FINVIZ_BASE_URL", "https://finviz.com").rstrip("/")
+
+ROWS_PER_PAGE = 20
+THROTTLE_STATUSES = (403, 429)
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7)"
+}
+
+HTTP_REQUESTS = counter(
+    "finviz_http_requests_total", "Upstream HTTP requests by endpoint and status (\"error\" if none)",
+    ["endpoint", "status"],
+)
+HTTP_SECONDS = histogram("finviz_http_request_seconds", "Upstream HTTP request latency", ["endpoint"])
+RATE_LIMIT_WAIT_SECONDS = histogram("finviz_rate_limit_wait_seconds", "Time spent waiting for the rate limiter")
+INDUSTRY_PAGES = counter("finviz_industry_pages_total", "Screener pages fetched per industry", ["industry"])
+UNIVERSE_PAGES = counter("finviz_universe_pages_total", "Screener pages fetched by universe scans")
+PAGES_SKIPPED = counter("finviz_pages_unchanged_total", "Screener pages whose table digest was unchanged")
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket shared by every request to finviz.
+
+    The refill rate adapts to upstream behaviour: it is halved whenever finviz
+    answers with a throttling status and creeps back up to the configured
+    rate on each successful response.
+    """
+
+    def __init__(self, rate, capacity):
+        self.max_rate = rate
+        self.min_rate = rate / 16
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request may be sent."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if now >= self.blocked_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = max(self.blocked_until - now, (1 - self.tokens) / self.rate)
+            time.sleep(wait)
+
+    def penalize(self, delay):
+        """Slow down after a 429/403: halve the rate and pause all senders."""
+        with self.lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = 0
+            self.blocked_until = max(self.blocked_until, time.monotonic() + delay)
+        logger.warning(f"Throttled by upstream, backing off {delay:.1f}s (rate now {self.rate:.2f} req/s)")
+
+    def reward(self):
+        """Additive increase back towards the configured rate."""
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 10)
+
+
+rate_limiter = TokenBucket(REQUESTS_PER_SECOND, BURST)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Return the process-wide keep-alive session, creating it on first use."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(MAX_CONCURRENCY, 10))
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update(HEADERS)
+            _session = session
+    return _session
+
+
+def _backoff_delay(res, attempt):
+    retry_after = res.headers.get("Retry-After") if res is not None else None
+    if retry_after and retry_after.isdigit():
+        return float(retry_after)
+    # Exponential backoff with jitter
+    return min(60.0, 2 ** attempt) * (0.5 + random.random())
+
+
+def _endpoint(url):
+    """Metric label for a finviz URL, e.g. "screener" for /screener.ashx."""
+    match = re.search(r"/(\w+)\.ashx", url)
+    return match.group(1) if match else "other"
+
+
+def fetch(url, headers=None):
+    """
+    GET a finviz URL through the shared session and rate limiter.
+
+    Throttling responses (429/403) and connection errors are retried with
+    backoff. Returns the last response, or None if no response was received.
+    """
+    session = get_session()
+    endpoint = _endpoint(url)
+    res = None
+    for attempt in range(MAX_RETRIES + 1):
+        with RATE_LIMIT_WAIT_SECONDS.time():
+            rate_limiter.acquire()
+        started = time.perf_counter()
+        try:
+            res = session.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+        except requests.RequestException as e:
+            logger.warning(f"Request to {url} failed: {e}")
+            HTTP_REQUESTS.inc(endpoint=endpoint, status="error")
+            res = None
+            if attempt < MAX_RETRIES:
+                time.sleep(_backoff_delay(None, attempt))
+            continue
+        HTTP_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint)
+        HTTP_REQUESTS.inc(endpoint=endpoint, status=res.status_code)
+
+        if res.status_code in THROTTLE_STATUSES:
+            if attempt < MAX_RETRIES:
+                rate_limiter.penalize(_backoff_delay(res, attempt))
+            continue
+
+        rate_limiter.reward()
+        return res
+    return res
+
+
+# finviz column ids for the SCREENER_SPEC columns, in their default order
+SCREENER_COLUMNS = "1,2,6,7,8,10,11,75,21,82,39,40,41,63"
+SCREENER_COLUMN_IDS = dict(zip(SCREENER_SPEC.names, SCREENER_COLUMNS.split(",")))
+
+# Market cap floors finviz can filter on, in $M like the typed Market cap column
+MARKET_CAP_FLOORS = [
+    (200000, "cap_mega"), (10000, "cap_largeover"), (2000, "cap_midover"),
+    (300, "cap_smallover"), (50, "cap_microover"),
+]
+# Columns finviz can restrict to positive values
+POSITIVE_FILTERS = {"P/E": "fa_pe_profitable", "Fwd P/E": "fa_fpe_profitable", "Dividend": "fa_div_pos"}
+
+_PREDICATE_OPS = {
+    "<": lambda s, v: s < v,
+    "<=": lambda s, v: s <= v,
+    ">": lambda s, v: s > v,
+    ">=": lambda s, v: s >= v,
+    "==": lambda s, v: s == v,
+    "!=": lambda s, v: s != v,
+}
+
+# What to ask finviz for: the spec of the columns to request and parse, the
+# f= filter codes, and the predicates finviz cannot express, checked locally
+ScreenerQuery = namedtuple("ScreenerQuery", ["spec", "codes", "residual"])
+
+
+def screener_query(columns=None, filters=None):
+    """
+    Translate the columns and predicates a caller needs into a ScreenerQuery.
+
+    Args:
+        columns (list): SCREENER_SPEC columns to fetch; Ticker is always
+            included and None means all of them
+        filters (list): (column, op, value) predicates, op one of <, <=, >,
+            >=, ==, !=, with values in the typed units (Market cap in $M).
+            A market cap floor is pushed down as the nearest finviz bracket
+            at or below it, "> 0" on P/E, Fwd P/E or Dividend as finviz's
+            positive filter; anything else is checked after parsing.
+
+    Returns:
+        ScreenerQuery
+    """
+    filters = list(filters or [])
+    for column, op, _ in filters:
+        if column not in SCREENER_COLUMN_IDS or op not in _PREDICATE_OPS:
+            raise ValueError(f"Unsupported screener predicate {column} {op}")
+
+    codes = []
+    residual = []
+    for column, op, value in filters:
+        if column == "Market cap" and op in (">", ">="):
+            code = next((code for floor, code in MARKET_CAP_FLOORS if floor <= value), None)
+            if code is not None:
+                codes.append(code)
+            # The bracket is exact only for ">=" its own floor
+            if not (op == ">=" and any(floor == value for floor, _ in MARKET_CAP_FLOORS)):
+                residual.append((column, op, value))
+        elif column in POSITIVE_FILTERS and op == ">" and value == 0:
+            codes.append(POSITIVE_FILTERS[column])
+        else:
+            residual.append((column, op, value))
+
+    if columns is None:
+        return ScreenerQuery(SCREENER_SPEC, codes, residual)
+    unknown = set(columns) - set(SCREENER_COLUMN_IDS)
+    if unknown:
+        raise ValueError(f"Unknown screener columns {sorted(unknown)}")
+    # Locally checked predicates need their columns on the page
+    wanted = {"Ticker"} | set(columns) | {column for column, _, _ in residual}
+    return ScreenerQuery(SCREENER_SPEC.select([n for n in SCREENER_SPEC.names if n in wanted]), codes, residual)
+
+
+def apply_filters(frame, filters):
+    """Rows of a raw screener frame that satisfy every (column, op, value) predicate."""
+    if not filters or frame.empty:
+        return frame
+    mask = pd.Series(True, index=frame.index)
+    for column, op, value in filters:
+        values = to_numeric(frame[column], COLUMN_UNITS.get(column, 1.0))
+        mask &= _PREDICATE_OPS[op](values, value).fillna(False)
+    return frame[mask]
+
+
+def screener_url(industry, order=None, columns=None, filters=None):
+    """
+    First screener page for an industry.
+
+    order is finviz's sort parameter, e.g. "-marketcap" for largest first;
+    without it finviz sorts by ticker. columns and filters narrow the request
+    as described in screener_query; by default every SCREENER_SPEC column is
+    requested.
+    """
+    query = screener_query(columns, filters)
     industry_slug = f"ind_{industry.lower().replace(' ', '').replace('-', '').replace('&', '')}"
-    base_url = f"https://finviz.com/screener.ashx?v=152&f={industry_slug}&c=1,2,6,7,8,10,11,75,21,82,39,40,41,63"
-    
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7)"
+    column_ids = ",".join(SCREENER_COLUMN_IDS[name] for name in query.spec.names)
+    url = f"{BASE_URL}/screener.ashx?v=152&f={','.join([industry_slug] + query.codes)}&c={column_ids}"
+    return f"{url}&o={order}" if order else url
+
+
+def universe_url(order=None):
+    """First page of the unfiltered screener, with the Industry column (4) appended."""
+    url = f"{BASE_URL}/screener.ashx?v=152&c={SCREENER_COLUMNS},4"
+    return f"{url}&o={order}" if order else url
+
+
+def screener_key(industry, order=None, limit=None):
+    """
+    Snapshot key for a screener view: the industry name alone for a full
+    crawl, "industry|order|limit" for a sorted, row-limited view.
+    """
+    if not order and not limit:
+        return industry
+    return f"{industry}|{order or ''}|{limit or ''}"
+
+
+def parse_screener_key(key):
+    """(industry, order, limit) for a key made by screener_key."""
+    industry, _, view = key.partition("|")
+    order, _, limit = view.partition("|")
+    return industry, order or None, int(limit) if limit else None
+
+
+def pages_for(limit, max_pages):
+    """Screener pages needed for the first limit rows (all max_pages without a limit)."""
+    if not limit:
+        return max_pages
+    return max(1, min(max_pages, -(-limit // ROWS_PER_PAGE)))
+
+
+def _total_pages(html):
+    """Read the total row count finviz prints above the screener table."""
+    match = re.search(r"/\s*(\d+)\s*Total", html) or re.search(r"Total:\s*(?:</b>)?\s*(\d+)", html)
+    if not match:
+        return None
+    return -(-int(match.group(1)) // ROWS_PER_PAGE)
+
+
+# One fetched screener page. columns is None when the table matched a known
+# digest and parsing was skipped.
+ScreenerPage = namedtuple("ScreenerPage", ["digest", "row_count", "columns", "html"])
+
+# Result of a crawl: the frame, per-page [digest, table rows, parsed rows]
+# for the next incremental crawl, the tickers that changed or disappeared
+# relative to the previous frame, and whether the first page was refused
+# (non-200 or no screener table, e.g. a block or captcha page)
+CrawlResult = namedtuple("CrawlResult", ["frame", "pages", "changed", "removed", "blocked"])
+
+# Result of a universe scan: {industry: raw frame} in upstream order, the
+# number of pages fetched, whether the first page was refused, and whether
+# the scan reached the last page finviz reported (a scan cut short by a
+# failed page or by max_pages misses the smallest companies)
+UniverseResult = namedtuple("UniverseResult", ["industries", "pages", "blocked", "complete"])
+
+
+def _table_digest(html):
+    """Hash of the screener table markup, ignoring the rest of the page (ads, timestamps)."""
+    start = html.find("screener_table")
+    if start < 0:
+        return None
+    end = html.find("</table>", start)
+    return hashlib.sha1(html[start:end].encode("utf-8", "replace")).hexdigest()
+
+
+def _fetch_screener_page(base_url, page, known=None, parser=parse_screener):
+    """
+    Fetch one screener page. Returns a ScreenerPage, or None on failure.
+
+    known is the [digest, table rows, parsed rows] entry of the same page from
+    the previous crawl; when the digest matches, parsing is skipped.
+    """
+    start_row = page * ROWS_PER_PAGE + 1
+    url = f"{base_url}&r={start_row}" if page > 0 else base_url
+    res = fetch(url)
+    if res is None or res.status_code != 200:
+        return None
+
+    digest = _table_digest(res.text)
+    if digest is None:
+        return None
+    if known is not None and known[0] == digest:
+        return ScreenerPage(digest, known[1], None, res.text)
+
+    parsed = parser(res.text)
+    if parsed is None:
+        return None
+    columns, row_count = parsed
+    return ScreenerPage(digest, row_count, columns, res.text)
+
+
+def _iter_pages(base_url, max_pages, concurrency, known_pages=None, parser=parse_screener, budget=None,
+                first_page=0):
+    """
+    Fetch screener pages in order until the last one, yielding each
+    ScreenerPage as soon as it and every page before it have arrived.
+
+    budget is an optional TokenBucket (or snapshot_store.SharedBudget) taken
+    once before each request, on top of the global rate limit, e.g. the
+    refresh workers' request allowance.
+    first_page skips the pages before it (page numbers start at 0);
+    known_pages is indexed by page number.
+    """
+    known_pages = known_pages or []
+
+    def known(page):
+        return known_pages[page] if page < len(known_pages) else None
+
+    def fetch_page(page):
+        if budget is not None:
+            budget.acquire()
+        return _fetch_screener_page(base_url, page, known(page), parser)
+
+    # The first page tells us how many pages there are
+    first = fetch_page(first_page)
+    if first is None:
+        return
+    yield first
+    if first.row_count < ROWS_PER_PAGE:
+        return
+
+    last_page = min(max_pages, _total_pages(first.html) or max_pages)
+
+    # Fetch the remaining pages in waves; results are consumed in page order
+    # and the crawl stops at the first failed or short page
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for wave_start in range(first_page + 1, last_page, concurrency):
+            wave = range(wave_start, min(wave_start + concurrency, last_page))
+            done = False
+            for result in pool.map(fetch_page, wave):
+                if result is None or result.row_count == 0:
+                    done = True
+                    break
+                yield result
+                # If this page had fewer than 20 rows, it's the last one
+                if result.row_count < ROWS_PER_PAGE:
+                    done = True
+                    break
+            if done:
+                break
+
+
+def changed_tickers(previous, fresh):
+    """Tickers in fresh whose row is new or differs from previous."""
+    if fresh.empty:
+        return set()
+    if previous is None or previous.empty:
+        return set(fresh["Ticker"])
+    old = previous.drop_duplicates("Ticker").set_index("Ticker")
+    new = fresh.drop_duplicates("Ticker").set_index("Ticker")
+    common = new.index.intersection(old.index)
+    # Frames fetched with different column selections are compared on the columns they share
+    columns = [column for column in new.columns if column in old.columns]
+    differs = new.loc[common, columns].ne(old.loc[common, columns]).any(axis=1)
+    return set(new.index.difference(old.index)) | set(differs[differs].index)
+
+
+def crawl_companies(industry, max_pages=5, concurrency=None, previous=None, previous_pages=None,
+                    order=None, limit=None, columns=None, filters=None, first_page=0):
+    """
+    Crawl an industry's screener pages, re-parsing only pages whose table changed.
+
+    Args:
+        industry (str): Industry name to fetch data for
+        max_pages (int): Maximum number of pages to fetch
+        concurrency (int): Pages fetched at once (defaults to FINVIZ_CONCURRENCY)
+        previous (pd.DataFrame): Raw frame from the previous crawl, if any
+        previous_pages (list): CrawlResult.pages from the previous crawl
+        order (str): finviz sort order, e.g. "-marketcap"; sorting happens upstream
+        limit (int): Only fetch the pages holding the first limit rows (the
+            frame keeps whole pages, so it may hold a few more)
+        columns (list): Only request these columns (see screener_query)
+        filters (list): (column, op, value) predicates, pushed into the
+            request where finviz supports them
+        first_page (int): Start at this page (from 0), e.g. to extend a view
+            that already holds the pages before it; previous and
+            previous_pages then cover the pages from first_page on
+
+    Returns:
+        CrawlResult: An empty frame, with blocked set, if the first page could
+        not be fetched
+    """
+    query = screener_query(columns, filters)
+    base_url = screener_url(industry, order, columns, filters)
+    concurrency = concurrency or MAX_CONCURRENCY
+    if previous is None or previous.empty:
+        previous, previous_pages = None, None
+
+    # Reuse the previous rows of unchanged pages; parse the others. Pages are
+    # consumed as they arrive, so their markup is never held all at once.
+    parts = []
+    fresh_parts = []
+    meta = []
+    offset = 0
+    pages = _iter_pages(
+        base_url, pages_for(limit, max_pages), concurrency, [None] * first_page + (previous_pages or []),
+        lambda html: parse_table(html, query.spec), first_page=first_page,
+    )
+    for index, page in enumerate(pages):
+        PAGES_SKIPPED.inc(int(page.columns is None))
+        old = previous_pages[index] if previous_pages and index < len(previous_pages) else None
+        columns = page.columns
+        if columns is None and previous is not None and offset + old[2] <= len(previous):
+            part = previous.iloc[offset:offset + old[2]]
+        else:
+            if columns is None:
+                columns, _ = parse_table(page.html, query.spec)
+            part = apply_filters(pd.DataFrame(columns, columns=query.spec.names), query.residual)
+            fresh_parts.append(part)
+        parts.append(part)
+        meta.append([page.digest, page.row_count, len(part)])
+        if old is not None:
+            offset += old[2]
+    INDUSTRY_PAGES.inc(len(meta), industry=industry)
+
+    if not parts or not sum(len(part) for part in parts):
+        return CrawlResult(pd.DataFrame(), meta, set(), set(), not meta)
+
+    frame = pd.concat(parts, ignore_index=True)
+    fresh = pd.concat(fresh_parts, ignore_index=True) if fresh_parts else frame.iloc[0:0]
+    changed = changed_tickers(previous, fresh)
+    removed = set(previous["Ticker"]) - set(frame["Ticker"]) if previous is not None else set()
+    return CrawlResult(frame, meta, changed, removed, False)
+
+
+def get_companies_by_industry_bs(industry, max_pages=5, concurrency=None, order=None, limit=None,
+                                 columns=None, filters=None):
+    frame = crawl_companies(
+        industry, max_pages, concurrency, order=order, limit=limit, columns=columns, filters=filters,
+    ).frame
+    return frame.head(limit) if limit else frame
+
+
+def iter_companies(industry, max_pages=5, concurrency=None, order=None, limit=None, columns=None, filters=None):
+    """
+    Yield an industry's companies one screener page at a time.
+
+    Each page is yielded as soon as it and every page before it have
+    arrived, as a DataFrame of the requested columns. Only the pages in
+    flight are held here, so a consumer that handles and drops each batch
+    stays flat in memory however many pages the industry has.
+
+    Args:
+        industry (str): Industry name to fetch data for
+        max_pages (int): Maximum number of pages to fetch
+        concurrency (int): Pages fetched at once (defaults to FINVIZ_CONCURRENCY)
+        order (str): finviz sort order, e.g. "-marketcap"
+        limit (int): Only fetch the pages holding the first limit rows
+        columns (list): Only request these columns (see screener_query)
+        filters (list): (column, op, value) predicates (see screener_query)
+
+    Yields:
+        pd.DataFrame: One page of companies; nothing if the first page could
+        not be fetched
+    """
+    query = screener_query(columns, filters)
+    base_url = screener_url(industry, order, columns, filters)
+    pages = 0
+    try:
+        for page in _iter_pages(
+            base_url, pages_for(limit, max_pages), concurrency or MAX_CONCURRENCY,
+            parser=lambda html: parse_table(html, query.spec),
+        ):
+            pages += 1
+            yield apply_filters(pd.DataFrame(page.columns, columns=query.spec.names), query.residual)
+    finally:
+        INDUSTRY_PAGES.inc(pages, industry=industry)
+
+
+def scan_universe(max_pages=UNIVERSE_MAX_PAGES, concurrency=None, order=None, budget=None):
+    """
+    Page once through the unfiltered screener and split the rows by industry.
+
+    Every industry is filled from the same pass, keyed by the industry name
+    finviz prints, so no industry filter has to be guessed (see screener_url).
+    Pages are parsed as they arrive and their markup is dropped straight away.
+
+    Args:
+        max_pages (int): Maximum number of pages to fetch
+        concurrency (int): Pages fetched at once (defaults to FINVIZ_CONCURRENCY)
+        order (str): finviz sort order, e.g. "-marketcap"; each industry's rows
+            keep it
+        budget (TokenBucket): Taken once per page request (see _iter_pages)
+
+    Returns:
+        UniverseResult: Frames with the SCREENER_SPEC columns, by industry
+    """
+    parts = {}
+    pages = 0
+    total_pages = None
+    last_rows = 0
+    for page in _iter_pages(universe_url(order), max_pages, concurrency or MAX_CONCURRENCY,
+                            parser=parse_universe, budget=budget):
+        if pages == 0:
+            total_pages = _total_pages(page.html)
+        pages += 1
+        last_rows = page.row_count
+        frame = pd.DataFrame(page.columns)
+        for industry, rows in frame.groupby("Industry", sort=False):
+            parts.setdefault(industry, []).append(rows.drop(columns="Industry"))
+    UNIVERSE_PAGES.inc(pages)
+
+    industries = {
+        industry: pd.concat(frames, ignore_index=True) for industry, frames in parts.items()
     }
+    # Without a total on the first page, a short last page marks the end
+    complete = pages > 0 and (pages >= total_pages if total_pages else last_rows < ROWS_PER_PAGE)
+    logger.info(f"Universe scan: {pages} of {total_pages or '?'} pages, {sum(map(len, industries.values()))} companies in {len(industries)} industries")
+    return UniverseResult(industries, pages, pages == 0, complete)
+
+
+GROUPS_URL = f"{BASE_URL}/groups.ashx?g=industry&v=152&o=name&c=0,1,2,3,4,6,7,10,13,22,24,25,26"
+GROUPS_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.114 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.5",
+    "Referer": f"{BASE_URL}/",
+    "DNT": "1",
+    "Connection": "keep-alive",
+    "Upgrade-Insecure-Requests": "1",
+}
+
+
+def _sector_error(message, blocked=False):
+    """An "Error" frame for the groups table; blocked marks a refusal rather than a bad page."""
+    error = pd.DataFrame({"Error": [message]})
+    error.attrs["blocked"] = blocked
+    return error
+
+
+def get_sector_data_bs():
+    """
+    Scrape the finviz industry groups table. Failures are returned as an
+    "Error" frame whose attrs["blocked"] is set when finviz refused the
+    request (403/429 after retries, or a page without the data table).
+    """
+    try:
+        res = fetch(GROUPS_URL, headers=GROUPS_HEADERS)
+        if res is None or res.status_code != 200:
+            status = res.status_code if res is not None else "no response"
+            logger.error(f"Failed to fetch sector data: HTTP {status}")
+            return _sector_error("Failed to fetch data", res is not None and res.status_code in THROTTLE_STATUSES)
+
+        parsed = parse_groups(res.text)
+
+        # If the table is not on the page (e.g. a captcha), return DataFrame with error
+        if parsed is None:
+            logger.error("Could not find sector data table on the page")
+            return _sector_error("Table not found on page", blocked=True)
+
+        data, _ = parsed
+        if not data["Sector"]:
+            return _sector_error("No data found in table")
+
+        return pd.DataFrame(data)
 
-    all_data = []
-    
-    for page in range(max_pages):
-        start_row = page * 20 + 1
-        url = f"{base_url}&r={start_row}" if page > 0 else base_url
-        res = requests.get(url, headers=headers)
-        
-        if res.status_code != 200:
-            break
-
-        soup = BeautifulSoup(res.text, "html.parser")
-        table = soup.find("table", class_="screener_table")
-        if not table:
-            break
-        
-        rows = table.find_all("tr")[1:]  # Skip header
-        if not rows:
-            break
-        
-        for row in rows:
-            cols = row.find_all("td")
-            if len(cols) < 14:
-                continue
-            
-            all_data.append({
-                "Ticker": cols[0].text.strip(),         
-                "Company": cols[1].text.strip(),          
-                "Market cap": cols[2].text.strip(),
-                "P/E": cols[3].text.strip(),
-                "Fwd P/E": cols[4].text.strip(),
-                "P/S": cols[5].text.strip(),
-                "P/B": cols[6].text.strip(),
-                "Dividend": cols[7].text.strip(),
-                "Sales 5Y growth": cols[8].text.strip(),
-                "Sales": cols[9].text.strip(),
-                "Gross Margin": cols[10].text.strip(),
-                "Operating Margin": cols[11].text.strip(),
-                "Profit Margin": cols[12].text.strip(),
-                "Avg. volume": cols[13].text.strip()
-            })
-            
-        # If this page had fewer than 20 rows, it's the last one
-        if len(rows) < 20:
-            break
-        time.sleep(1)  # Be polite
-
-    return pd.DataFrame(all_data)
+    except Exception as e:
+        logger.error(f"Error fetching sector data: {e}")
+        return _sector_error(str(e))
@@ -0,0 +1,219 @@
+"""
+Table parsers for finviz pages.
+
+Each parser extracts only the target table, maps its columns by header name
+(falling back to the historical fixed positions when the header is not
+recognised) and returns plain column lists ready for ``pd.DataFrame``.
+
+Two backends are available: "lxml" (C-backed, the default) and "bs4" (the
+original BeautifulSoup html.parser path). Select one per call or through the
+FINVIZ_PARSER environment variable.
+"""
+import logging
+import os
+import re
+
+from bs4 import BeautifulSoup
+
+from metrics import counter, histogram
+
+try:
+    import lxml.html
+except ImportError:  # pragma: no cover - lxml is in requirements.txt
+    lxml = None
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DEFAULT_BACKEND = os.environ.get("FINVIZ_PARSER", "lxml")
+
+PARSE_SECONDS = histogram("finviz_parse_seconds", "Table parse time", ["table", "backend"])
+ROWS_PARSED = counter("finviz_rows_parsed_total", "Table rows parsed", ["table"])
+TABLES_MISSING = counter("finviz_tables_missing_total", "Pages on which the expected table was not found", ["table"])
+
+
+class TableSpec:
+    """Where to find a table and how to map its header cells to output columns."""
+
+    def __init__(self, table_class, columns, min_cells, fallback_text=None):
+        self.table_class = table_class
+        # (output name, accepted header spellings, position in the default layout)
+        self.columns = columns
+        self.min_cells = min_cells
+        # Text identifying the table when it is not found by class
+        self.fallback_text = fallback_text
+
+    @property
+    def names(self):
+        return [name for name, _, _ in self.columns]
+
+    def select(self, names):
+        """Spec for a subset of the columns, whose default layout is the given order."""
+        aliases = {name: spellings for name, spellings, _ in self.columns}
+        return TableSpec(
+            self.table_class,
+            [(name, aliases[name], position) for position, name in enumerate(names)],
+            min_cells=len(names),
+            fallback_text=self.fallback_text,
+        )
+
+
+SCREENER_SPEC = TableSpec(
+    "screener_table",
+    [
+        ("Ticker", ("ticker",), 0),
+        ("Company", ("company",), 1),
+        ("Market cap", ("market cap", "mkt cap"), 2),
+        ("P/E", ("p/e", "pe"), 3),
+        ("Fwd P/E", ("fwd p/e", "forward p/e"), 4),
+        ("P/S", ("p/s",), 5),
+        ("P/B", ("p/b",), 6),
+        ("Dividend", ("dividend", "dividend %", "dividend yield", "div", "div %"), 7),
+        ("Sales 5Y growth", ("sales past 5y", "sales 5y", "sales growth past 5y"), 8),
+        ("Sales", ("sales",), 9),
+        ("Gross Margin", ("gross margin", "gross m"), 10),
+        ("Operating Margin", ("oper margin", "operating margin", "oper m"), 11),
+        ("Profit Margin", ("profit margin", "profit m"), 12),
+        ("Avg. volume", ("avg volume", "average volume"), 13),
+    ],
+    min_cells=14,
+)
+
+# The unfiltered screener: the same columns plus each company's industry, so
+# one pass over every page can be split up by industry locally
+UNIVERSE_SPEC = TableSpec(
+    "screener_table",
+    SCREENER_SPEC.columns + [("Industry", ("industry",), 14)],
+    min_cells=15,
+)
+
+GROUPS_SPEC = TableSpec(
+    "table-light",
+    [
+        ("Sector", ("name", "industry", "sector"), 1),
+        ("Market cap", ("market cap", "mkt cap"), 2),
+        ("P/E", ("p/e", "pe"), 3),
+        ("Fwd P/E", ("fwd p/e", "forward p/e"), 4),
+        ("P/S", ("p/s",), 5),
+        ("P/B", ("p/b",), 6),
+        ("Dividend", ("dividend", "dividend %", "dividend yield", "div", "div %"), 7),
+        ("Sales 5Y growth", ("sales past 5y", "sales 5y", "sales growth past 5y"), 8),
+        ("Avg. volume", ("avg volume", "average volume"), 9),
+    ],
+    min_cells=9,
+    fallback_text="Technology",
+)
+
+
+def _normalize_header(text):
+    return re.sub(r"\s+", " ", text.replace(".", "")).strip().lower()
+
+
+def _column_positions(spec, header_cells):
+    """Map output columns to cell positions by header name, or fall back to the default layout."""
+    headers = {}
+    for i, text in enumerate(header_cells):
+        headers.setdefault(_normalize_header(text), i)
+
+    positions = []
+    for name, aliases, default in spec.columns:
+        index = next((headers[a] for a in aliases if a in headers), None)
+        if index is None:
+            if header_cells:
+                logger.debug(f"Header for {name} not found in {header_cells}, using default layout")
+            return [(name, default) for name, _, default in spec.columns]
+        positions.append((name, index))
+    return positions
+
+
+def build_columns(spec, header_cells, rows):
+    """Turn header texts and per-row cell texts into {column: [values]}."""
+    positions = _column_positions(spec, header_cells)
+    columns = {name: [] for name in spec.names}
+    for cells in rows:
+        if len(cells) < spec.min_cells:
+            continue
+        for name, index in positions:
+            columns[name].append(cells[index] if index < len(cells) else "N/A")
+    return columns
+
+
+def _parse_lxml(html, spec):
+    doc = lxml.html.fromstring(html)
+    tables = doc.xpath(
+        f'//table[contains(concat(" ", normalize-space(@class), " "), " {spec.table_class} ")]'
+    )
+    if not tables and spec.fallback_text:
+        tables = doc.xpath(f'//table[.//td[contains(text(), "{spec.fallback_text}")]]')
+    if not tables:
+        return None
+
+    trs = tables[0].xpath(".//tr")
+    if not trs:
+        return {name: [] for name in spec.names}, 0
+    header = [cell.text_content().strip() for cell in trs[0].xpath(".//th|.//td")]
+    rows = [[td.text_content().strip() for td in tr.xpath(".//td")] for tr in trs[1:]]
+    return build_columns(spec, header, rows), len(rows)
+
+
+def _parse_bs4(html, spec):
+    soup = BeautifulSoup(html, "html.parser")
+    table = soup.find("table", class_=spec.table_class)
+    if table is None and spec.fallback_text:
+        for t in soup.find_all("table"):
+            if t.find("td", string=lambda x: x and spec.fallback_text in x):
+                table = t
+                break
+    if table is None:
+        return None
+
+    trs = table.find_all("tr")
+    if not trs:
+        return {name: [] for name in spec.names}, 0
+    header = [cell.text.strip() for cell in trs[0].find_all(["th", "td"])]
+    rows = [[td.text.strip() for td in tr.find_all("td")] for tr in trs[1:]]
+    return build_columns(spec, header, rows), len(rows)
+
+
+BACKENDS = {
+    "lxml": _parse_lxml,
+    "bs4": _parse_bs4,
+}
+
+
+def parse_table(html, spec, backend=None):
+    """
+    Parse the table described by spec out of an HTML page.
+
+    Args:
+        html (str): Page source
+        spec (TableSpec): Table to extract
+        backend (str): "lxml" or "bs4"; defaults to FINVIZ_PARSER
+
+    Returns:
+        tuple: ({column: [values]}, number of data rows in the table), or None
+        if the table is not on the page
+    """
+    backend = backend or DEFAULT_BACKEND
+    if backend == "lxml" and lxml is None:
+        backend = "bs4"
+    with PARSE_SECONDS.time(table=spec.table_class, backend=backend):
+        parsed = BACKENDS[backend](html, spec)
+    if parsed is None:
+        TABLES_MISSING.inc(table=spec.table_class)
+    else:
+        ROWS_PARSED.inc(parsed[1], table=spec.table_class)
+    return parsed
+
+
+def parse_screener(html, backend=None):
+    return parse_table(html, SCREENER_SPEC, backend)
+
+
+def parse_universe(html, backend=None):
+    return parse_table(html, UNIVERSE_SPEC, backend)
+
+
+def parse_groups(html, backend=None):
+    return parse_table(html, GROUPS_SPEC, backend)
@@ -1,11 +1,17 @@
 import pandas as pd
 import asyncio
+import atexit
 from playwright.async_api import async_playwright
-import time
 import logging
 import os
 import subprocess
 import sys
+import threading
+from contextlib import asynccontextmanager
+from urllib.parse import urlparse
+
+from finviz_bs import GROUPS_URL, apply_filters, rate_limiter, screener_query, screener_url
+from finviz_parse import build_columns, parse_groups
 
 def ensure_playwright_browsers_installed():
     browser_path = "/home/appuser/.cache/ms-playwright"
@@ -20,8 +26,24 @@ def ensure_playwright_browsers_installed():
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+_browsers_ready = False
+_browsers_lock = threading.Lock()
+
 def ensure_playwright_browsers():
-    """Ensure Playwright browsers are installed, attempt to install if missing."""
+    """
+    Ensure Playwright browsers are installed, attempt to install if missing.
+
+    The check shells out to the Playwright CLI, so a successful result is
+    remembered for the lifetime of the process.
+    """
+    global _browsers_ready
+    with _browsers_lock:
+        if _browsers_ready:
+            return True
+        _browsers_ready = _check_playwright_browsers()
+        return _browsers_ready
+
+def _check_playwright_browsers():
     try:
         logger.info("Checking Playwright browser installation...")
         # Check if browser is already installed
@@ -46,218 +68,465 @@ def ensure_playwright_browsers():
         logger.error(f"Failed to install Playwright browsers: {e}")
         return False
 
-async def get_companies_by_industry_async(industry, max_pages=5):
+# Browser pool settings (override through the environment)
+MAX_PAGES = int(os.environ.get("PLAYWRIGHT_MAX_PAGES", "4"))
+PAGES_PER_CONTEXT = int(os.environ.get("PLAYWRIGHT_PAGES_PER_CONTEXT", "4"))
+MAX_CONTEXT_USES = int(os.environ.get("PLAYWRIGHT_MAX_CONTEXT_USES", "50"))
+
+# Only the HTML document is needed to read the screener table
+BLOCKED_RESOURCE_TYPES = set(
+    os.environ.get("PLAYWRIGHT_BLOCKED_RESOURCES", "image,stylesheet,font,media,imageset,texttrack,manifest").split(",")
+)
+BLOCKED_HOSTS = (
+    "doubleclick.net", "googlesyndication.com", "googletagmanager.com", "google-analytics.com",
+    "googletagservices.com", "adservice.google.com", "amazon-adsystem.com", "adnxs.com",
+    "criteo.com", "pubmatic.com", "rubiconproject.com", "quantserve.com", "scorecardresearch.com",
+)
+
+LAUNCH_ARGS = [
+    '--disable-dev-shm-usage',
+    '--disable-gpu',
+    '--no-sandbox',
+    '--disable-setuid-sandbox'
+]
+USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36"
+STEALTH_SCRIPT = """
+    // Overwrite the `navigator.webdriver` property
+    Object.defineProperty(navigator, 'webdriver', {
+        get: () => false,
+    });
+"""
+
+async def _block_resources(route):
+    """Abort images, stylesheets, fonts, media and ad/analytics requests."""
+    request = route.request
+    host = urlparse(request.url).hostname or ""
+    if request.resource_type in BLOCKED_RESOURCE_TYPES or host.endswith(BLOCKED_HOSTS):
+        await route.abort()
+    else:
+        await route.continue_()
+
+class _PooledContext:
+    def __init__(self, context):
+        self.context = context
+        self.open_pages = 0
+        self.uses = 0
+        self.retired = False
+
+class BrowserPool:
+    """
+    A long-lived Chromium shared by every browser-backed fetch in the process.
+
+    The browser runs on a dedicated event loop in a daemon thread, so callers
+    on any thread (or any other event loop) can submit coroutines to it.
+    page() hands out warm pages, at most MAX_PAGES at a time, packed up to
+    PAGES_PER_CONTEXT per browser context. Pages are health checked before
+    reuse; a context is retired after MAX_CONTEXT_USES fetches or an error
+    and closed once its last page is returned. A crashed browser is
+    relaunched on demand. Every context blocks non-document resources.
+    """
+
+    def __init__(self, max_pages=MAX_PAGES, pages_per_context=PAGES_PER_CONTEXT,
+                 max_context_uses=MAX_CONTEXT_USES):
+        self.max_pages = max_pages
+        self.pages_per_context = pages_per_context
+        self.max_context_uses = max_context_uses
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="playwright-pool", daemon=True)
+        self._thread.start()
+        self._playwright = None
+        self._browser = None
+        self._contexts = []
+        self._idle = []  # (pooled context, page)
+        self._slots = None
+        self._launch_lock = None
+
+    def run(self, coro, timeout=None):
+        """Run a coroutine on the pool's loop from synchronous code and wait for it."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    async def submit(self, coro):
+        """Await a coroutine on the pool's loop from any event loop."""
+        if asyncio.get_running_loop() is self.loop:
+            return await coro
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self.loop))
+
+    async def _ensure_browser(self):
+        if self._launch_lock is None:
+            self._launch_lock = asyncio.Lock()
+            self._slots = asyncio.Semaphore(self.max_pages)
+        async with self._launch_lock:
+            if self._browser is not None and self._browser.is_connected():
+                return
+            if self._browser is not None:
+                logger.warning("Browser disconnected, relaunching")
+                self._contexts = []
+                self._idle = []
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+            # Launch browser with stealth mode and cloud-friendly options
+            self._browser = await self._playwright.chromium.launch(headless=True, args=LAUNCH_ARGS)
+            logger.info("Launched pooled Chromium browser")
+
+    async def _new_context(self):
+        context = await self._browser.new_context(
+            viewport={"width": 1920, "height": 1080},
+            user_agent=USER_AGENT
+        )
+        # Add stealth mode behavior
+        await context.add_init_script(STEALTH_SCRIPT)
+        await context.route("**/*", _block_resources)
+        pooled = _PooledContext(context)
+        self._contexts.append(pooled)
+        return pooled
+
+    async def _new_page(self):
+        pooled = next(
+            (c for c in self._contexts if not c.retired and c.open_pages < self.pages_per_context),
+            None,
+        )
+        if pooled is None:
+            pooled = await self._new_context()
+        page = await pooled.context.new_page()
+        pooled.open_pages += 1
+        # Enable console logging
+        page.on("console", lambda msg: logger.debug(f"Browser console: {msg.text}"))
+        return pooled, page
+
+    async def _close_page(self, pooled, page):
+        try:
+            await page.close()
+        except Exception as e:
+            logger.debug(f"Error closing page: {e}")
+        pooled.open_pages -= 1
+        if pooled.retired and pooled.open_pages <= 0:
+            if pooled in self._contexts:
+                self._contexts.remove(pooled)
+            try:
+                await pooled.context.close()
+            except Exception as e:
+                logger.debug(f"Error closing browser context: {e}")
+
+    async def _retire(self, pooled):
+        pooled.retired = True
+        for slot in [slot for slot in self._idle if slot[0] is pooled]:
+            self._idle.remove(slot)
+            await self._close_page(*slot)
+
+    @asynccontextmanager
+    async def page(self):
+        """Borrow a warm page for the duration of one fetch."""
+        await self._ensure_browser()
+        async with self._slots:
+            slot = None
+            while self._idle and slot is None:
+                pooled, page = self._idle.pop()
+                if page.is_closed() or pooled.retired or not self._browser.is_connected():
+                    await self._close_page(pooled, page)
+                else:
+                    slot = (pooled, page)
+            if slot is None:
+                slot = await self._new_page()
+            pooled, page = slot
+
+            healthy = False
+            try:
+                yield page
+                healthy = True
+            finally:
+                pooled.uses += 1
+                if not healthy or pooled.uses >= self.max_context_uses:
+                    await self._retire(pooled)
+                if healthy and not pooled.retired and not page.is_closed():
+                    self._idle.append(slot)
+                else:
+                    await self._close_page(pooled, page)
+
+    async def _close(self):
+        for pooled in self._contexts:
+            try:
+                await pooled.context.close()
+            except Exception as e:
+                logger.debug(f"Error closing browser context: {e}")
+        self._contexts = []
+        self._idle = []
+        if self._browser is not None:
+            await self._browser.close()
+            self._browser = None
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+    def close(self):
+        """Shut down the browser and stop the pool's event loop."""
+        try:
+            self.run(self._close(), timeout=30)
+        except Exception as e:
+            logger.debug(f"Error closing browser pool: {e}")
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_browser_pool():
+    """Return the process-wide BrowserPool, starting it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = BrowserPool()
+            atexit.register(_pool.close)
+    return _pool
+
+async def get_companies_by_industry_async(industry, max_pages=5, concurrency=None, order=None,
+                                         columns=None, filters=None):
     """
     Fetch company data for a specific industry using Playwright for browser automation.
-    This is more resilient against anti-scraping measures.
+    This is more resilient against anti-scraping measures. The work runs on the
+    shared BrowserPool, so it can be awaited from any event loop.
     
     Args:
         industry (str): Industry name to fetch data for
         max_pages (int): Maximum number of pages to fetch
+        concurrency (int): Screener pages loaded at once (defaults to MAX_PAGES)
+        order (str): finviz sort order, e.g. "-marketcap"
+        columns (list): Only request these columns (see finviz_bs.screener_query)
+        filters (list): (column, op, value) predicates (see finviz_bs.screener_query)
         
     Returns:
         pd.DataFrame: DataFrame containing company data
     """
-    industry_slug = f"ind_{industry.lower().replace(' ', '').replace('-','').replace('&','')}"
-    base_url = f"https://finviz.com/screener.ashx?v=152&f={industry_slug}&c=1,2,6,7,8,10,11,75,21,82,39,40,41,63"
-    
-    all_data = []
+    query = screener_query(columns, filters)
+    base_url = screener_url(industry, order, columns, filters)
     
     try:
         if not ensure_playwright_browsers():
             return pd.DataFrame({"Error": ["Failed to install Playwright browsers"]})
         
-        async with async_playwright() as p:
-            # Launch browser with stealth mode and cloud-friendly options
-            browser = await p.chromium.launch(
-                headless=True,
-                args=[
-                    '--disable-dev-shm-usage',
-                    '--disable-gpu',
-                    '--no-sandbox',
-                    '--disable-setuid-sandbox'
-                ]
-            )
-            context = await browser.new_context(
-                viewport={"width": 1920, "height": 1080},
-                user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36"
-            )
-            
-            # Add stealth mode behavior
-            await context.add_init_script("""
-                // Overwrite the `navigator.webdriver` property
-                Object.defineProperty(navigator, 'webdriver', {
-                    get: () => false,
-                });
-            """)
-            
-            page = await context.new_page()
-            
-            # Enable console logging
-            page.on("console", lambda msg: logger.debug(f"Browser console: {msg.text}"))
-            
-            for current_page in range(1, max_pages + 1):
-                # Calculate the starting row for pagination
-                start_row = (current_page - 1) * 20 + 1
-                
-                # Only add the row parameter if we're not on the first page
-                current_url = base_url if current_page == 1 else f"{base_url}&r={start_row}"
-                
-                logger.info(f"Fetching page {current_page}, URL: {current_url}")
-                logger.info(f"Fetching page {current_page}, URL: {current_url}")
-                
-                # Navigate to the page
-                await page.goto(current_url, timeout=60000)
-                logger.info(f"Got page {current_url}")
-                
-                # Wait for the table to be visible
+        pool = get_browser_pool()
+        return await pool.submit(_scrape_industry(pool, base_url, query, max_pages, concurrency or MAX_PAGES))
+
+    except Exception as e:
+        logger.error(f"Unexpected error: {e}")
+        return pd.DataFrame({"Error": [f"Unexpected error: {str(e)}"]})
+
+# Pulls the screener table and the pagination state out of the page in a
+# single evaluation, as compact arrays of cell texts
+EXTRACT_TABLE_JS = """
+() => {
+    const table = document.querySelector("table.screener_table");
+    const pagination = document.querySelector("td#screener_pagination");
+    const text = (cell) => (cell.textContent || "").trim();
+    const trs = table ? Array.from(table.querySelectorAll("tr")) : [];
+    return {
+        found: table !== null,
+        header: trs.length ? Array.from(trs[0].querySelectorAll("th, td"), text) : [],
+        rows: trs.slice(1).map((tr) => Array.from(tr.querySelectorAll("td"), text)),
+        pages: pagination ? Array.from(pagination.querySelectorAll("a.screener-pages"), text) : null,
+    };
+}
+"""
+
+async def _load_page(pool, url):
+    """Load one screener page on a pooled page and extract it. Returns None if the table is missing."""
+    # Requests share the HTTP scraper's rate limiter; waiting happens off the loop
+    await asyncio.to_thread(rate_limiter.acquire)
+    async with pool.page() as page:
+        logger.info(f"Fetching URL: {url}")
+        await page.goto(url, timeout=60000, wait_until="domcontentloaded")
+        
+        # Wait for the table to be present
+        try:
+            await page.wait_for_selector("table.screener_table", timeout=60000)
+        except Exception as e:
+            logger.error(f"Table not found: {e}")
+            return None
+        
+        # Extract the table and pagination in one round-trip
+        return await page.evaluate(EXTRACT_TABLE_JS)
+
+async def _industry_pages(pool, base_url, spec, max_pages, concurrency):
+    """
+    Yield the screener pages of one industry as column dicts, in page order.
+    Runs on the pool's loop.
+
+    The first page reveals the page count; the rest are loaded concurrently,
+    at most `concurrency` at a time, and each is yielded as soon as it and
+    the pages before it have arrived. Raises LookupError if the first page
+    has no table.
+    """
+    first = await _load_page(pool, base_url)
+    if first is None or not first["found"]:
+        raise LookupError("Could not find data table in page")
+
+    page_numbers = [int(text) for text in first["pages"] or [] if text.isdigit()]
+    last_page = min(max_pages, max(page_numbers, default=1))
+    limit = asyncio.Semaphore(concurrency)
+
+    async def load(page_number):
+        async with limit:
+            # Calculate the starting row for pagination
+            start_row = (page_number - 1) * 20 + 1
+            return await _load_page(pool, f"{base_url}&r={start_row}")
+
+    tasks = [asyncio.ensure_future(load(n)) for n in range(2, last_page + 1)]
+    try:
+        extracted = first
+        for current_page in range(1, last_page + 1):
+            if current_page > 1:
                 try:
-                    await page.wait_for_selector("table.screener_table", timeout=60000)
+                    extracted = await tasks[current_page - 2]
                 except Exception as e:
-                    logger.error(f"Table not found: {e}")
-                    # Try to find any table that might contain the data
-                    table_exists = await page.query_selector("table")
-                    if not table_exists and current_page == 1:
-                        return pd.DataFrame({"Error": ["Could not find data table in page"]})
-                    elif not table_exists:
-                        break
-                
-                # Extract the data from the table
-                rows = await page.query_selector_all("table.screener_table tr:not(:first-child)")
-                
-                if not rows:
-                    logger.info("No rows found, ending pagination")
+                    logger.error(f"Error fetching page {current_page}: {e}")
                     break
-                
-                logger.info(f"Found {len(rows)} rows on page {current_page}")
-                
-                page_data = []
-                for row in rows:
-                    try:
-                        # Get all cells in the row
-                        cells = await row.query_selector_all("td")
-                        
-                        if len(cells) < 13:
-                            continue
-                        
-                        # Extract text from each cell
-                        ticker = await cells[0].text_content() if len(cells) > 0 else "Unknown"
-                        company = await cells[1].text_content() if len(cells) > 1 else "Unknown"
-                        marketcap = await cells[2].text_content() if len(cells) > 2 else "N/A"
-                        pe = await cells[3].text_content() if len(cells) > 3 else "N/A"
-                        fwd_pe = await cells[4].text_content() if len(cells) > 4 else "N/A"
-                        ps = await cells[5].text_content() if len(cells) > 5 else "N/A"
-                        pb = await cells[6].text_content() if len(cells) > 6 else "N/A"
-                        dividend = await cells[7].text_content() if len(cells) > 7 else "N/A"
-                        sales_growth = await cells[8].text_content() if len(cells) > 8 else "N/A"
-                        sales = await cells[9].text_content() if len(cells) > 9 else "N/A"
-                        gm = await cells[10].text_content() if len(cells) > 10 else "N/A"
-                        opm = await cells[11].text_content() if len(cells) > 11 else "N/A"
-                        pm = await cells[12].text_content() if len(cells) > 12 else "N/A"
-                        avg_volume = await cells[13].text_content() if len(cells) > 13 else "N/A"
-                        
-                        # Clean up the text (strip whitespace)
-                        ticker = ticker.strip()
-                        company = company.strip()
-                        marketcap = marketcap.strip()
-                        pe = pe.strip()
-                        fwd_pe = fwd_pe.strip()
-                        ps = ps.strip()
-                        pb = pb.strip()
-                        dividend = dividend.strip()
-                        sales_growth = sales_growth.strip()
-                        sales = sales.strip()
-                        gm = gm.strip()
-                        opm = opm.strip()
-                        pm = pm.strip()
-                        avg_volume = avg_volume.strip()
-                        
-                        page_data.append({
-                            "Ticker": ticker,
-                            "Company": company,
-                            "Market cap": marketcap,
-                            "P/E": pe,
-                            "Fwd P/E": fwd_pe,
-                            "P/S": ps,
-                            "P/B": pb,
-                            "Dividend": dividend,
-                            "Sales 5Y growth": sales_growth,
-                            "Sales": sales,
-                            "Gross Margin": gm,
-                            "Operating Margin": opm,
-                            "Profit Margin": pm,
-                            "Avg. volume": avg_volume
-                        })
-                    except Exception as e:
-                        logger.error(f"Error parsing row: {e}")
-                        continue
-                
-                if not page_data:
-                    logger.info("No data extracted from page, ending pagination")
+                if extracted is None:
                     break
-                
-                all_data.extend(page_data)
-                
-                # Check if there are more pages
-                pagination = await page.query_selector("td#screener_pagination")
-                if pagination:
-                    # Look for links to pages beyond our current page
-                    next_page_exists = False
-                    page_links = await pagination.query_selector_all("a.screener-pages")
-                    
-                    # Get all page numbers
-                    page_numbers = []
-                    for link in page_links:
-                        try:
-                            text = await link.text_content()
-                            page_numbers.append(text.strip())
-                        except:
-                            pass
-                    
-                    logger.info(f"Page numbers found: {page_numbers}")
-                    
-                    for link in page_links:
-                        try:
-                            text = await link.text_content()
-                            page_num = int(text.strip())
-                            if page_num > current_page:
-                                next_page_exists = True
-                                break
-                        except:
-                            # Skip links that don't have a page number
-                            continue
-                    
-                    if not next_page_exists:
-                        logger.info("No next page links found, ending pagination")
-                        break
-                else:
-                    # No pagination found, so we're done
-                    logger.info("No pagination element found, ending pagination")
-                    break
-                
-                # Add a delay between pages to be polite
-                await asyncio.sleep(2)
-            
-            await browser.close()
-    
+            if not extracted["found"] or not extracted["rows"]:
+                logger.info("No rows found, ending pagination")
+                break
+
+            logger.info(f"Found {len(extracted['rows'])} rows on page {current_page}")
+
+            columns = build_columns(spec, extracted["header"], extracted["rows"])
+            if not columns["Ticker"]:
+                logger.info("No data extracted from page, ending pagination")
+                break
+
+            yield columns
+            # If this page had fewer than 20 rows, it's the last one
+            if len(extracted["rows"]) < 20:
+                break
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def _scrape_industry(pool, base_url, query, max_pages, concurrency):
+    """Fetch the screener pages for one industry into one frame. Runs on the pool's loop."""
+    pages = []
+
+    try:
+        async for columns in _industry_pages(pool, base_url, query.spec, max_pages, concurrency):
+            pages.append(columns)
+    except LookupError as e:
+        return pd.DataFrame({"Error": [str(e)]})
     except Exception as e:
         logger.error(f"Unexpected error: {e}")
         return pd.DataFrame({"Error": [f"Unexpected error: {str(e)}"]})
     
-    if not all_data:
+    if not pages:
         return pd.DataFrame({"Error": ["No data found for this industry"]})
     
-    return pd.DataFrame(all_data)
+    return apply_filters(pd.DataFrame({
+        name: [value for columns in pages for value in columns[name]]
+        for name in query.spec.names
+    }), query.residual)
+
+
+async def iter_companies_async(industry, max_pages=5, concurrency=None, order=None, columns=None, filters=None):
+    """
+    Async iterator over an industry's companies, one screener page at a time.
+
+    The browser work runs on the shared BrowserPool; pages are handed over to
+    the caller's event loop as they arrive, so the first rows can be shown
+    while later pages are still loading. Stopping early cancels the rest.
+
+    Args:
+        industry (str): Industry name to fetch data for
+        max_pages (int): Maximum number of pages to fetch
+        concurrency (int): Screener pages loaded at once (defaults to MAX_PAGES)
+        order (str): finviz sort order, e.g. "-marketcap"
+        columns (list): Only request these columns (see finviz_bs.screener_query)
+        filters (list): (column, op, value) predicates (see finviz_bs.screener_query)
+
+    Yields:
+        pd.DataFrame: One page of companies. Failures end the iteration
+        after logging, like an industry without data
+    """
+    if not ensure_playwright_browsers():
+        logger.error("Failed to install Playwright browsers")
+        return
+    pool = get_browser_pool()
+    query = screener_query(columns, filters)
+    base_url = screener_url(industry, order, columns, filters)
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    done = object()
+
+    async def pump():
+        try:
+            async for columns in _industry_pages(pool, base_url, query.spec, max_pages, concurrency or MAX_PAGES):
+                loop.call_soon_threadsafe(queue.put_nowait, columns)
+        except Exception as e:
+            logger.error(f"Streaming {industry} failed: {e}")
+        finally:
+            # The caller may have stopped iterating and closed its loop
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(queue.put_nowait, done)
+
+    future = asyncio.run_coroutine_threadsafe(pump(), pool.loop)
+    try:
+        while True:
+            columns = await queue.get()
+            if columns is done:
+                break
+            yield apply_filters(pd.DataFrame(columns, columns=query.spec.names), query.residual)
+    finally:
+        future.cancel()
 
-def get_companies_by_industry(industry, max_pages=5):
+def get_companies_by_industry(industry, max_pages=5, concurrency=None, order=None, columns=None, filters=None):
     """
     Synchronous wrapper for the async function to fetch company data.
+    Runs on the pooled browser's event loop instead of starting a new one.
     
     Args:
         industry (str): Industry name to fetch data for
         max_pages (int): Maximum number of pages to fetch
+        concurrency (int): Screener pages loaded at once (defaults to MAX_PAGES)
+        order (str): finviz sort order, e.g. "-marketcap"
+        columns (list): Only request these columns (see finviz_bs.screener_query)
+        filters (list): (column, op, value) predicates (see finviz_bs.screener_query)
         
     Returns:
         pd.DataFrame: DataFrame containing company data
     """
-    return asyncio.run(get_companies_by_industry_async(industry, max_pages))
+    return get_browser_pool().run(
+        get_companies_by_industry_async(industry, max_pages, concurrency, order, columns, filters)
+    )
+
+
+async def _load_groups(pool):
+    """Load the industry groups page and parse it like the HTTP scraper does."""
+    await asyncio.to_thread(rate_limiter.acquire)
+    async with pool.page() as page:
+        logger.info(f"Fetching URL: {GROUPS_URL}")
+        await page.goto(GROUPS_URL, timeout=60000, wait_until="domcontentloaded")
+        try:
+            await page.wait_for_selector("table.table-light", timeout=60000)
+        except Exception as e:
+            logger.error(f"Table not found: {e}")
+            return pd.DataFrame({"Error": ["Table not found on page"]})
+        html = await page.content()
+
+    parsed = parse_groups(html)
+    if parsed is None or not parsed[0]["Sector"]:
+        return pd.DataFrame({"Error": ["No data found in table"]})
+    return pd.DataFrame(parsed[0])
+
+
+def get_sector_data():
+    """
+    Scrape the finviz industry groups table in the pooled browser.
+
+    Returns:
+        pd.DataFrame: Same columns as finviz_bs.get_sector_data_bs, or an
+        "Error" frame
+    """
+    try:
+        if not ensure_playwright_browsers():
+            return pd.DataFrame({"Error": ["Failed to install Playwright browsers"]})
+        pool = get_browser_pool()
+        return pool.run(_load_groups(pool))
+    except Exception as e:
+        logger.error(f"Unexpected error: {e}")
+        return pd.DataFrame({"Error": [f"Unexpected error: {str(e)}"]})
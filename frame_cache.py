@@ -0,0 +1,152 @@
+"""
+Process-wide LRU cache of DataFrames with a memory budget.
+
+Streamlit re-executes app.py on every rerun but imports this module once per
+process, so the cache here is shared by every session served by the process.
+Concurrent loads of the same key are coalesced: the first caller runs the
+loader and every other caller waits on the same in-flight future.
+"""
+from collections import OrderedDict
+from concurrent.futures import Future
+import logging
+import os
+import threading
+import time
+
+from metrics import counter
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+COMPANY_CACHE_BYTES = int(os.environ.get("COMPANY_CACHE_MB", "256")) * 1024 * 1024
+# Entries are re-read from the snapshot store after this many seconds so
+# background refreshes reach long-running processes
+COMPANY_CACHE_TTL = float(os.environ.get("COMPANY_CACHE_TTL", "300"))
+
+CACHE_LOOKUPS = counter(
+    "frame_cache_lookups_total", "Frame cache lookups by result (hit, miss, coalesced)", ["cache", "result"],
+)
+CACHE_EVICTIONS = counter("frame_cache_evictions_total", "Frames evicted to stay within the memory budget", ["cache"])
+
+
+def _frame_bytes(df):
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def _is_cacheable(df):
+    return df is not None and not df.empty and "Error" not in df.columns
+
+
+class FrameCache:
+    """Thread-safe LRU of DataFrames bounded by total memory, with single-flight loads."""
+
+    def __init__(self, max_bytes, ttl=None, name="frames"):
+        self.name = name
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.current_bytes = 0
+        self._entries = OrderedDict()  # key -> (frame, size, loaded_at or None once expired)
+        self._inflight = {}  # key -> Future
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        frame, size, loaded_at = entry
+        # Expired entries stay until replaced or evicted so peek() can still
+        # hand them out as the base for an incremental update
+        if loaded_at is None or (self.ttl is not None and time.time() - loaded_at > self.ttl):
+            return None
+        self._entries.move_to_end(key)
+        return frame
+
+    def _discard(self, key):
+        _, size, _ = self._entries.pop(key)
+        self.current_bytes -= size
+
+    def _store(self, key, frame):
+        if key in self._entries:
+            self._discard(key)
+        size = _frame_bytes(frame)
+        if size > self.max_bytes:
+            logger.warning(f"Frame for {key} ({size} bytes) exceeds the cache budget, not caching")
+            return
+        self._entries[key] = (frame, size, time.time())
+        self.current_bytes += size
+        while self.current_bytes > self.max_bytes:
+            evicted, _ = next(iter(self._entries.items()))
+            self._discard(evicted)
+            CACHE_EVICTIONS.inc(cache=self.name)
+            logger.debug(f"Evicted {evicted} from frame cache")
+
+    def get(self, key):
+        with self._lock:
+            return self._lookup(key)
+
+    def peek(self, key):
+        """Cached frame for key even if expired, without touching its LRU position."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[0] if entry is not None else None
+
+    def put(self, key, frame):
+        with self._lock:
+            self._store(key, frame)
+
+    def expire(self, key):
+        """Make the next get_or_load reload key, keeping the old frame available to peek()."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries[key] = (entry[0], entry[1], None)
+
+    def invalidate(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._discard(key)
+
+    def get_or_load(self, key, loader):
+        """
+        Return the cached frame for key, running loader at most once per miss.
+
+        Callers that arrive while a load for the same key is in flight wait for
+        it and share its result (or its exception). Error and empty frames are
+        handed to the waiters but not cached.
+        """
+        with self._lock:
+            frame = self._lookup(key)
+            if frame is not None:
+                CACHE_LOOKUPS.inc(cache=self.name, result="hit")
+                return frame
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+        CACHE_LOOKUPS.inc(cache=self.name, result="miss" if owner else "coalesced")
+
+        if not owner:
+            return future.result()
+
+        try:
+            frame = loader()
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[key]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            if _is_cacheable(frame):
+                self._store(key, frame)
+            del self._inflight[key]
+        future.set_result(frame)
+        return frame
+
+
+company_cache = FrameCache(COMPANY_CACHE_BYTES, ttl=COMPANY_CACHE_TTL, name="companies")
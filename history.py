@@ -0,0 +1,256 @@
+"""
+Date-partitioned Parquet history of sector and company multiples.
+
+Every sector snapshot and every default company view (see HISTORY_VIEW)
+written to the snapshot store is also appended here in the typed schema, one
+file per refresh:
+
+    data/history/sectors/date=2026-10-17/1760695200123-<key hash>.parquet
+    data/history/companies/date=2026-10-17/...
+
+Trend queries scan the directory as a hive-partitioned pyarrow dataset: the
+date partition prunes whole directories, only the requested columns are read
+and files are memory-mapped, so a query over the last 90 days touches a small
+slice of the history however large it grows. Past days are compacted into a
+single file (see SnapshotStore.compact_history) to keep the file count bounded.
+"""
+import hashlib
+import logging
+import os
+import threading
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.fs
+import pyarrow.parquet as pq
+
+from aggregates import industry_table
+from finviz_bs import ROWS_PER_PAGE, parse_screener_key
+from normalize import COMPANY_METRICS, SECTOR_METRICS, normalize_companies, normalize_sectors
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+HISTORY_DIR = os.environ.get(
+    "HISTORY_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "history"),
+)
+HISTORY_ENABLED = os.environ.get("HISTORY_ENABLED", "1") == "1"
+
+# Source is the snapshot endpoint a sector row came from: "groups" (finviz's
+# own aggregates) or "universe" (derived locally, see aggregates.py). The two
+# are computed differently, so a trend only ever reads one of them.
+SECTOR_SCHEMA = pa.schema(
+    [("fetched_at", pa.timestamp("ms", tz="UTC")), ("Sector", pa.string()), ("Source", pa.string())]
+    + [(col, pa.float64()) for col in SECTOR_METRICS]
+)
+COMPANY_SCHEMA = pa.schema(
+    [("fetched_at", pa.timestamp("ms", tz="UTC")), ("Industry", pa.string()),
+     ("Ticker", pa.string()), ("Company", pa.string())]
+    + [(col, pa.float64()) for col in COMPANY_METRICS]
+)
+DATASETS = {"sectors": SECTOR_SCHEMA, "companies": COMPANY_SCHEMA}
+
+# The one screener view kept in history: the first page by market cap
+# (delta.TOP_ORDER, delta.TOP_ROWS). Deeper "load more" views repeat its
+# tickers, and the dataset has no view column to tell them apart.
+HISTORY_VIEW = ("-marketcap", ROWS_PER_PAGE)
+
+PARTITIONING = ds.partitioning(pa.schema([("date", pa.string())]), flavor="hive")
+
+
+def _typed_rows(endpoint, key, df):
+    """(dataset, typed frame) for a raw snapshot frame, or None if it is not kept in history."""
+    if endpoint == "groups" and key == "industry":
+        return "sectors", normalize_sectors(df)
+    if endpoint == "screener":
+        industry, order, limit = parse_screener_key(key)
+        if (order, limit) != HISTORY_VIEW:
+            return None
+        return "companies", normalize_companies(df, industry)
+    if endpoint == "universe":
+        # The sector table derived from a universe scan continues the groups history
+        return "sectors", industry_table(normalize_companies(df))
+    return None
+
+
+def _write_atomic(table, path):
+    # Dataset discovery skips dot-files, so the partial file is never scanned
+    directory, name = os.path.split(path)
+    temporary = os.path.join(directory, f".{name}.tmp")
+    pq.write_table(table, temporary)
+    os.replace(temporary, path)
+
+
+class HistoryStore:
+    """Append-only Parquet history, partitioned by UTC date."""
+
+    def __init__(self, root=HISTORY_DIR):
+        self.root = root
+        self._filesystem = pyarrow.fs.LocalFileSystem(use_mmap=True)
+        self._lock = threading.Lock()
+
+    def _partition(self, dataset, day):
+        return os.path.join(self.root, dataset, f"date={day}")
+
+    def append(self, endpoint, key, df, fetched_at=None):
+        """
+        Append one snapshot to the history.
+
+        Args:
+            endpoint (str): Snapshot endpoint, "groups", "screener" or "universe"
+            key (str): Snapshot key, e.g. an industry name
+            df (pd.DataFrame): Raw frame as stored in the snapshot store
+            fetched_at (float): Unix time of the fetch (defaults to now)
+
+        Returns:
+            str: Path of the written file, or None if nothing was written
+        """
+        typed = _typed_rows(endpoint, key, df)
+        if typed is None:
+            return None
+        dataset, frame = typed
+        if frame is None or frame.empty or "Error" in frame.columns:
+            return None
+
+        fetched_at = fetched_at or time.time()
+        schema = DATASETS[dataset]
+        frame = frame.copy()
+        frame["fetched_at"] = pd.Timestamp(int(fetched_at * 1000), unit="ms", tz="UTC")
+        if dataset == "sectors":
+            frame["Source"] = endpoint
+        for col in ("Sector", "Industry"):
+            if col in frame.columns:
+                frame[col] = frame[col].astype(str)
+        # Columns a view did not fetch are recorded as missing
+        table = pa.Table.from_pandas(frame.reindex(columns=schema.names), schema=schema, preserve_index=False)
+
+        day = time.strftime("%Y-%m-%d", time.gmtime(fetched_at))
+        directory = self._partition(dataset, day)
+        os.makedirs(directory, exist_ok=True)
+        name = f"{int(fetched_at * 1000)}-{hashlib.md5(key.encode()).hexdigest()[:10]}.parquet"
+        path = os.path.join(directory, name)
+        # Write under a hidden name so scans never see a half-written file
+        _write_atomic(table, path)
+        return path
+
+    def scan(self, dataset, columns, filter=None, days=None):
+        """
+        Read columns of a history dataset.
+
+        Args:
+            dataset (str): "sectors" or "companies"
+            columns (list): Columns to read; other columns are never loaded
+            filter (pyarrow.compute.Expression): Row filter, pushed into the scan
+            days (int): Only read the last this many days of partitions
+
+        Returns:
+            pd.DataFrame: Matching rows (empty with the requested columns if none)
+        """
+        directory = os.path.join(self.root, dataset)
+        schema = DATASETS[dataset]
+        if not os.path.isdir(directory):
+            return schema.empty_table().select(columns).to_pandas()
+
+        if days is not None:
+            since = time.strftime("%Y-%m-%d", time.gmtime(time.time() - days * 86400))
+            date_filter = ds.field("date") >= since
+            filter = date_filter if filter is None else filter & date_filter
+
+        for attempt in range(2):
+            try:
+                dataset = ds.dataset(
+                    directory, schema=schema.append(pa.field("date", pa.string())), format="parquet", partitioning=PARTITIONING,
+                    filesystem=self._filesystem,
+                )
+                return dataset.to_table(columns=columns, filter=filter).to_pandas()
+            except FileNotFoundError:
+                # A partition was compacted between listing and reading
+                if attempt:
+                    raise
+
+    def sector_trend(self, sectors, metric, days=90, source="groups"):
+        """
+        One metric over time for the given sectors.
+
+        Args:
+            sectors (list): Sector names
+            metric (str): Metric column
+            days (int): How far back to read
+            source (str): Snapshot endpoint the rows came from, "groups" or
+                "universe"; rows written before sources were recorded count
+                as groups
+
+        Returns:
+            pd.DataFrame: Indexed by fetch time, one column per sector
+        """
+        matches = ds.field("Source") == source
+        if source == "groups":
+            matches = matches | ds.field("Source").is_null()
+        frame = self.scan(
+            "sectors", ["fetched_at", "Sector", metric], ds.field("Sector").isin(list(sectors)) & matches, days,
+        )
+        if frame.empty:
+            return pd.DataFrame(columns=list(sectors))
+        return frame.pivot_table(index="fetched_at", columns="Sector", values=metric, aggfunc="last").sort_index()
+
+    def compact(self, before=None):
+        """
+        Merge each partition older than before (a YYYY-MM-DD string, default
+        today in UTC) into a single file. Returns the number of partitions merged.
+
+        Only one process may compact a history directory at a time; callers
+        in several processes hold the snapshot store's ("history", "compact")
+        lease around it (see SnapshotStore.compact_history).
+        """
+        before = before or time.strftime("%Y-%m-%d", time.gmtime())
+        merged = 0
+        with self._lock:
+            for dataset, schema in DATASETS.items():
+                directory = os.path.join(self.root, dataset)
+                if not os.path.isdir(directory):
+                    continue
+                for partition in sorted(os.listdir(directory)):
+                    if not partition.startswith("date=") or partition[5:] >= before:
+                        continue
+                    path = os.path.join(directory, partition)
+                    files = sorted(f for f in os.listdir(path) if f.endswith(".parquet"))
+                    if len(files) < 2:
+                        continue
+                    table = pa.concat_tables(
+                        pq.read_table(os.path.join(path, f), schema=schema) for f in files
+                    ).sort_by([("fetched_at", "ascending")])
+                    target = os.path.join(path, "compacted.parquet")
+                    _write_atomic(table, target)
+                    for f in files:
+                        if f != "compacted.parquet":
+                            os.remove(os.path.join(path, f))
+                    merged += 1
+                    logger.info(f"Compacted {len(files)} history files in {dataset}/{partition}")
+        return merged
+
+
+_history = None
+_history_lock = threading.Lock()
+
+
+def get_history():
+    """Return the process-wide HistoryStore."""
+    global _history
+    with _history_lock:
+        if _history is None:
+            _history = HistoryStore()
+    return _history
+
+
+def record_snapshot(endpoint, key, df, fetched_at=None):
+    """Append a stored snapshot to the history; failures are logged, never raised."""
+    if not HISTORY_ENABLED:
+        return
+    try:
+        get_history().append(endpoint, key, df, fetched_at)
+    except Exception as e:
+        logger.error(f"Could not record history for {endpoint}/{key}: {e}")
@@ -0,0 +1,237 @@
+"""
+Load test: many simulated app sessions against a local finviz stand-in.
+
+Starts loadtest/stub_server.py in-process (or uses --base-url), points the
+scrapers at it through FINVIZ_BASE_URL with a fresh snapshot store and
+history directory, then drives Streamlit sessions headlessly with AppTest.
+Each session opens the page, adds --sectors-per-session random sectors one
+at a time, switches between their company tabs and loads more rows once.
+
+Sessions run --concurrency at a time in each of --processes worker
+processes, which share the snapshot store like app replicas do. Reported:
+
+    time-to-render    p50 / p95 / max per step, in seconds
+    upstream          requests that reached the stand-in, and how many got 429
+    peak memory       max RSS of each worker process
+
+Usage:
+
+    python loadtest/run.py --sessions 50 --concurrency 50
+    python loadtest/run.py --sessions 200 --processes 4 --latency 200 --jitter 100 --throttle 0.05
+"""
+import argparse
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+import json
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+from urllib.request import urlopen
+
+import numpy as np
+
+LOADTEST_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(LOADTEST_DIR)
+APP = os.path.join(ROOT, "app.py")
+
+sys.path.insert(0, LOADTEST_DIR)
+
+from stub_server import StubFinviz, make_server  # noqa: E402
+
+STEPS = ["first_render", "select_sector", "switch_sector", "load_more"]
+
+
+def configure(base_url, data_dir):
+    """Point the app at the stand-in; must run before any app module is imported."""
+    os.environ["FINVIZ_BASE_URL"] = base_url
+    os.environ["SNAPSHOT_DB"] = os.path.join(data_dir, "snapshots.sqlite")
+    os.environ["HISTORY_DIR"] = os.path.join(data_dir, "history")
+    # The stand-in only speaks HTTP; never fall back to a browser
+    os.environ["FETCH_BROWSER_FALLBACK"] = "0"
+    os.environ.pop("REFRESH_IN_PROCESS", None)
+
+
+def pin_runtime():
+    """
+    Install one stand-in Streamlit runtime for the whole process.
+
+    AppTest creates a runtime before each script run and clears it after, so
+    runs in parallel threads would tear down each other's, and compiles the
+    script once per run, which is not thread-safe on every Python version. A
+    server process holds one runtime and one script cache for all sessions;
+    do the same here.
+    """
+    from unittest.mock import MagicMock
+
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import local_script_runner
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime.instance = classmethod(lambda cls: runtime)
+    Runtime.exists = classmethod(lambda cls: True)
+    script_cache = ScriptCache()
+    local_script_runner.ScriptCache = lambda: script_cache
+
+
+def sector_names():
+    """Every sector the stand-in's groups page lists."""
+    from finviz_parse import parse_groups
+    from stub_server import load_fixture
+
+    columns, _ = parse_groups(load_fixture("groups.html"))
+    return columns["Sector"]
+
+
+def run_session(index, sectors, per_session, timeout):
+    """
+    Drive one session through the page.
+
+    Returns:
+        tuple: ([(step, seconds)], number of exceptions rendered)
+    """
+    from streamlit.testing.v1 import AppTest
+
+    rnd = random.Random(index)
+    timings = []
+    errors = 0
+
+    def step(name, action):
+        nonlocal errors
+        started = time.perf_counter()
+        action()
+        timings.append((name, time.perf_counter() - started))
+        errors += len(at.exception)
+
+    at = AppTest.from_file(APP, default_timeout=timeout)
+    step("first_render", at.run)
+    chosen = rnd.sample(sectors, min(per_session, len(sectors)))
+    for count in range(1, len(chosen) + 1):
+        step("select_sector", lambda: at.multiselect[0].set_value(chosen[:count]).run())
+    for sector in rnd.sample(chosen, len(chosen)):
+        step("switch_sector", lambda: at.radio(key="active_sector").set_value(sector).run())
+    buttons = [button for button in at.button if str(button.key).startswith("load-more-")]
+    if buttons:
+        step("load_more", lambda: buttons[0].click().run())
+    return timings, errors
+
+
+def run_worker(base_url, data_dir, sessions, sectors, per_session, concurrency, timeout):
+    """
+    Run sessions in one process, concurrency at a time.
+
+    Returns:
+        dict: timings, errors and the peak RSS of this process in MB
+    """
+    configure(base_url, data_dir)
+    pin_runtime()
+    timings = []
+    errors = failures = 0
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [pool.submit(run_session, index, sectors, per_session, timeout) for index in sessions]
+        for future in futures:
+            try:
+                session_timings, session_errors = future.result()
+            except Exception as e:
+                print(f"Session failed: {e!r}", file=sys.stderr)
+                failures += 1
+                continue
+            timings.extend(session_timings)
+            errors += session_errors
+    # ru_maxrss is in kilobytes on Linux
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return {"pid": os.getpid(), "timings": timings, "errors": errors, "failures": failures, "peak_mb": peak_mb}
+
+
+def report(results, stats, elapsed, sessions):
+    timings = defaultdict(list)
+    for result in results:
+        for name, seconds in result["timings"]:
+            timings[name].append(seconds)
+
+    print(f"\n{sessions} sessions in {elapsed:.1f}s\n")
+    print(f"{'step':<15}{'count':>7}{'p50':>9}{'p95':>9}{'max':>9}")
+    for name in STEPS:
+        if not timings[name]:
+            continue
+        values = np.array(timings[name])
+        p50, p95 = np.percentile(values, [50, 95])
+        print(f"{name:<15}{len(values):>7}{p50:>9.3f}{p95:>9.3f}{values.max():>9.3f}")
+
+    print(f"\nupstream requests: {stats['total']} ({stats['throttled']} answered 429)")
+    for kind, count in sorted(stats["requests"].items()):
+        print(f"  {kind:<13}{count:>7}")
+
+    print("\npeak memory per process:")
+    for result in results:
+        print(f"  pid {result['pid']:<8}{result['peak_mb']:>8.0f} MB")
+
+    errors = sum(result["errors"] for result in results)
+    failures = sum(result["failures"] for result in results)
+    if errors or failures:
+        print(f"\n{errors} exceptions rendered, {failures} sessions failed")
+    return 1 if failures else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the app against a local finviz stand-in.")
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=10, help="simultaneous sessions per process")
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--sectors-per-session", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=120, help="seconds allowed per script run")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--base-url", help="use a stand-in already running here instead of starting one")
+    parser.add_argument("--latency", type=float, default=100, help="mean upstream delay in ms")
+    parser.add_argument("--jitter", type=float, default=50, help="uniform +/- upstream delay in ms")
+    parser.add_argument("--throttle", type=float, default=0, help="fraction of upstream requests answered 429")
+    parser.add_argument("--rows-per-industry", type=int, default=67)
+    args = parser.parse_args()
+
+    server = None
+    base_url = args.base_url
+    if base_url is None:
+        stub = StubFinviz(args.latency / 1000, args.jitter / 1000, args.throttle, args.rows_per_industry, args.seed)
+        server = make_server(stub)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    urlopen(f"{base_url}/reset").read()
+
+    sys.path.insert(0, ROOT)
+    sectors = sector_names()
+    shards = [list(range(args.sessions))[i::args.processes] for i in range(args.processes)]
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        started = time.perf_counter()
+        if args.processes == 1:
+            results = [run_worker(
+                base_url, data_dir, shards[0], sectors, args.sectors_per_session, args.concurrency, args.timeout,
+            )]
+        else:
+            # spawn so every worker imports the app modules fresh, like a new replica
+            context = multiprocessing.get_context("spawn")
+            with context.Pool(args.processes) as pool:
+                results = pool.starmap(run_worker, [
+                    (base_url, data_dir, shard, sectors, args.sectors_per_session, args.concurrency, args.timeout)
+                    for shard in shards
+                ])
+        elapsed = time.perf_counter() - started
+
+    stats = json.loads(urlopen(f"{base_url}/stats").read())
+    if server is not None:
+        server.shutdown()
+    return report(results, stats, elapsed, args.sessions)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
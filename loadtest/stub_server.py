@@ -0,0 +1,144 @@
+"""
+Local stand-in for finviz, replaying the recorded benchmark pages.
+
+Serves benchmarks/fixtures/groups.html for /groups.ashx and the recorded
+screener page for every /screener.ashx request, whatever the filters and
+columns. Pages are paginated like finviz (20 rows, r= for the first row,
+"#1 / N Total" above the table) over --rows-per-industry rows. Latency and
+429 responses can be injected to see how the app behaves when finviz is
+slow or throttling. Point the scrapers at it with FINVIZ_BASE_URL:
+
+    python loadtest/stub_server.py --port 8700 --latency 150 --jitter 100 --throttle 0.05
+    FINVIZ_BASE_URL=http://127.0.0.1:8700 streamlit run app.py
+
+GET /stats returns the requests served so far as JSON; GET /reset clears them.
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+from bench import load_fixture, resize_screener  # noqa: E402
+
+# Rows per screener page, as on finviz
+ROWS_PER_PAGE = 20
+_TOTAL_PATTERN = re.compile(r"#\d+\s*/\s*\d+\s*Total")
+
+
+class StubFinviz:
+    """Page source and request counters shared by the handler threads."""
+
+    def __init__(self, latency=0.0, jitter=0.0, throttle=0.0, rows_per_industry=67, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.throttle = throttle
+        self.rows_per_industry = rows_per_industry
+        self.groups = load_fixture("groups.html")
+        self.screener = load_fixture("screener.html")
+        self._pages = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = {}
+            self.throttled = 0
+
+    def stats(self):
+        with self._lock:
+            return {"requests": dict(self.requests), "throttled": self.throttled, "total": sum(self.requests.values())}
+
+    def screener_page(self, start_row):
+        """The screener fixture holding rows start_row.. of an industry, cached per page."""
+        rows = max(0, min(ROWS_PER_PAGE, self.rows_per_industry - start_row + 1))
+        with self._lock:
+            page = self._pages.get(rows, {}).get(start_row)
+        if page is None:
+            page = resize_screener(self.screener, rows)
+            page = _TOTAL_PATTERN.sub(f"#{start_row} / {self.rows_per_industry} Total", page)
+            with self._lock:
+                self._pages.setdefault(rows, {})[start_row] = page
+        return page
+
+    def respond(self, path, query):
+        """(status, body) for a request, after the injected latency."""
+        kind = path.strip("/").split(".")[0] or "other"
+        with self._lock:
+            self.requests[kind] = self.requests.get(kind, 0) + 1
+            delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+            throttled = self._random.random() < self.throttle
+            if throttled:
+                self.throttled += 1
+        time.sleep(delay)
+        if throttled:
+            return 429, "Too Many Requests"
+        if kind == "groups":
+            return 200, self.groups
+        if kind == "screener":
+            return 200, self.screener_page(int(query.get("r", ["1"])[0]))
+        return 404, "Not Found"
+
+
+def make_server(stub, port=0, host="127.0.0.1"):
+    """A ThreadingHTTPServer answering like finviz from stub, not yet serving."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status, text, content_type):
+            body = text.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == "/stats":
+                self._send(200, json.dumps(stub.stats()), "application/json")
+            elif url.path == "/reset":
+                stub.reset()
+                self._send(200, "{}", "application/json")
+            else:
+                status, text = stub.respond(url.path, parse_qs(url.query))
+                self._send(status, text, "text/html; charset=utf-8")
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve recorded finviz pages locally.")
+    parser.add_argument("--port", type=int, default=8700)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--latency", type=float, default=0, help="mean response delay in ms")
+    parser.add_argument("--jitter", type=float, default=0, help="uniform +/- delay in ms")
+    parser.add_argument("--throttle", type=float, default=0, help="fraction of requests answered with 429")
+    parser.add_argument("--rows-per-industry", type=int, default=67)
+    args = parser.parse_args()
+
+    stub = StubFinviz(args.latency / 1000, args.jitter / 1000, args.throttle, args.rows_per_industry)
+    server = make_server(stub, args.port, args.host)
+    print(f"Serving recorded finviz pages on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,227 @@
+"""
+In-process counters and latency histograms for the scraping pipeline.
+
+Each module declares the metrics it records at import time:
+
+    HTTP_REQUESTS = counter("finviz_http_requests_total", "Upstream HTTP requests", ["endpoint", "status"])
+    HTTP_REQUESTS.inc(endpoint="screener", status=200)
+
+    PARSE_SECONDS = histogram("finviz_parse_seconds", "Table parse time", ["table"])
+    with PARSE_SECONDS.time(table="screener"):
+        ...
+
+Recording is a dict update under a lock, cheap enough for every request and
+row batch. The registry renders in the Prometheus text exposition format,
+served on METRICS_PORT when that is set (see start_http_server) and shown on
+the Streamlit admin page.
+"""
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import logging
+import os
+import threading
+import time
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Serve /metrics on this port from each process when set
+METRICS_PORT = os.environ.get("METRICS_PORT")
+
+# Upper bounds in seconds; chosen to separate parse (ms) from fetch (100s of ms) times
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs += [f'{name}="{value}"' for name, value in extra]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labels):
+            raise ValueError(f"{self.name} expects labels {self.labels}, got {tuple(labels)}")
+        # Label values are strings in the exposition format; storing them as
+        # such also keeps keys sortable when one label sees both 429 and "error"
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def _header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """A monotonically increasing count per label set."""
+
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def values(self):
+        """{label values tuple: count}"""
+        with self._lock:
+            return dict(self._values)
+
+    def render(self):
+        lines = self._header()
+        for key, value in sorted(self.values().items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, key)} {value}")
+        return lines
+
+
+class Histogram(_Metric):
+    """Observation counts per bucket, plus sum and count, per label set."""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                # Per-bucket (non-cumulative) counts, sum, count
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def values(self):
+        """{label values tuple: (bucket counts, sum, count)}"""
+        with self._lock:
+            return {key: (list(counts), total, count) for key, (counts, total, count) in self._values.items()}
+
+    def quantile(self, q, **labels):
+        """Approximate quantile (the upper bound of the bucket holding it), or None without data."""
+        entry = self.values().get(self._key(labels))
+        if entry is None or not entry[2]:
+            return None
+        counts, _, count = entry
+        seen = 0
+        for bound, bucket in zip(self.buckets + (float("inf"),), counts):
+            seen += bucket
+            if seen >= q * count:
+                return bound
+        return float("inf")
+
+    def render(self):
+        lines = self._header()
+        for key, (counts, total, count) in sorted(self.values().items()):
+            cumulative = 0
+            for bound, bucket in zip(self.buckets, counts):
+                cumulative += bucket
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, [('le', bound)])} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, [('le', '+Inf')])} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {count}")
+        return lines
+
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def _register(cls, name, *args, **kwargs):
+    with _registry_lock:
+        metric = _registry.get(name)
+        if metric is None:
+            metric = _registry[name] = cls(name, *args, **kwargs)
+        elif not isinstance(metric, cls):
+            raise ValueError(f"Metric {name} is already registered as a {metric.kind}")
+        return metric
+
+
+def counter(name, documentation, labels=()):
+    """Return the Counter called name, creating it on first use."""
+    return _register(Counter, name, documentation, labels)
+
+
+def histogram(name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+    """Return the Histogram called name, creating it on first use."""
+    return _register(Histogram, name, documentation, labels, buckets=buckets)
+
+
+def registered():
+    """All metrics, sorted by name."""
+    with _registry_lock:
+        return [_registry[name] for name in sorted(_registry)]
+
+
+def render_text():
+    """Every metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in registered():
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_text().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(f"metrics: {format % args}")
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_http_server(port=None):
+    """
+    Serve GET /metrics on a daemon thread, once per process.
+
+    Returns:
+        ThreadingHTTPServer: The server, or None if the port is in use (e.g. by
+        another worker on the same host)
+    """
+    global _server
+    port = int(METRICS_PORT if port is None else port)
+    with _server_lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer(("", port), _MetricsHandler)
+            except OSError as e:
+                logger.warning(f"Could not serve metrics on port {port}: {e}")
+                return None
+            threading.Thread(target=_server.serve_forever, name="metrics-http", daemon=True).start()
+            logger.info(f"Serving metrics on port {_server.server_address[1]}")
+    return _server
@@ -0,0 +1,141 @@
+"""
+Vectorized conversion of finviz value strings to numbers, and back.
+
+finviz renders values as display strings: "2.93T", "845.12B", "12.30M",
+"950.5K", "12.45%", "1,234,567", with "-" or "N/A" for missing data. The
+parser below handles all of these in one regex pass over a column.
+
+Scraped frames are normalized once, when they enter the process cache, into
+a typed schema: float64 metric columns in display units, text identifier
+columns and a categorical industry. Display strings are regenerated from the
+floats by format_frame, so the raw strings are not kept in memory.
+"""
+import numpy as np
+import pandas as pd
+
+from metrics import histogram
+
+SUFFIX_SCALE = {"T": 1e12, "B": 1e9, "M": 1e6, "K": 1e3, "%": 1.0, "": 1.0}
+
+# Money and volume columns are expressed in millions; everything else
+# (ratios, percentages) is left unscaled
+COLUMN_UNITS = {
+    "Market cap": 1e6,
+    "Sales": 1e6,
+    "Avg. volume": 1e6,
+}
+PERCENT_COLUMNS = {"Dividend", "Sales 5Y growth", "Gross Margin", "Operating Margin", "Profit Margin"}
+
+COMPANY_TEXT_COLUMNS = ["Ticker", "Company"]
+COMPANY_METRICS = [
+    "Market cap", "P/E", "Fwd P/E", "P/S", "P/B", "Dividend", "Sales 5Y growth",
+    "Sales", "Gross Margin", "Operating Margin", "Profit Margin", "Avg. volume",
+]
+SECTOR_METRICS = ["Market cap", "P/E", "Fwd P/E", "P/S", "P/B", "Dividend", "Sales 5Y growth", "Avg. volume"]
+# Sector statistics only available when derived from company data (see aggregates.py)
+DERIVED_METRICS = ["Median P/E", "P/E 25th pct", "P/E 75th pct"]
+# Metrics the app offers to chart, for sectors and for their companies; derived
+# statistics are charted from the company column they summarize
+CHART_METRICS = [
+    "Market cap", "P/E", "P/S", "P/B", "Dividend", "Sales 5Y growth", "Avg. volume",
+    "Gross Margin", "Operating Margin", "Profit Margin",
+]
+
+# finviz never prints "T": trillion-dollar caps render as e.g. "2930.12B"
+_MAGNITUDES = [(1e9, "B"), (1e6, "M"), (1e3, "K")]
+
+NORMALIZE_SECONDS = histogram("finviz_normalize_seconds", "Time to convert a scraped frame to the typed schema", ["kind"])
+
+_VALUE_PATTERN = r"^\s*([-+]?[\d,]*\.?\d+)\s*([TBMK%]?)\s*$"
+
+
+def to_numeric(series, unit=1.0):
+    """
+    Parse a column of finviz value strings to floats.
+
+    Args:
+        series (pd.Series): Raw display strings (or numbers)
+        unit (float): Divisor for the result, e.g. 1e6 to express values in millions
+
+    Returns:
+        pd.Series: float64 values; anything unparseable ("-", "N/A", "") is NaN.
+        Columns that are already numeric are assumed to be normalized and are
+        returned unscaled.
+    """
+    if pd.api.types.is_numeric_dtype(series):
+        return series.astype("float64")
+
+    parts = series.astype("string").str.extract(_VALUE_PATTERN)
+    values = pd.to_numeric(parts[0].str.replace(",", "", regex=False), errors="coerce")
+    scale = parts[1].map(SUFFIX_SCALE).astype("float64")
+    return (values * scale / unit).astype("float64")
+
+
+def normalize_metrics(df, columns):
+    """Numeric versions of the given columns of df (those present), in their display units."""
+    return pd.DataFrame(
+        {col: to_numeric(df[col], COLUMN_UNITS.get(col, 1.0)) for col in columns if col in df.columns},
+        index=df.index,
+    )
+
+
+def _is_data(df):
+    return df is not None and not df.empty and "Error" not in df.columns
+
+
+def normalize_companies(df, industry=None):
+    """
+    Typed company frame: text Ticker/Company, float metrics and, when given, a
+    categorical Industry. Error and empty frames are returned unchanged.
+    """
+    if not _is_data(df):
+        return df
+    with NORMALIZE_SECONDS.time(kind="companies"):
+        typed = df[[col for col in COMPANY_TEXT_COLUMNS if col in df.columns]].copy()
+        for col, values in normalize_metrics(df, COMPANY_METRICS).items():
+            typed[col] = values
+        if industry is not None:
+            typed["Industry"] = pd.Categorical([industry] * len(typed))
+        elif "Industry" in df.columns:
+            typed["Industry"] = df["Industry"].astype("category")
+    return typed
+
+
+def normalize_sectors(df):
+    """Typed sector frame: categorical Sector and float metrics."""
+    if not _is_data(df):
+        return df
+    with NORMALIZE_SECONDS.time(kind="sectors"):
+        typed = pd.DataFrame({"Sector": df["Sector"].astype("category")}, index=df.index)
+        for col, values in normalize_metrics(df, SECTOR_METRICS).items():
+            typed[col] = values
+    return typed
+
+
+def format_column(series, column):
+    """Render a normalized column back to finviz-style display strings ("-" for missing)."""
+    values = series.astype("float64")
+    if column in COLUMN_UNITS:
+        base = values * COLUMN_UNITS[column]
+        magnitude = base.abs()
+        conditions = [magnitude >= threshold for threshold, _ in _MAGNITUDES]
+        scale = np.select(conditions, [threshold for threshold, _ in _MAGNITUDES], 1.0)
+        suffix = np.select(conditions, [label for _, label in _MAGNITUDES], "")
+        text = (base / scale).map("{:.2f}".format) + pd.Series(suffix, index=series.index)
+    elif column in PERCENT_COLUMNS:
+        text = values.map("{:.2f}%".format)
+    else:
+        text = values.map("{:.2f}".format)
+    return text.where(values.notna(), "-")
+
+
+def format_frame(df):
+    """Copy of df with every numeric metric column rendered as display strings."""
+    display = df.copy()
+    for col in df.columns:
+        if (
+            (col in COMPANY_METRICS or col in SECTOR_METRICS or col in DERIVED_METRICS)
+            and pd.api.types.is_numeric_dtype(df[col])
+        ):
+            display[col] = format_column(df[col], col)
+    return display
@@ -0,0 +1,44 @@
+import streamlit as st
+import pandas as pd
+# Imported for their metric declarations, so every metric is listed even before it is recorded
+import finviz_bs  # noqa: F401
+import snapshot_store  # noqa: F401
+from frame_cache import company_cache
+from metrics import Counter, registered, render_text
+
+st.title("Pipeline metrics")
+st.caption(
+    "Counters and latencies recorded by this server process since it started. "
+    "Set METRICS_PORT to scrape the same data from /metrics."
+)
+
+st.metric(
+    "Company cache",
+    f"{company_cache.current_bytes / 1024 / 1024:.1f} MB",
+    f"{len(company_cache)} sectors",
+    delta_color="off",
+)
+
+for metric in registered():
+    st.subheader(metric.name)
+    st.caption(metric.documentation)
+    if isinstance(metric, Counter):
+        rows = [dict(zip(metric.labels, key), value=value) for key, value in metric.values().items()]
+    else:
+        rows = []
+        for key, (_, total, count) in metric.values().items():
+            labels = dict(zip(metric.labels, key))
+            rows.append(dict(
+                labels,
+                count=count,
+                mean_ms=round(total / count * 1000, 2) if count else None,
+                p50_ms=metric.quantile(0.5, **labels) * 1000,
+                p95_ms=metric.quantile(0.95, **labels) * 1000,
+            ))
+    if rows:
+        st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+    else:
+        st.write("No data yet")
+
+with st.expander("Prometheus text format"):
+    st.code(render_text(), language="text")
@@ -0,0 +1,274 @@
+"""
+Background refresh of sector and company snapshots.
+
+The scheduler walks the industry list from the groups snapshot and re-scrapes
+each industry's default company view (the first market-cap-sorted page)
+shortly before its snapshot expires, so the app always reads a warm store.
+Deeper views a user asked for are refreshed on demand by the app. Industries users open most often go first, crawls
+are staggered, and the whole loop stays inside a global request budget,
+kept in the snapshot store so every scheduler on the host shares it.
+Leases in the snapshot store keep several schedulers (or the app's own
+stale-while-revalidate refreshes) from crawling the same key twice.
+
+Run it as a separate worker next to the app:
+
+    python refresh_worker.py
+
+or inside each Streamlit process by setting REFRESH_IN_PROCESS=1.
+
+With --universe (or REFRESH_UNIVERSE=1) due views are filled from a single
+market-cap-sorted pass over the whole screener, split up by industry, instead
+of one crawl per industry. That costs a fixed number of pages however many
+industries are due, and needs no industry filter, so industries whose
+filter finviz does not recognise are refreshed too. Industries the scan did
+not cover fall back to their own crawl.
+"""
+import argparse
+import logging
+import os
+import threading
+import time
+
+import pandas as pd
+
+from delta import TOP_COLUMNS, TOP_ORDER, TOP_ROWS, fetch_companies_update, frame_update
+from fetcher import get_fetcher
+from finviz_bs import ROWS_PER_PAGE, pages_for, parse_screener_key, screener_key
+from metrics import METRICS_PORT, start_http_server
+from snapshot_store import DEFAULT_TTLS, SharedBudget, get_store
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Upstream requests the schedulers may spend per minute, across all industries
+# and every scheduler process sharing the snapshot store
+REQUESTS_PER_MINUTE = float(os.environ.get("REFRESH_REQUESTS_PER_MINUTE", "30"))
+# Pause between two industry crawls
+STAGGER_SECONDS = float(os.environ.get("REFRESH_STAGGER", "2"))
+# Refresh once this fraction of a snapshot's ttl has elapsed
+REFRESH_AHEAD = 0.8
+# Seconds between scans for due snapshots
+POLL_INTERVAL = 60
+MAX_PAGES = 100
+# Fill due views from one universe scan instead of per-industry crawls
+UNIVERSE = os.environ.get("REFRESH_UNIVERSE", "0") == "1"
+
+
+def _pages(rows):
+    return max(1, -(-rows // ROWS_PER_PAGE))
+
+
+class RefreshScheduler:
+    """Keeps the snapshot store warm for every industry on the groups page."""
+
+    def __init__(self, store=None, requests_per_minute=REQUESTS_PER_MINUTE, stagger=STAGGER_SECONDS,
+                 max_pages=MAX_PAGES, universe=UNIVERSE):
+        self.store = store or get_store()
+        self.universe = universe
+        self.budget = SharedBudget(
+            self.store, "refresh", requests_per_minute / 60, capacity=max(1, int(requests_per_minute)),
+        )
+        self.stagger = stagger
+        self.max_pages = max_pages
+        self._stop = threading.Event()
+
+    def _spend(self, requests):
+        for _ in range(requests):
+            self.budget.acquire()
+
+    def _is_due(self, info, key, default_ttl):
+        fetched_at, ttl, _ = info.get(key, (0, default_ttl, 0))
+        return time.time() - fetched_at >= ttl * REFRESH_AHEAD
+
+    def industries(self):
+        """Industry names from the groups snapshot."""
+        def fetch():
+            self._spend(1)
+            return get_fetcher().sectors()
+
+        sectors = self.store.get_or_fetch("groups", "industry", fetch)
+        if "Sector" not in sectors.columns:
+            return []
+        return sectors["Sector"].astype(str).tolist()
+
+    def due(self):
+        """
+        Default company views that are missing or close to expiry, most
+        popular industry first and then stalest first.
+
+        Returns:
+            list: (snapshot key, rows in the previous snapshot) tuples
+        """
+        info = self.store.info("screener")
+        hits = self.store.popularity("screener")
+        default_ttl = DEFAULT_TTLS["screener"][0]
+        keys = [(industry, screener_key(industry, TOP_ORDER, TOP_ROWS)) for industry in self.industries()]
+        due = [
+            (industry, key, info.get(key, (0, 0, 0))[2])
+            for industry, key in keys
+            if self._is_due(info, key, default_ttl)
+        ]
+        due.sort(key=lambda item: (-hits.get(item[0], 0), info.get(item[1], (0,))[0]))
+        return [(key, rows) for _, key, rows in due]
+
+    def refresh_groups(self):
+        if not self._is_due(self.store.info("groups"), "industry", DEFAULT_TTLS["groups"][0]):
+            return False
+        if not self.store.acquire_lease("groups", "industry"):
+            return False
+        self._spend(1)
+        df = get_fetcher().sectors()
+        if "Error" in df.columns:
+            logger.warning(f"Sector refresh failed: {df['Error'].iloc[0]}")
+            self.store.release_lease("groups", "industry")
+            return False
+        self.store.put("groups", "industry", df)
+        return True
+
+    def refresh(self, key, previous_rows=0):
+        """Re-scrape one screener view into the store. Returns True if the snapshot was refreshed."""
+        if not self.store.acquire_lease("screener", key):
+            return False
+        industry, order, limit = parse_screener_key(key)
+        max_pages = pages_for(limit, self.max_pages)
+        # Budget for the pages the last crawl needed, settle the difference afterwards
+        estimated = min(max_pages, _pages(previous_rows))
+        self._spend(estimated)
+        try:
+            # Pages whose table is unchanged are not re-parsed; a view with
+            # no changes keeps its snapshot version
+            update = fetch_companies_update(
+                industry, self.store.get("screener", key), max_pages, order, limit, TOP_COLUMNS,
+            )
+        except Exception as e:
+            logger.error(f"Refresh of {key} failed: {e}")
+            self.store.release_lease("screener", key)
+            return False
+        self._spend(_pages(len(update.frame)) - estimated)
+
+        if not self.store.save("screener", key, update):
+            logger.warning(f"Refresh of {key} returned no data")
+            return False
+        if update.changed:
+            logger.info(f"Refreshed {key}: {len(update.frame)} companies, {len(update.meta['changed'])} changed")
+        else:
+            logger.info(f"Refreshed {key}: unchanged")
+        return True
+
+    def refresh_universe(self, due):
+        """
+        Fill due views from one scan of the whole screener, sorted by market
+        cap so each industry's rows come out largest first.
+
+        Every stored market-cap view of a scanned industry is refreshed from
+        the same pass, not only the due default views. A scan that stopped
+        before the last page is not stored as the universe snapshot; it only
+        fills views it holds every row of (an industry's first limit rows
+        are final once limit of them have been seen, as nothing later in
+        the scan is larger).
+
+        Returns:
+            tuple: (snapshots refreshed, the due entries the scan did not cover)
+        """
+        # The scan takes from the request budget page by page, as it goes
+        result = get_fetcher().universe(order=TOP_ORDER, budget=self.budget)
+        if result.blocked:
+            logger.warning("Universe scan was blocked, falling back to per-industry crawls")
+            return 0, due
+
+        if result.complete:
+            # The whole scan feeds the sector table the app derives locally (see aggregates.py)
+            self.store.put("universe", TOP_ORDER, pd.concat(
+                [rows.assign(Industry=industry) for industry, rows in result.industries.items()], ignore_index=True,
+            ))
+        else:
+            logger.warning(f"Universe scan stopped after {result.pages} pages, not storing it as the universe")
+
+        keys = {key for key, _ in due} | set(self.store.info("screener"))
+        refreshed = 0
+        covered = set()
+        for key in sorted(keys):
+            industry, order, limit = parse_screener_key(key)
+            frame = result.industries.get(industry)
+            if frame is None or order != TOP_ORDER:
+                continue
+            if not result.complete and (not limit or len(frame) < limit):
+                continue
+            covered.add(key)
+            if not self.store.acquire_lease("screener", key):
+                continue
+            view = frame[TOP_COLUMNS].head(limit) if limit else frame[TOP_COLUMNS]
+            update = frame_update(view, self.store.get("screener", key))
+            refreshed += self.store.save("screener", key, update)
+        logger.info(f"Universe scan refreshed {refreshed} snapshots in {len(result.industries)} industries")
+        return refreshed, [(key, rows) for key, rows in due if key not in covered]
+
+    def run_once(self):
+        """Refresh everything that is due. Returns the number of snapshots refreshed."""
+        refreshed = int(self.refresh_groups())
+        due = self.due()
+        if self.universe and due:
+            scanned, due = self.refresh_universe(due)
+            refreshed += scanned
+        for key, rows in due:
+            if self._stop.is_set():
+                break
+            refreshed += self.refresh(key, rows)
+            self._stop.wait(self.stagger)
+        # Merge the previous days' per-refresh history files
+        self.store.compact_history()
+        return refreshed
+
+    def run_forever(self):
+        while not self._stop.is_set():
+            started = time.time()
+            try:
+                refreshed = self.run_once()
+                if refreshed:
+                    logger.info(f"Refresh pass stored {refreshed} snapshots in {time.time() - started:.0f}s")
+            except Exception as e:
+                logger.error(f"Refresh pass failed: {e}")
+            self._stop.wait(max(0, POLL_INTERVAL - (time.time() - started)))
+
+    def stop(self):
+        self._stop.set()
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def start_in_process():
+    """Start the scheduler on a daemon thread, once per process."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = RefreshScheduler()
+            threading.Thread(target=_scheduler.run_forever, name="refresh-scheduler", daemon=True).start()
+            logger.info("Started in-process refresh scheduler")
+    return _scheduler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keep the finviz snapshot store warm.")
+    parser.add_argument("--once", action="store_true", help="run a single refresh pass and exit")
+    parser.add_argument("--requests-per-minute", type=float, default=REQUESTS_PER_MINUTE)
+    parser.add_argument("--stagger", type=float, default=STAGGER_SECONDS)
+    parser.add_argument("--universe", action="store_true", default=UNIVERSE,
+                        help="refresh from one scan of the whole screener instead of per-industry crawls")
+    args = parser.parse_args()
+
+    if METRICS_PORT:
+        start_http_server()
+    scheduler = RefreshScheduler(
+        requests_per_minute=args.requests_per_minute, stagger=args.stagger, universe=args.universe,
+    )
+    if args.once:
+        scheduler.run_once()
+    else:
+        scheduler.run_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,477 @@
+"""
+Durable snapshot store for scraped finviz data.
+
+Frames are kept as Parquet blobs in a local SQLite database keyed by
+(endpoint, key), e.g. ("groups", "industry") or ("screener", "Semiconductors").
+Every Streamlit worker on the host opens the same file, so restarts and
+additional replicas are served from disk instead of re-scraping finviz.
+
+Reads follow stale-while-revalidate: a fresh snapshot is returned as-is, a
+stale one is returned immediately while a single background refresh runs
+(coordinated across processes with a lease table), and only a missing or
+expired snapshot blocks on the upstream fetch. Callers that would rather show
+old data than wait (the app's first render) pass serve_expired=True, so only a
+missing snapshot blocks.
+"""
+from collections import namedtuple
+import io
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+
+from history import HISTORY_ENABLED, get_history, record_snapshot
+from metrics import counter
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+STORE_PATH = os.environ.get(
+    "SNAPSHOT_DB",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "snapshots.sqlite"),
+)
+
+# Per-endpoint freshness in seconds: (ttl, max_stale). Snapshots younger than
+# ttl are fresh; up to max_stale they are served while being refreshed.
+DEFAULT_TTLS = {
+    "groups": (15 * 60, 24 * 3600),
+    "screener": (60 * 60, 7 * 24 * 3600),
+    "universe": (60 * 60, 24 * 3600),
+}
+FALLBACK_TTL = (60 * 60, 24 * 3600)
+
+# How long one worker may hold the refresh lease for a key
+LEASE_SECONDS = 300
+# How often a cold read polls for the snapshot another worker is fetching
+LEASE_POLL_SECONDS = 0.2
+# Seconds between opportunistic history compactions by one process
+HISTORY_COMPACT_INTERVAL = float(os.environ.get("HISTORY_COMPACT_INTERVAL", "3600"))
+
+SNAPSHOT_READS = counter(
+    "snapshot_reads_total", "Snapshot store reads by result (fresh, stale, miss, expired, expired_served)", ["endpoint", "result"],
+)
+
+Snapshot = namedtuple("Snapshot", ["frame", "fetched_at", "ttl", "max_stale", "version", "meta"])
+
+# Result of an incremental fetch: the full frame, metadata to keep with it
+# (JSON-serializable) and whether its content differs from the previous snapshot
+SnapshotUpdate = namedtuple("SnapshotUpdate", ["frame", "meta", "changed"])
+
+
+def _is_valid(df):
+    return df is not None and not df.empty and "Error" not in df.columns
+
+
+class SnapshotStore:
+    """SQLite-backed store shared by all processes that point at the same file."""
+
+    def __init__(self, path=STORE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._local = threading.local()
+        # (endpoint, key) -> Event set when this process's background refresh ends
+        self._refreshing = {}
+        self._refreshing_lock = threading.Lock()
+        # When this process last started a history compaction
+        self._compacted_at = 0.0
+        self._compact_lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS snapshots (
+                    endpoint TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    payload BLOB NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    ttl REAL NOT NULL,
+                    max_stale REAL NOT NULL,
+                    PRIMARY KEY (endpoint, key)
+                )
+            """)
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(snapshots)")]
+            if "row_count" not in columns:
+                conn.execute("ALTER TABLE snapshots ADD COLUMN row_count INTEGER NOT NULL DEFAULT 0")
+            # Bumped on every content change, with per-key metadata such as page digests
+            if "version" not in columns:
+                conn.execute("ALTER TABLE snapshots ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+            if "meta" not in columns:
+                conn.execute("ALTER TABLE snapshots ADD COLUMN meta TEXT NOT NULL DEFAULT '{}'")
+            # Refresh leases, so one thread or process refreshes a key at a time
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS leases (
+                    endpoint TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    expires REAL NOT NULL,
+                    PRIMARY KEY (endpoint, key)
+                )
+            """)
+            # Request budgets shared by every process on the store (see SharedBudget)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS budgets (
+                    name TEXT PRIMARY KEY,
+                    tokens REAL NOT NULL,
+                    updated REAL NOT NULL
+                )
+            """)
+            # How often users open each key; drives refresh priority
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS access_counts (
+                    endpoint TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0,
+                    last_access REAL NOT NULL,
+                    PRIMARY KEY (endpoint, key)
+                )
+            """)
+
+    def _connect(self):
+        # One connection per thread; WAL lets readers proceed during writes
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, endpoint, key):
+        """
+        Return the stored Snapshot for (endpoint, key), or None.
+
+        The frame carries its snapshot version, metadata and fetch time in
+        frame.attrs["snapshot_version"], ["snapshot_meta"] and ["snapshot_fetched_at"].
+        """
+        row = self._connect().execute(
+            "SELECT payload, fetched_at, ttl, max_stale, version, meta FROM snapshots WHERE endpoint = ? AND key = ?",
+            (endpoint, key),
+        ).fetchone()
+        if row is None:
+            return None
+        payload, fetched_at, ttl, max_stale, version, meta = row
+        try:
+            frame = pd.read_parquet(io.BytesIO(payload))
+        except Exception as e:
+            logger.warning(f"Discarding unreadable snapshot {endpoint}/{key}: {e}")
+            return None
+        meta = json.loads(meta or "{}")
+        frame.attrs = {"snapshot_version": version, "snapshot_meta": meta, "snapshot_fetched_at": fetched_at}
+        return Snapshot(frame, fetched_at, ttl, max_stale, version, meta)
+
+    def put(self, endpoint, key, df, ttl=None, max_stale=None, meta=None):
+        """
+        Store a frame, replacing any previous snapshot and releasing the refresh
+        lease, and append it to the history. Each put bumps the key's version.
+        Returns the new version.
+        """
+        default_ttl, default_max_stale = DEFAULT_TTLS.get(endpoint, FALLBACK_TTL)
+        frame = df.copy(deep=False)
+        frame.attrs = {}
+        buf = io.BytesIO()
+        frame.to_parquet(buf, index=False)
+        fetched_at = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT version FROM snapshots WHERE endpoint = ? AND key = ?", (endpoint, key)
+            ).fetchone()
+            version = (row[0] if row else 0) + 1
+            conn.execute(
+                "INSERT OR REPLACE INTO snapshots "
+                "(endpoint, key, payload, fetched_at, ttl, max_stale, row_count, version, meta) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (endpoint, key, buf.getvalue(), fetched_at,
+                 ttl or default_ttl, max_stale or default_max_stale, len(df), version,
+                 json.dumps(meta or {})),
+            )
+            conn.execute("DELETE FROM leases WHERE endpoint = ? AND key = ?", (endpoint, key))
+        df.attrs = {"snapshot_version": version, "snapshot_meta": meta or {}, "snapshot_fetched_at": fetched_at}
+        # Every stored refresh is also appended to the long-term history
+        record_snapshot(endpoint, key, df, fetched_at)
+        self._maybe_compact_history()
+        return version
+
+    def compact_history(self):
+        """
+        Merge the previous days' history files (see history.History.compact)
+        under the ("history", "compact") lease, unless another thread or
+        process is already doing it. Returns the number of partitions merged.
+        """
+        if not HISTORY_ENABLED or not self.acquire_lease("history", "compact"):
+            return 0
+        try:
+            return get_history().compact()
+        except Exception as e:
+            logger.error(f"History compaction failed: {e}")
+            return 0
+        finally:
+            self.release_lease("history", "compact")
+
+    def _maybe_compact_history(self):
+        """
+        Compact the history in the background at most once per
+        HISTORY_COMPACT_INTERVAL, so deployments without a refresh worker
+        still keep the file count bounded.
+        """
+        if not HISTORY_ENABLED:
+            return
+        with self._compact_lock:
+            now = time.time()
+            if now - self._compacted_at < HISTORY_COMPACT_INTERVAL:
+                return
+            self._compacted_at = now
+        threading.Thread(target=self.compact_history, daemon=True).start()
+
+    def touch(self, endpoint, key):
+        """Mark a snapshot as freshly fetched without rewriting it (upstream had no changes)."""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE snapshots SET fetched_at = ? WHERE endpoint = ? AND key = ?",
+                (time.time(), endpoint, key),
+            )
+            conn.execute("DELETE FROM leases WHERE endpoint = ? AND key = ?", (endpoint, key))
+
+    def save(self, endpoint, key, result, ttl=None, max_stale=None):
+        """
+        Store a fetch result: a DataFrame, or a SnapshotUpdate from an
+        incremental fetch. Unchanged updates only renew the timestamp and keep
+        the previous version and metadata. Error
+        and empty frames are not stored and release the lease.
+
+        Returns:
+            bool: True if the result was usable
+        """
+        if not isinstance(result, SnapshotUpdate):
+            result = SnapshotUpdate(result, None, True)
+        if not _is_valid(result.frame):
+            self.release_lease(endpoint, key)
+            return False
+        if result.changed:
+            self.put(endpoint, key, result.frame, ttl, max_stale, result.meta)
+        else:
+            self.touch(endpoint, key)
+        return True
+
+    def keys(self, endpoint):
+        """List the keys stored for an endpoint."""
+        rows = self._connect().execute("SELECT key FROM snapshots WHERE endpoint = ?", (endpoint,))
+        return [row[0] for row in rows]
+
+    def info(self, endpoint):
+        """Metadata for every key of an endpoint: {key: (fetched_at, ttl, row_count)}, no payloads."""
+        rows = self._connect().execute(
+            "SELECT key, fetched_at, ttl, row_count FROM snapshots WHERE endpoint = ?", (endpoint,)
+        )
+        return {key: (fetched_at, ttl, row_count) for key, fetched_at, ttl, row_count in rows}
+
+    def record_access(self, endpoint, key):
+        """Count a user request for a key."""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO access_counts (endpoint, key, hits, last_access) VALUES (?, ?, 1, ?) "
+                "ON CONFLICT (endpoint, key) DO UPDATE SET hits = hits + 1, last_access = excluded.last_access",
+                (endpoint, key, time.time()),
+            )
+
+    def popularity(self, endpoint):
+        """{key: hits} for an endpoint."""
+        rows = self._connect().execute("SELECT key, hits FROM access_counts WHERE endpoint = ?", (endpoint,))
+        return dict(rows.fetchall())
+
+    def acquire_lease(self, endpoint, key):
+        """
+        Claim the right to refresh a key for LEASE_SECONDS. Returns False if
+        another thread or process holds it; put() releases it.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO leases (endpoint, key, expires) VALUES (?, ?, 0)", (endpoint, key)
+            )
+            cur = conn.execute(
+                "UPDATE leases SET expires = ? WHERE endpoint = ? AND key = ? AND expires < ?",
+                (now + LEASE_SECONDS, endpoint, key, now),
+            )
+        return cur.rowcount == 1
+
+    def release_lease(self, endpoint, key):
+        """Give up a lease without storing a new snapshot, e.g. after a failed fetch."""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM leases WHERE endpoint = ? AND key = ?", (endpoint, key))
+
+    def take_budget(self, name, rate, capacity):
+        """
+        Take one token from the named token bucket, refilled at rate per
+        second up to capacity and shared with every process on this store.
+
+        Returns:
+            float: 0 if a token was taken, else seconds until one is due
+        """
+        now = time.time()
+        # Refill and take in one statement, so concurrent takers cannot both
+        # spend the last token
+        refilled = "MIN(?, tokens + MAX(0, ? - updated) * ?)"
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO budgets (name, tokens, updated) VALUES (?, ?, ?)", (name, capacity, now)
+            )
+            cur = conn.execute(
+                f"UPDATE budgets SET tokens = {refilled} - 1, updated = MAX(updated, ?) "
+                f"WHERE name = ? AND {refilled} >= 1",
+                (capacity, now, rate, now, name, capacity, now, rate),
+            )
+            if cur.rowcount == 1:
+                return 0.0
+            tokens = conn.execute(f"SELECT {refilled} FROM budgets WHERE name = ?", (capacity, now, rate, name)).fetchone()[0]
+        return max((1 - tokens) / rate, 0.01)
+
+    def _lease_held(self, endpoint, key):
+        row = self._connect().execute(
+            "SELECT expires FROM leases WHERE endpoint = ? AND key = ?", (endpoint, key)
+        ).fetchone()
+        return row is not None and row[0] > time.time()
+
+    def _wait_for_holder(self, endpoint, key, previous):
+        """
+        Wait while another thread or process holds the lease for a key.
+
+        Returns:
+            Snapshot: The snapshot it stored (newer than previous), or None if
+            the lease ended without one, e.g. because its fetch failed
+        """
+        while True:
+            time.sleep(LEASE_POLL_SECONDS)
+            snapshot = self.get(endpoint, key)
+            if snapshot is not None and (previous is None or snapshot.fetched_at > previous.fetched_at):
+                return snapshot
+            if not self._lease_held(endpoint, key):
+                return None
+
+    def _fetch(self, fetch_fn, snapshot, incremental):
+        return fetch_fn(snapshot) if incremental else fetch_fn()
+
+    def _refresh(self, endpoint, key, fetch_fn, ttl, max_stale, snapshot, incremental, done):
+        try:
+            if self.save(endpoint, key, self._fetch(fetch_fn, snapshot, incremental), ttl, max_stale):
+                logger.info(f"Refreshed snapshot {endpoint}/{key}")
+            else:
+                logger.warning(f"Background refresh of {endpoint}/{key} returned no data")
+        except Exception as e:
+            logger.error(f"Background refresh of {endpoint}/{key} failed: {e}")
+            self.release_lease(endpoint, key)
+        finally:
+            with self._refreshing_lock:
+                self._refreshing.pop((endpoint, key), None)
+            done.set()
+
+    def _start_refresh(self, endpoint, key, fetch_fn, ttl, max_stale, snapshot, incremental):
+        if not self.acquire_lease(endpoint, key):
+            return
+        done = threading.Event()
+        with self._refreshing_lock:
+            self._refreshing[(endpoint, key)] = done
+        threading.Thread(
+            target=self._refresh,
+            args=(endpoint, key, fetch_fn, ttl, max_stale, snapshot, incremental, done),
+            daemon=True,
+        ).start()
+
+    def wait_for_refresh(self, endpoint, key, timeout=None):
+        """
+        Wait for this process's background refresh of (endpoint, key), if one
+        is running. Returns True once none is running, False on timeout.
+        """
+        with self._refreshing_lock:
+            done = self._refreshing.get((endpoint, key))
+        return done is None or done.wait(timeout)
+
+    def get_or_fetch(self, endpoint, key, fetch_fn, ttl=None, max_stale=None, incremental=False,
+                     serve_expired=False):
+        """
+        Return the frame for (endpoint, key), fetching it with fetch_fn if needed.
+
+        Args:
+            endpoint (str): Upstream endpoint name, e.g. "groups" or "screener"
+            key (str): Key within the endpoint, e.g. an industry name
+            fetch_fn (callable): Returns a fresh DataFrame. With incremental=True
+                it is called with the previous Snapshot (or None) and returns a
+                SnapshotUpdate
+            ttl (float): Seconds a snapshot stays fresh (defaults per endpoint)
+            max_stale (float): Seconds a stale snapshot may still be served
+            incremental (bool): Whether fetch_fn takes the previous snapshot
+            serve_expired (bool): Return a snapshot past max_stale too, refreshing
+                it in the background, instead of waiting for upstream
+
+        Returns:
+            pd.DataFrame: The stored or freshly fetched frame
+        """
+        snapshot = self.get(endpoint, key)
+        if snapshot is not None:
+            age = time.time() - snapshot.fetched_at
+            if age < snapshot.ttl:
+                SNAPSHOT_READS.inc(endpoint=endpoint, result="fresh")
+                return snapshot.frame
+            if age < snapshot.max_stale or serve_expired:
+                SNAPSHOT_READS.inc(endpoint=endpoint, result="stale" if age < snapshot.max_stale else "expired_served")
+                self._start_refresh(endpoint, key, fetch_fn, ttl, max_stale, snapshot, incremental)
+                return snapshot.frame
+
+        SNAPSHOT_READS.inc(endpoint=endpoint, result="miss" if snapshot is None else "expired")
+        # Only the lease holder goes upstream; replicas starting against an
+        # empty store wait for its snapshot instead of all scraping at once
+        while not self.acquire_lease(endpoint, key):
+            stored = self._wait_for_holder(endpoint, key, snapshot)
+            if stored is not None:
+                return stored.frame
+        try:
+            result = self._fetch(fetch_fn, snapshot, incremental)
+        except BaseException:
+            self.release_lease(endpoint, key)
+            raise
+        if self.save(endpoint, key, result, ttl, max_stale):
+            if isinstance(result, SnapshotUpdate):
+                # Unchanged: the stored frame (and its version) is still current
+                return result.frame if result.changed else snapshot.frame
+            return result
+        if snapshot is not None:
+            # Upstream failed; an old snapshot beats an error message
+            logger.warning(f"Fetch of {endpoint}/{key} failed, serving expired snapshot")
+            return snapshot.frame
+        return result.frame if isinstance(result, SnapshotUpdate) else result
+
+
+class SharedBudget:
+    """
+    A request budget kept in the snapshot store, with TokenBucket's acquire(),
+    so schedulers in every process on the host spend from the same bucket
+    instead of one budget each.
+    """
+
+    def __init__(self, store, name, rate, capacity):
+        self.store = store
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity
+
+    def acquire(self):
+        """Block until a request may be sent."""
+        while True:
+            wait = self.store.take_budget(self.name, self.rate, self.capacity)
+            if not wait:
+                return
+            time.sleep(wait)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Return the process-wide SnapshotStore, opening it on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SnapshotStore()
+    return _store
@@ -0,0 +1,56 @@
+import os
+import re
+import sys
+import tempfile
+import threading
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# Keep tests off the real snapshot store and history, and never start a browser
+os.environ.setdefault("SNAPSHOT_DB", os.path.join(tempfile.mkdtemp(prefix="finviz-tests-"), "snapshots.sqlite"))
+os.environ.setdefault("HISTORY_ENABLED", "0")
+os.environ.setdefault("FETCH_BROWSER_FALLBACK", "0")
+sys.path.insert(0, os.path.join(ROOT, "loadtest"))
+
+import finviz_bs  # noqa: E402
+from finviz_bs import TokenBucket  # noqa: E402
+from stub_server import StubFinviz, make_server  # noqa: E402
+
+_ROW = re.compile(r'<tr class="styled-row.*?</tr>', re.S)
+_TICKER = re.compile(r"quote\.ashx\?t=([A-Z.\-]+)&")
+
+
+class DistinctTickers(StubFinviz):
+    """The recorded page with a distinct ticker on every row, and optional edits per page."""
+
+    def __init__(self):
+        super().__init__()
+        self.edits = {}  # start row -> (old text, new text)
+
+    def screener_page(self, start_row):
+        counter = iter(range(start_row, start_row + finviz_bs.ROWS_PER_PAGE))
+
+        def rename(row):
+            ticker = _TICKER.search(row.group(0)).group(1)
+            unique = f"{ticker}{next(counter)}"
+            return row.group(0).replace(f"t={ticker}&", f"t={unique}&").replace(f">{ticker}<", f">{unique}<")
+
+        page = _ROW.sub(rename, super().screener_page(start_row))
+        if start_row in self.edits:
+            page = page.replace(*self.edits[start_row], 1)
+        return page
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    """A running DistinctTickers server that finviz_bs requests go to, unthrottled."""
+    stub = DistinctTickers()
+    server = make_server(stub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(finviz_bs, "BASE_URL", f"http://127.0.0.1:{server.server_address[1]}")
+    monkeypatch.setattr(finviz_bs, "rate_limiter", TokenBucket(1000, 1000))
+    yield stub
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,71 @@
+"""Industry statistics derived from typed company rows (aggregates)."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from aggregates import Aggregate, group_aggregates, industry_table
+
+COMPANIES = pd.DataFrame({
+    "Ticker": ["A", "B", "C", "D", "E"],
+    "Industry": pd.Categorical(["Software", "Banks", "Banks", "Software", "Software"]),
+    "Market cap": [100.0, 50.0, 30.0, 200.0, 100.0],
+    "P/E": [10.0, 20.0, np.nan, 40.0, -5.0],
+    "Dividend": [2.0, 1.0, 3.0, np.nan, np.nan],
+    "Sales": [10.0, 5.0, 15.0, 30.0, np.nan],
+    "Gross Margin": [50.0, 40.0, 20.0, 70.0, 90.0],
+})
+
+
+def by_group(table, by="Industry"):
+    return table.set_index(by)
+
+
+def test_sums_and_counts():
+    table = by_group(group_aggregates(COMPANIES))
+    assert table.loc["Software", "Market cap"] == 400.0
+    assert table.loc["Banks", "Market cap"] == 80.0
+    assert table.loc["Software", "Companies"] == 3
+    assert table.loc["Banks", "Sales"] == 20.0
+
+
+def test_ratio_is_cap_weighted_harmonic_over_positive_values():
+    table = by_group(group_aggregates(COMPANIES))
+    # Software: (100 + 200) / (100/10 + 200/40); E's negative P/E is left out
+    assert table.loc["Software", "P/E"] == pytest.approx(300 / 15)
+    # Banks: C has no P/E, so only B counts
+    assert table.loc["Banks", "P/E"] == pytest.approx(20.0)
+
+
+def test_missing_dividends_count_as_zero_yield():
+    table = by_group(group_aggregates(COMPANIES))
+    # Software: (2.0 * 100 + 0 * 200 + 0 * 100) / 400
+    assert table.loc["Software", "Dividend"] == pytest.approx(0.5)
+    # Banks: (1.0 * 50 + 3.0 * 30) / 80
+    assert table.loc["Banks", "Dividend"] == pytest.approx(1.75)
+
+
+def test_sales_weighted_margin_skips_companies_without_sales():
+    table = by_group(group_aggregates(COMPANIES))
+    # E has no sales, so its margin carries no weight
+    assert table.loc["Software", "Gross Margin"] == pytest.approx((50 * 10 + 70 * 30) / 40)
+
+
+def test_median_and_quantiles():
+    table = by_group(group_aggregates(COMPANIES))
+    assert table.loc["Software", "Median P/E"] == pytest.approx(10.0)
+    assert table.loc["Software", "P/E 25th pct"] == pytest.approx(2.5)
+    assert table.loc["Software", "P/E 75th pct"] == pytest.approx(25.0)
+
+
+def test_only_aggregates_with_input_columns_are_returned():
+    companies = COMPANIES[["Ticker", "Industry", "Market cap"]]
+    custom = {"Market cap": Aggregate("sum", "Market cap", None), "P/B": Aggregate("ratio", "P/B", "Market cap")}
+    table = group_aggregates(companies, aggregates=custom)
+    assert list(table.columns) == ["Industry", "Market cap"]
+
+
+def test_industry_table_is_sorted_with_a_categorical_sector():
+    table = industry_table(COMPANIES)
+    assert table["Sector"].tolist() == ["Banks", "Software"]
+    assert isinstance(table["Sector"].dtype, pd.CategoricalDtype)
+    assert "Industry" not in table.columns
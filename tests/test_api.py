@@ -0,0 +1,88 @@
+"""Column and row selection in the data API (api.select) and the HTTP routes."""
+import io
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+import api
+from api import ApiError, select, to_arrow
+from delta import TOP_ORDER, TOP_ROWS
+from finviz_bs import screener_key
+from snapshot_store import get_store
+
+FRAME = pd.DataFrame({
+    "Ticker": ["NVDA", "AVGO", "AMD", "INTC"],
+    "Market cap": [1107790.0, 610050.0, 260200.0, 186000.0],
+    "P/E": [71.2, 48.93, None, 31.8],
+    "Sector": pd.Categorical(["Semiconductors"] * 4),
+})
+
+
+def test_columns_only():
+    assert list(select(FRAME, ["Ticker", "P/E"]).columns) == ["Ticker", "P/E"]
+    assert list(select(FRAME).columns) == list(FRAME.columns)
+
+
+def test_numeric_filters_combine_and_skip_missing_values():
+    picked = select(FRAME, ["Ticker"], ["P/E<60", "Market cap >= 200000"])
+    assert picked["Ticker"].tolist() == ["AVGO"]
+    # AMD has no P/E, so it is not among the profitable
+    assert select(FRAME, None, ["P/E>0"])["Ticker"].tolist() == ["NVDA", "AVGO", "INTC"]
+
+
+def test_text_filters():
+    assert select(FRAME, None, ["Ticker==AMD"])["Ticker"].tolist() == ["AMD"]
+    assert select(FRAME, None, ["Sector!=Semiconductors"]).empty
+
+
+@pytest.mark.parametrize("columns, filters", [
+    (["Nope"], ()),
+    (None, ["P/E"]),
+    (None, ["Nope<1"]),
+    (None, ["P/E<cheap"]),
+    (None, ["Ticker<B"]),
+])
+def test_bad_selections_are_client_errors(columns, filters):
+    with pytest.raises(ApiError) as error:
+        select(FRAME, columns, filters)
+    assert error.value.status == 400
+
+
+def test_arrow_round_trip_keeps_types():
+    table = pa.ipc.open_stream(io.BytesIO(to_arrow(FRAME))).read_pandas()
+    pd.testing.assert_frame_equal(table, FRAME)
+
+
+@pytest.fixture
+def server():
+    server = api.make_server(port=0, host="127.0.0.1")
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def get(url):
+    try:
+        with urllib.request.urlopen(url) as response:
+            return response.status, response.headers, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers, e.read()
+
+
+def test_companies_route_serves_stored_views_only(server):
+    raw = pd.DataFrame({"Ticker": ["AAA", "BBB"], "Company": ["A", "B"], "Market cap": ["12.50B", "3.10B"], "P/E": ["10.00", "-"]})
+    get_store().put("screener", screener_key("Api Test", TOP_ORDER, TOP_ROWS), raw)
+
+    status, headers, body = get(f"{server}/companies/Api%20Test?columns=Ticker,Market%20cap&where=Market%20cap%3E5000")
+    assert status == 200
+    assert json.loads(body) == [{"Ticker": "AAA", "Market cap": 12500.0}]
+    assert float(headers["X-Snapshot-Fetched-At"]) > 0
+
+    assert get(f"{server}/companies/Not%20Stored")[0] == 404
+    assert get(f"{server}/companies/Api%20Test?where=Nope%3C1")[0] == 400
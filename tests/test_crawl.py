@@ -0,0 +1,47 @@
+"""Incremental crawls against the local finviz stand-in (loadtest/stub_server.py)."""
+import pandas as pd
+
+from finviz_bs import PAGES_SKIPPED, crawl_companies
+
+INDUSTRY = "Semiconductors"
+
+
+def skipped():
+    return PAGES_SKIPPED.values().get((), 0)
+
+
+def test_unchanged_crawl_reuses_every_page(stub):
+    first = crawl_companies(INDUSTRY, order="-marketcap")
+    assert len(first.frame) == stub.rows_per_industry
+    assert first.frame["Ticker"].is_unique
+    assert len(first.pages) == 4
+
+    before = skipped()
+    again = crawl_companies(INDUSTRY, order="-marketcap", previous=first.frame, previous_pages=first.pages)
+    assert skipped() - before == 4
+    pd.testing.assert_frame_equal(again.frame, first.frame)
+    assert again.changed == set() and again.removed == set()
+    assert again.pages == first.pages
+
+
+def test_changed_page_is_reparsed_and_the_rest_reused(stub):
+    first = crawl_companies(INDUSTRY, order="-marketcap")
+    renamed = first.frame["Ticker"].iloc[20]
+    stub.edits[21] = (f">{renamed}<", ">NEWCO<")
+
+    before = skipped()
+    again = crawl_companies(INDUSTRY, order="-marketcap", previous=first.frame, previous_pages=first.pages)
+    assert skipped() - before == 3
+    assert again.changed == {"NEWCO"}
+    assert again.removed == {renamed}
+    assert again.pages[1][0] != first.pages[1][0]
+
+    # Reused rows plus the re-parsed page match a crawl from scratch
+    pd.testing.assert_frame_equal(again.frame, crawl_companies(INDUSTRY, order="-marketcap").frame)
+
+
+def test_limit_fetches_only_the_pages_it_needs(stub):
+    stub.reset()
+    result = crawl_companies(INDUSTRY, order="-marketcap", limit=20)
+    assert len(result.pages) == 1
+    assert stub.stats()["requests"] == {"screener": 1}
@@ -0,0 +1,87 @@
+"""Splicing snapshot deltas into the cached typed frame (delta.update_typed)."""
+import pandas as pd
+import pytest
+
+from delta import frame_update, update_typed
+from normalize import normalize_companies
+from snapshot_store import Snapshot
+
+INDUSTRY = "Semiconductors"
+
+
+def raw_frame(rows):
+    return pd.DataFrame(rows, columns=["Ticker", "Company", "Market cap", "P/E", "Dividend"])
+
+
+BASE = raw_frame([
+    ["NVDA", "NVIDIA Corp", "1107.79B", "71.20", "0.03%"],
+    ["AVGO", "Broadcom Inc", "610.05B", "48.93", "1.64%"],
+    ["AMD", "Advanced Micro Devices", "260.20B", "262.10", "-"],
+    ["QCOM", "Qualcomm Inc", "190.01B", "24.05", "1.90%"],
+])
+
+
+def stored(raw, version, meta=None):
+    """raw as the snapshot store returns it."""
+    raw = raw.copy()
+    raw.attrs = {"snapshot_version": version, "snapshot_meta": meta or {}, "snapshot_fetched_at": 1000.0 + version}
+    return raw
+
+
+def typed(raw, version):
+    return update_typed(None, stored(raw, version), INDUSTRY)
+
+
+def apply(previous_raw, fresh_raw, version=1):
+    """Typed frame for fresh_raw, spliced onto the typed frame of previous_raw."""
+    update = frame_update(fresh_raw, Snapshot(previous_raw, 1000.0, 3600, 86400, version, {}))
+    return update_typed(typed(previous_raw, version), stored(fresh_raw, version + 1, update.meta), INDUSTRY)
+
+
+def assert_same_as_full(result, raw):
+    expected = normalize_companies(raw, INDUSTRY)
+    pd.testing.assert_frame_equal(result.reset_index(drop=True), expected.reset_index(drop=True), check_like=False)
+
+
+def test_changed_ticker_is_renormalized():
+    fresh = BASE.copy()
+    fresh.loc[fresh["Ticker"] == "AMD", "P/E"] = "199.50"
+    result = apply(BASE, fresh)
+    assert_same_as_full(result, fresh)
+    assert result.loc[result["Ticker"] == "AMD", "P/E"].item() == pytest.approx(199.5)
+    assert result.attrs["snapshot_version"] == 2
+
+
+def test_removed_and_added_tickers():
+    fresh = pd.concat([BASE[BASE["Ticker"] != "AVGO"], raw_frame([["TXN", "Texas Instruments", "180.10B", "30.01", "2.71%"]])],
+                      ignore_index=True)
+    result = apply(BASE, fresh)
+    assert_same_as_full(result, fresh)
+    assert "AVGO" not in set(result["Ticker"])
+
+
+def test_reordered_tickers_follow_upstream_order():
+    fresh = BASE.iloc[[1, 0, 3, 2]].reset_index(drop=True)
+    fresh.loc[0, "Market cap"] = "1200.00B"
+    result = apply(BASE, fresh)
+    assert result["Ticker"].tolist() == ["AVGO", "NVDA", "QCOM", "AMD"]
+    assert_same_as_full(result, fresh)
+
+
+def test_version_gap_normalizes_everything():
+    # The cached frame is version 1, the delta applies to version 2
+    fresh = BASE.copy()
+    fresh.loc[fresh["Ticker"] == "QCOM", "P/E"] = "19.00"
+    meta = {"base_version": 2, "changed": [], "removed": []}
+    result = update_typed(typed(BASE, 1), stored(fresh, 3, meta), INDUSTRY)
+    assert_same_as_full(result, fresh)
+    assert result.loc[result["Ticker"] == "QCOM", "P/E"].item() == pytest.approx(19.0)
+
+
+def test_same_version_reuses_the_cached_frame():
+    previous = typed(BASE, 4)
+    refreshed = stored(BASE, 4)
+    refreshed.attrs["snapshot_fetched_at"] = 5000.0
+    result = update_typed(previous, refreshed, INDUSTRY)
+    assert result is previous
+    assert result.attrs["snapshot_fetched_at"] == 5000.0
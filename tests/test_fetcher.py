@@ -0,0 +1,98 @@
+"""Circuit breaker states and what counts as blocked HTTP (fetcher)."""
+import os
+import re
+from types import SimpleNamespace
+
+import pytest
+
+import fetcher
+import finviz_bs
+from fetcher import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, Fetcher
+
+GROUPS_HTML = open(os.path.join(os.path.dirname(__file__), "..", "benchmarks", "fixtures", "groups.html")).read()
+# The groups page with its table but no rows in it
+EMPTY_GROUPS_HTML = re.sub(r'<tr class="styled-row.*?</tr>', "", GROUPS_HTML, flags=re.S)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A settable time.monotonic for the breaker."""
+    now = [1000.0]
+    monkeypatch.setattr(fetcher.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker("finviz.com", failure_threshold=2, reset_seconds=60)
+    breaker.record_failure()
+    assert breaker.state == CLOSED and breaker.allow_http()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow_http()
+
+
+def test_success_resets_the_failure_count(clock):
+    breaker = CircuitBreaker("finviz.com", failure_threshold=2, reset_seconds=60)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+
+
+def test_half_open_allows_one_probe(clock):
+    breaker = CircuitBreaker("finviz.com", failure_threshold=1, reset_seconds=60)
+    breaker.record_failure()
+    clock[0] += 59
+    assert not breaker.allow_http()
+    clock[0] += 1
+    assert breaker.allow_http()
+    assert breaker.state == HALF_OPEN
+    # Only the first caller probes; the rest keep using the browser
+    assert not breaker.allow_http()
+
+
+def test_probe_success_closes_and_failure_reopens(clock):
+    breaker = CircuitBreaker("finviz.com", failure_threshold=3, reset_seconds=60)
+    for _ in range(3):
+        breaker.record_failure()
+    clock[0] += 60
+    assert breaker.allow_http()
+    breaker.record_failure()
+    # A failed probe reopens at once, without waiting for the threshold again
+    assert breaker.state == OPEN
+    assert not breaker.allow_http()
+
+    clock[0] += 60
+    assert breaker.allow_http()
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.allow_http()
+
+
+def respond(monkeypatch, status, text=""):
+    monkeypatch.setattr(finviz_bs, "fetch", lambda url, headers=None: SimpleNamespace(status_code=status, text=text))
+
+
+@pytest.mark.parametrize("status, text, blocked", [
+    (429, "", True),
+    (403, "", True),
+    (200, "<html><body>Please verify you are human</body></html>", True),
+    (500, "", False),
+    (200, EMPTY_GROUPS_HTML, False),
+    (200, GROUPS_HTML, False),
+])
+def test_only_refusals_count_against_the_breaker(monkeypatch, status, text, blocked):
+    respond(monkeypatch, status, text)
+    source = Fetcher()
+    frame = source.sectors()
+    assert ("Error" in frame.columns) == (text != GROUPS_HTML)
+    assert source.breaker(finviz_bs.GROUPS_URL).failures == (1 if blocked else 0)
+
+
+def test_parse_errors_do_not_count_against_the_breaker(monkeypatch):
+    def broken(url, headers=None):
+        raise ValueError("unexpected markup")
+
+    monkeypatch.setattr(finviz_bs, "fetch", broken)
+    source = Fetcher()
+    assert "Error" in source.sectors().columns
+    assert source.breaker(finviz_bs.GROUPS_URL).failures == 0
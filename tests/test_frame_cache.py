@@ -0,0 +1,96 @@
+"""The process-wide frame cache: memory-bounded LRU with single-flight loads (frame_cache)."""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+
+from frame_cache import CACHE_LOOKUPS, FrameCache, _frame_bytes
+
+
+def frame(value, rows=100):
+    return pd.DataFrame({"Ticker": [f"T{value}"] * rows, "Market cap": [float(value)] * rows})
+
+
+SIZE = _frame_bytes(frame(0))
+
+
+def wait_for_waiters(cache, count):
+    """Block until count callers are waiting on cache's in-flight load."""
+    while CACHE_LOOKUPS.values().get((cache.name, "coalesced"), 0) < count:
+        time.sleep(0.001)
+
+
+def test_least_recently_used_frame_is_evicted_first():
+    cache = FrameCache(3 * SIZE)
+    for key in "abc":
+        cache.put(key, frame(1))
+    cache.get("a")
+    cache.put("d", frame(1))
+    assert cache.get("b") is None
+    assert [key for key in "acd" if cache.get(key) is not None] == ["a", "c", "d"]
+    assert cache.current_bytes == 3 * SIZE
+
+
+def test_frames_over_the_budget_are_not_cached():
+    cache = FrameCache(SIZE - 1)
+    cache.put("a", frame(1))
+    assert len(cache) == 0 and cache.current_bytes == 0
+
+
+def test_expired_frames_reload_but_stay_peekable():
+    cache = FrameCache(10 * SIZE)
+    old = frame(1)
+    cache.put("a", old)
+    cache.expire("a")
+    assert cache.get("a") is None
+    assert cache.peek("a") is old
+    assert cache.get_or_load("a", lambda: frame(2))["Market cap"].iloc[0] == 2.0
+
+
+def test_concurrent_misses_run_the_loader_once():
+    cache = FrameCache(10 * SIZE, name="single-flight")
+    calls = []
+    release = threading.Event()
+
+    def loader():
+        calls.append(1)
+        release.wait(5)
+        return frame(1)
+
+    with ThreadPoolExecutor(8) as pool:
+        results = [pool.submit(cache.get_or_load, "a", loader) for _ in range(8)]
+        wait_for_waiters(cache, 7)
+        release.set()
+        frames = [result.result() for result in results]
+    assert len(calls) == 1
+    assert all(result is frames[0] for result in frames)
+
+
+def test_loader_errors_reach_every_waiter_and_are_not_cached():
+    cache = FrameCache(10 * SIZE, name="failing-load")
+    release = threading.Event()
+
+    def failing():
+        release.wait(5)
+        raise RuntimeError("upstream down")
+
+    with ThreadPoolExecutor(2) as pool:
+        owner = pool.submit(cache.get_or_load, "a", failing)
+        while "a" not in cache._inflight:
+            time.sleep(0.001)
+        waiter = pool.submit(cache.get_or_load, "a", lambda: frame(9))
+        wait_for_waiters(cache, 1)
+        release.set()
+        for result in (owner, waiter):
+            with pytest.raises(RuntimeError):
+                result.result()
+    assert cache.get_or_load("a", lambda: frame(2))["Market cap"].iloc[0] == 2.0
+
+
+def test_error_frames_are_returned_but_not_cached():
+    cache = FrameCache(10 * SIZE)
+    error = pd.DataFrame({"Error": ["Failed to fetch data"]})
+    assert cache.get_or_load("a", lambda: error) is error
+    assert cache.get("a") is None
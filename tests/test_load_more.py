@@ -0,0 +1,26 @@
+"""Extending a stored view by its next page ("load more")."""
+import pandas as pd
+
+from delta import extend_companies_update
+from finviz_bs import crawl_companies
+from snapshot_store import Snapshot
+
+INDUSTRY = "Semiconductors"
+
+
+def test_first_page_skips_earlier_pages(stub):
+    full = crawl_companies(INDUSTRY, order="-marketcap", limit=40)
+    stub.reset()
+    tail = crawl_companies(INDUSTRY, order="-marketcap", limit=40, first_page=1)
+    assert stub.stats()["requests"] == {"screener": 1}
+    pd.testing.assert_frame_equal(tail.frame, full.frame.iloc[20:40].reset_index(drop=True))
+
+
+def test_extension_keeps_the_stored_rows_and_fetches_one_page(stub):
+    first = crawl_companies(INDUSTRY, order="-marketcap", limit=20)
+    base = Snapshot(first.frame, 1000.0, 3600, 86400, 1, {"pages": first.pages})
+    stub.reset()
+    update = extend_companies_update(INDUSTRY, base, order="-marketcap", limit=40)
+    assert stub.stats()["requests"] == {"screener": 1}
+    pd.testing.assert_frame_equal(update.frame, crawl_companies(INDUSTRY, order="-marketcap", limit=40).frame)
+    assert len(update.meta["pages"]) == 2
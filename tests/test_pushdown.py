@@ -0,0 +1,77 @@
+"""Column and filter pushdown into screener requests (finviz_bs.screener_query)."""
+import pandas as pd
+import pytest
+
+from aggregates import AGGREGATES
+from delta import TOP_COLUMNS
+from finviz_bs import apply_filters, crawl_companies, screener_query, screener_url
+from normalize import CHART_METRICS, DERIVED_METRICS, normalize_companies
+
+INDUSTRY = "Semiconductors"
+
+
+def test_default_view_holds_every_chartable_metric():
+    picker_columns = set(CHART_METRICS) | {AGGREGATES[metric].column for metric in DERIVED_METRICS}
+    assert picker_columns <= set(TOP_COLUMNS)
+
+
+def test_stored_default_view_has_the_picker_columns(stub):
+    frame = crawl_companies(INDUSTRY, order="-marketcap", limit=20, columns=TOP_COLUMNS).frame
+    typed = normalize_companies(frame, INDUSTRY)
+    assert set(CHART_METRICS) <= set(typed.columns)
+    assert typed[CHART_METRICS].notna().any().all()
+
+
+def test_market_cap_floor_at_a_bracket_is_pushed_down_exactly():
+    query = screener_query(["Ticker", "P/E"], [("Market cap", ">=", 10000)])
+    assert query.codes == ["cap_largeover"]
+    assert query.residual == []
+    assert query.spec.names == ["Ticker", "P/E"]
+
+
+def test_market_cap_floor_between_brackets_is_narrowed_and_checked_locally():
+    query = screener_query(["Ticker"], [("Market cap", ">", 5000)])
+    # The $2bn bracket is the nearest one below, the exact floor is residual
+    assert query.codes == ["cap_midover"]
+    assert query.residual == [("Market cap", ">", 5000)]
+    # The residual predicate needs its column on the page
+    assert "Market cap" in query.spec.names
+
+
+def test_positive_filters_and_residual_predicates():
+    query = screener_query(None, [("P/E", ">", 0), ("Dividend", ">", 0), ("P/B", "<", 3)])
+    assert query.codes == ["fa_pe_profitable", "fa_div_pos"]
+    assert query.residual == [("P/B", "<", 3)]
+
+
+@pytest.mark.parametrize("columns, filters", [
+    (["Nope"], None),
+    (None, [("Nope", ">", 1)]),
+    (None, [("P/E", "~", 1)]),
+])
+def test_unsupported_queries_are_rejected(columns, filters):
+    with pytest.raises(ValueError):
+        screener_query(columns, filters)
+
+
+def test_url_carries_codes_and_only_requested_columns():
+    url = screener_url("Banks - Regional", "-marketcap", ["Ticker", "P/E"], [("Market cap", ">=", 2000)])
+    assert "f=ind_banksregional,cap_midover" in url
+    assert "&c=1,7&" in url
+
+
+def test_apply_filters_compares_in_typed_units():
+    frame = pd.DataFrame({
+        "Ticker": ["A", "B", "C", "D"],
+        "Market cap": ["12.50B", "950.00M", "3.10B", "-"],
+        "P/E": ["12.00", "40.00", "-", "8.00"],
+    })
+    kept = apply_filters(frame, [("Market cap", ">", 1000), ("P/E", "<", 20)])
+    assert kept["Ticker"].tolist() == ["A"]
+
+
+def test_crawl_applies_residual_predicates(stub):
+    full = normalize_companies(crawl_companies(INDUSTRY, order="-marketcap").frame, INDUSTRY)
+    filtered = crawl_companies(INDUSTRY, order="-marketcap", columns=["Ticker", "P/E"], filters=[("P/E", "<", 30)])
+    assert list(filtered.frame.columns) == ["Ticker", "P/E"]
+    assert set(filtered.frame["Ticker"]) == set(full.loc[full["P/E"] < 30, "Ticker"])
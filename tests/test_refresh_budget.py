@@ -0,0 +1,57 @@
+"""The refresh request budget shared through the snapshot store (snapshot_store.SharedBudget)."""
+import pandas as pd
+import pytest
+
+import refresh_worker
+from refresh_worker import RefreshScheduler
+from snapshot_store import SnapshotStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SnapshotStore(str(tmp_path / "snapshots.sqlite"))
+
+
+def test_budget_refills_at_its_rate(store, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("snapshot_store.time.time", lambda: now[0])
+    assert store.take_budget("refresh", 0.5, 2) == 0
+    assert store.take_budget("refresh", 0.5, 2) == 0
+    assert store.take_budget("refresh", 0.5, 2) == pytest.approx(2.0)
+    now[0] += 1
+    assert store.take_budget("refresh", 0.5, 2) == pytest.approx(1.0)
+    now[0] += 1
+    assert store.take_budget("refresh", 0.5, 2) == 0
+    # Idle time refills up to capacity, no further
+    now[0] += 3600
+    assert [store.take_budget("refresh", 0.5, 2) > 0 for _ in range(3)] == [False, False, True]
+
+
+def test_schedulers_share_one_budget(store):
+    # Two schedulers, as if in two processes on the same store file
+    first = RefreshScheduler(store, requests_per_minute=2)
+    second = RefreshScheduler(SnapshotStore(store.path), requests_per_minute=2)
+    first.budget.acquire()
+    second.budget.acquire()
+    # The two requests used up the per-minute allowance for both
+    assert store.take_budget("refresh", first.budget.rate, first.budget.capacity) > 0
+
+
+class CountingBudget:
+    def __init__(self):
+        self.taken = 0
+
+    def acquire(self):
+        self.taken += 1
+
+
+def test_groups_fetch_for_the_industry_list_is_charged(store, monkeypatch):
+    groups = pd.DataFrame({"Sector": ["Banks", "Software"], "P/E": ["12.00", "30.00"]})
+    monkeypatch.setattr(refresh_worker, "get_fetcher", lambda: type("F", (), {"sectors": lambda self: groups})())
+    scheduler = RefreshScheduler(store)
+    scheduler.budget = CountingBudget()
+    assert scheduler.industries() == ["Banks", "Software"]
+    assert scheduler.budget.taken == 1
+    # Served from the stored snapshot now: nothing is fetched or charged
+    assert scheduler.industries() == ["Banks", "Software"]
+    assert scheduler.budget.taken == 1
@@ -0,0 +1,66 @@
+"""Opportunistic history compaction by the snapshot store (SnapshotStore.compact_history)."""
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+import snapshot_store
+from snapshot_store import SnapshotStore
+
+
+class FakeHistory:
+    def __init__(self):
+        self.compactions = 0
+        self.done = threading.Event()
+
+    def compact(self):
+        self.compactions += 1
+        self.done.set()
+        return 1
+
+
+@pytest.fixture
+def history(monkeypatch):
+    history = FakeHistory()
+    monkeypatch.setattr(snapshot_store, "HISTORY_ENABLED", True)
+    monkeypatch.setattr(snapshot_store, "get_history", lambda: history)
+    monkeypatch.setattr(snapshot_store, "record_snapshot", lambda *args: None)
+    return history
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SnapshotStore(str(tmp_path / "snapshots.sqlite"))
+
+
+FRAME = pd.DataFrame({"Sector": ["Banks"], "P/E": ["12.00"]})
+
+
+def test_puts_compact_at_most_once_per_interval(store, history, monkeypatch):
+    monkeypatch.setattr(snapshot_store, "HISTORY_COMPACT_INTERVAL", 3600)
+    store.put("groups", "industry", FRAME)
+    assert history.done.wait(5)
+    store.put("groups", "industry", FRAME)
+    store.put("screener", "Banks", FRAME)
+    assert history.compactions == 1
+    # The lease is given back for the next interval or another process
+    deadline = time.time() + 5
+    while not store.acquire_lease("history", "compact"):
+        assert time.time() < deadline
+        time.sleep(0.01)
+
+
+def test_compaction_waits_its_turn_behind_the_lease(store, history):
+    assert store.acquire_lease("history", "compact")
+    assert store.compact_history() == 0
+    assert history.compactions == 0
+    store.release_lease("history", "compact")
+    assert store.compact_history() == 1
+
+
+def test_nothing_is_compacted_with_history_off(store, history, monkeypatch):
+    monkeypatch.setattr(snapshot_store, "HISTORY_ENABLED", False)
+    store.put("groups", "industry", FRAME)
+    assert store.compact_history() == 0
+    assert history.compactions == 0
@@ -0,0 +1,39 @@
+"""Streaming a cold company view into the page (app.stream_company_data)."""
+import os
+
+import pandas as pd
+from streamlit.testing.v1 import AppTest
+
+import fetcher
+from delta import TOP_ORDER, TOP_ROWS
+from finviz_bs import screener_key
+from finviz_parse import parse_groups
+from snapshot_store import get_store
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SECTOR = "Semiconductors"
+
+
+def test_interrupted_stream_releases_the_view_lease(monkeypatch):
+    with open(os.path.join(ROOT, "benchmarks", "fixtures", "groups.html")) as f:
+        data, _ = parse_groups(f.read())
+    store = get_store()
+    store.put("groups", "industry", pd.DataFrame(data))
+    key = screener_key(SECTOR, TOP_ORDER, TOP_ROWS)
+    store.release_lease("screener", key)
+    pages = []
+
+    def iter_companies(self, industry, *args, **kwargs):
+        pages.append(industry)
+        yield pd.DataFrame({"Ticker": ["NVDA"], "Company": ["NVIDIA Corp"], "Market cap": ["1107.79B"]})
+        raise RuntimeError("connection reset")
+
+    monkeypatch.setattr(fetcher.Fetcher, "iter_companies", iter_companies)
+    at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=30).run()
+    at.multiselect[0].set_value([SECTOR]).run()
+
+    assert pages == [SECTOR]
+    assert store.get("screener", key) is None
+    # The next load can fetch the view instead of waiting out the lease
+    assert store.acquire_lease("screener", key)
+    store.release_lease("screener", key)